@@ -0,0 +1,303 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import json
+import platform
+import random
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from math import ceil
+
+import click
+from flask import current_app, session
+
+import indico
+from indico.cli.core import cli_group
+from indico.core.config import config
+from indico.core.db import db
+from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.modules.categories import Category
+from indico.modules.events import Event
+from indico.modules.events.contributions import Contribution
+from indico.modules.events.models.events import EventType
+from indico.modules.events.registration.models.forms import RegistrationForm
+from indico.modules.events.registration.models.items import PersonalDataType
+from indico.modules.events.registration.models.registrations import Registration, RegistrationData, RegistrationState
+from indico.modules.events.registration.util import create_personal_data_fields, generate_spreadsheet_from_registrations
+from indico.modules.events.sessions import Session
+from indico.modules.events.sessions.models.blocks import SessionBlock
+from indico.modules.events.timetable.legacy import TimetableSerializer
+from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
+from indico.modules.rb.models.locations import Location
+from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
+from indico.modules.rb.models.reservations import RepeatFrequency, Reservation
+from indico.modules.rb.models.rooms import Room
+from indico.modules.rb.operations.bookings import get_rooms_availability
+from indico.modules.search.base import SearchTarget
+from indico.modules.search.internal import InternalSearch
+from indico.modules.users import User
+from indico.util.benchmark import PERCENTILES, run_benchmark
+from indico.util.console import cformat
+from indico.util.date_time import now_utc
+from indico.util.spreadsheets import generate_csv
+
+
+BENCHMARK_CATEGORY_TITLE = 'Benchmark data'
+BENCHMARK_LOCATION_NAME = 'Benchmark'
+
+_scenarios = {}
+
+
+@cli_group()
+def cli():
+    pass
+
+
+def scenario(name):
+    """Register a benchmark scenario.
+
+    The decorated function receives the benchmark category and returns
+    a function which is then timed.  Anything that should not be timed
+    (like finding the objects to use) is done in the outer function.
+    """
+    def decorator(fn):
+        _scenarios[name] = fn
+        return fn
+    return decorator
+
+
+def _get_benchmark_category():
+    return Category.query.filter_by(parent_id=Category.get_root().id, title=BENCHMARK_CATEGORY_TITLE,
+                                    is_deleted=False).first()
+
+
+def _get_benchmark_conference(category):
+    return (Event.query
+            .filter(Event.category_chain_overlaps(category.id), ~Event.is_deleted,
+                    Event.type_ == EventType.conference)
+            .order_by(Event.id)
+            .first())
+
+
+def _create_events(category, user, rng, num_categories, num_events):
+    today = now_utc().replace(hour=0, minute=0, second=0, microsecond=0)
+    categories = [Category(parent=category, title=f'Benchmark category {i}', acl_entries=set())
+                  for i in range(num_categories)]
+    for i in range(num_events):
+        start_dt = today + timedelta(days=rng.randint(-365, 365), hours=rng.randint(8, 18))
+        Event(creator=user, category=rng.choice(categories), title=f'Benchmark event {i}', timezone='UTC',
+              type_=rng.choice([EventType.lecture, EventType.meeting]), start_dt=start_dt,
+              end_dt=start_dt + timedelta(hours=rng.randint(1, 4)), acl_entries=set(),
+              protection_mode=ProtectionMode.protected if rng.random() < 0.1 else ProtectionMode.inheriting)
+        if i % 500 == 0:
+            db.session.flush()
+    db.session.flush()
+
+
+def _create_conference(category, user, num_contributions, num_registrations):
+    contribs_per_block = 10
+    blocks_per_day = 8  # 4 sessions with a block in the morning and the afternoon
+    num_days = max(1, ceil(num_contributions / (contribs_per_block * blocks_per_day)))
+    start_dt = now_utc().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=30)
+    event = Event(creator=user, category=category, title='Benchmark conference', timezone='UTC',
+                  type_=EventType.conference, start_dt=start_dt,
+                  end_dt=start_dt + timedelta(days=num_days - 1, hours=12), acl_entries=set())
+    sessions = [Session(event=event, title=f'Session {i}') for i in range(4)]
+    contrib_ids = iter(range(num_contributions))
+    for day in range(num_days):
+        for block_start in (timedelta(days=day, hours=1), timedelta(days=day, hours=6)):
+            for sess in sessions:
+                block = SessionBlock(session=sess, duration=timedelta(minutes=20 * contribs_per_block))
+                block_entry = TimetableEntry(event=event, object=block, start_dt=start_dt + block_start,
+                                             type=TimetableEntryType.SESSION_BLOCK)
+                for pos, i in enumerate(contrib_ids):
+                    contrib = Contribution(event=event, session=sess, title=f'Contribution {i}',
+                                           duration=timedelta(minutes=20))
+                    TimetableEntry(event=event, object=contrib, parent=block_entry,
+                                   start_dt=start_dt + block_start + pos * timedelta(minutes=20),
+                                   type=TimetableEntryType.CONTRIBUTION)
+                    if pos == contribs_per_block - 1:
+                        break
+        db.session.flush()
+
+    regform = RegistrationForm(event=event, title='Registration', currency='EUR')
+    create_personal_data_fields(regform)
+    for field in regform.sections[0].fields:
+        field.is_enabled = True
+    db.session.flush()
+    fields = {field.personal_data_type: field for field in regform.sections[0].fields}
+    for i in range(num_registrations):
+        person_data = {
+            PersonalDataType.first_name: f'First{i}',
+            PersonalDataType.last_name: f'Last{i}',
+            PersonalDataType.email: f'benchmark{i}@example.invalid',
+            PersonalDataType.affiliation: f'Affiliation {i % 50}',
+        }
+        Registration(registration_form=regform, first_name=person_data[PersonalDataType.first_name],
+                     last_name=person_data[PersonalDataType.last_name], email=person_data[PersonalDataType.email],
+                     state=RegistrationState.complete, currency=regform.currency, base_price=0,
+                     data=[RegistrationData(field_data=fields[pd_type].current_data, data=value)
+                           for pd_type, value in person_data.items()])
+        if i % 500 == 0:
+            db.session.flush()
+    db.session.flush()
+
+
+def _create_rooms(user, rng, num_rooms, num_bookings):
+    location = Location(name=BENCHMARK_LOCATION_NAME)
+    today = date.today()
+    for i in range(num_rooms):
+        room = Room(location=location, building=str(100 + i // 10), floor=str(i % 10), number=str(i),
+                    owner=user, verbose_name=None)
+        for __ in range(num_bookings):
+            start_date = today + timedelta(days=rng.randint(-30, 90))
+            start_time = time(rng.randint(8, 17))
+            end_time = time(start_time.hour + rng.randint(1, 2))
+            repeat_frequency = rng.choices([RepeatFrequency.NEVER, RepeatFrequency.DAY, RepeatFrequency.WEEK],
+                                           weights=[7, 1, 2])[0]
+            end_date = {RepeatFrequency.NEVER: start_date,
+                        RepeatFrequency.DAY: start_date + timedelta(days=4),
+                        RepeatFrequency.WEEK: start_date + timedelta(weeks=8)}[repeat_frequency]
+            reservation = Reservation(room=room, start_dt=datetime.combine(start_date, start_time),
+                                      end_dt=datetime.combine(end_date, end_time), repeat_frequency=repeat_frequency,
+                                      repeat_interval=int(repeat_frequency != RepeatFrequency.NEVER),
+                                      booking_reason='Benchmark', booked_for_user=user, created_by_user=user)
+            ReservationOccurrence.create_series_for_reservation(reservation)
+        db.session.flush()
+
+
+@cli.command()
+@click.option('--categories', 'num_categories', type=click.IntRange(1), default=20, show_default=True,
+              help='Number of categories')
+@click.option('--events', 'num_events', type=click.IntRange(0), default=5000, show_default=True,
+              help='Number of events (in addition to the big conference)')
+@click.option('--contributions', 'num_contributions', type=click.IntRange(0), default=1000, show_default=True,
+              help='Number of contributions in the conference timetable')
+@click.option('--registrations', 'num_registrations', type=click.IntRange(0), default=2000, show_default=True,
+              help='Number of registrations in the conference')
+@click.option('--rooms', 'num_rooms', type=click.IntRange(0), default=100, show_default=True,
+              help='Number of rooms')
+@click.option('--bookings', 'num_bookings', type=click.IntRange(0), default=20, show_default=True,
+              help='Number of bookings per room')
+@click.option('--seed', type=int, default=0, show_default=True, help='Seed for the random data')
+@click.option('-y', '--yes', is_flag=True, help='Do not ask for confirmation')
+def create_data(num_categories, num_events, num_contributions, num_registrations, num_rooms, num_bookings, seed,
+                yes):
+    """Create synthetic data for the benchmarks.
+
+    Create the data in a database that is NOT used in production, e.g.
+    a copy of the production database or a new one, and then run the
+    benchmarks on the same data with different Indico versions.
+    """
+    if _get_benchmark_category():
+        click.secho(f'Benchmark data already exists in the "{BENCHMARK_CATEGORY_TITLE}" category', fg='yellow')
+        sys.exit(1)
+    click.echo(f'This will create lots of data in {config.SQLALCHEMY_DATABASE_URI}')
+    if not yes and not click.confirm('Do you really want to do this? Never do this on a production database!'):
+        sys.exit(1)
+    rng = random.Random(seed)
+    user = User.get_system_user()
+    category = Category(parent=Category.get_root(), title=BENCHMARK_CATEGORY_TITLE, acl_entries=set())
+    click.echo('Creating events')
+    _create_events(category, user, rng, num_categories, num_events)
+    click.echo('Creating conference')
+    _create_conference(category, user, num_contributions, num_registrations)
+    click.echo('Creating rooms and bookings')
+    _create_rooms(user, rng, num_rooms, num_bookings)
+    db.session.commit()
+    click.secho(f'Benchmark data created in category {category.id}', fg='green')
+
+
+@scenario('timetable')
+def _bench_timetable(category):
+    event = _get_benchmark_conference(category)
+    return lambda: TimetableSerializer(event).serialize_timetable()
+
+
+@scenario('category-events')
+def _bench_category_events(category):
+    from indico.modules.categories.controllers.util import get_category_view_params
+    subcategory = max(category.children, key=lambda c: c.deep_events_count)
+    return lambda: get_category_view_params(subcategory, now_utc().astimezone(subcategory.display_tzinfo))
+
+
+@scenario('rb-availability')
+def _bench_rb_availability(category):
+    rooms = Room.query.join(Room.location).filter(Location.name == BENCHMARK_LOCATION_NAME).all()
+    start_dt = datetime.combine(date.today() + timedelta(days=1), time(10))
+    end_dt = datetime.combine(date.today() + timedelta(weeks=8), time(12))
+    return lambda: get_rooms_availability(rooms, start_dt, end_dt, RepeatFrequency.WEEK, 1, None)
+
+
+@scenario('registration-export')
+def _bench_registration_export(category):
+    regform = _get_benchmark_conference(category).registration_forms[0]
+
+    def _export():
+        headers, rows = generate_spreadsheet_from_registrations(regform.active_registrations, regform.active_fields,
+                                                                ['reg_date', 'state', 'price'])
+        generate_csv(headers, rows)
+
+    return _export
+
+
+@scenario('search')
+def _bench_search(category):
+    search = InternalSearch()
+    return lambda: search.search('benchmark', session.user, 1, [SearchTarget.event])
+
+
+@contextmanager
+def _benchmark_context(user_id):
+    with current_app.test_request_context(base_url=config.BASE_URL):
+        if user_id is not None:
+            session.set_session_user(User.get(user_id))
+        try:
+            yield
+        finally:
+            db.session.rollback()
+            db.session.expire_all()
+
+
+@cli.command()
+@click.argument('names', nargs=-1, type=click.Choice(list(_scenarios)))
+@click.option('-n', '--runs', type=click.IntRange(1), default=10, show_default=True,
+              help='How many times to run each scenario')
+@click.option('-w', '--warmup', type=click.IntRange(0), default=1, show_default=True,
+              help='How many times to run each scenario before measuring')
+@click.option('-u', '--user', 'user_id', type=int, help='The ID of the user to run the scenarios as')
+@click.option('-o', '--output', type=click.File('w'), help='Write the results as JSON to this file')
+def run(names, runs, warmup, user_id, output):
+    """Run benchmark scenarios.
+
+    By default all scenarios are run.
+    """
+    category = _get_benchmark_category()
+    if category is None:
+        click.secho('No benchmark data found; create it using `indico bench create-data`', fg='red')
+        sys.exit(1)
+    results = {}
+    for name in (names or _scenarios):
+        with _benchmark_context(user_id):
+            func = _scenarios[name](category)
+        click.echo(cformat('%{white!}{}%{reset}: ').format(name), nl=False)
+        results[name] = res = run_benchmark(func, runs=runs, warmup=warmup,
+                                            wrapper=lambda: _benchmark_context(user_id))
+        click.echo(', '.join(f'{key}={value:.4f}s' for key, value in (('mean', res['mean']),
+                                                                       *res['percentiles'].items())))
+    if output:
+        json.dump({
+            'indico_version': indico.__version__,
+            'python_version': platform.python_version(),
+            'timestamp': now_utc().isoformat(),
+            'runs': runs,
+            'warmup': warmup,
+            'percentiles': PERCENTILES,
+            'scenarios': results,
+        }, output, indent=2)
+        output.write('\n')
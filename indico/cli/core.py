@@ -78,6 +78,11 @@ def db():
     """Perform database operations."""
 
 
+@cli.group(cls=LazyGroup, import_name='indico.cli.bench:cli')
+def bench():
+    """Benchmark Indico using synthetic data."""
+
+
 @cli.group(cls=LazyGroup, import_name='indico.cli.maintenance:cli')
 def maint():
     """Perform maintenance operations."""
@@ -51,6 +51,18 @@ class IndicoRedisCache(RedisCache):
 
     serializer = NoneWrappingRedisSerializer()
 
+    _compare_and_set_script = '''
+        if redis.call('get', KEYS[1]) ~= ARGV[1] then
+            return 0
+        end
+        if tonumber(ARGV[3]) == -1 then
+            redis.call('set', KEYS[1], ARGV[2])
+        else
+            redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        end
+        return 1
+    '''
+
     def get(self, key, default=None):
         return CachedNone.unwrap(super().get(key), default)
 
@@ -60,6 +72,11 @@ class IndicoRedisCache(RedisCache):
     def get_dict(self, *keys, default=None):
         return dict(zip(keys, self.get_many(*keys, default=default), strict=True))
 
+    def compare_and_set(self, key, expected, value, timeout=None):
+        script = self._write_client.register_script(self._compare_and_set_script)
+        args = [self.serializer.dumps(expected), self.serializer.dumps(value), self._normalize_timeout(timeout)]
+        return bool(script(keys=[self.key_prefix + key], args=args))
+
     @classmethod
     def factory(cls, app, config, args, kwargs):
         key_prefix = config.get('CACHE_KEY_PREFIX')
@@ -88,7 +105,12 @@ class ScopedCache:
     def add(self, key, value, timeout=None):
         if isinstance(timeout, timedelta):
             timeout = int(timeout.total_seconds())
-        self.cache.add(self._scoped(key), value, timeout=timeout)
+        return self.cache.add(self._scoped(key), value, timeout=timeout)
+
+    def compare_and_set(self, key, expected, value, timeout=None):
+        if isinstance(timeout, timedelta):
+            timeout = int(timeout.total_seconds())
+        return self.cache.compare_and_set(self._scoped(key), expected, value, timeout=timeout)
 
     def delete(self, key):
         self.cache.delete(self._scoped(key))
@@ -152,11 +174,30 @@ class IndicoCache(Cache):
         if isinstance(timeout, timedelta):
             timeout = int(timeout.total_seconds())
         try:
-            super().add(key, value, timeout=timeout)
+            return super().add(key, value, timeout=timeout)
         except RedisError:
             if config.DEBUG:
                 raise
             _logger.exception('add(%r) failed', key)
+            return False
+
+    def compare_and_set(self, key, expected, value, timeout=None):
+        """Atomically replace a cached value if it has the expected value.
+
+        :return: Whether the value has been replaced.
+        """
+        if isinstance(timeout, timedelta):
+            timeout = int(timeout.total_seconds())
+        if not hasattr(self.cache, 'compare_and_set'):
+            # the null cache used in tests never contains the expected value
+            return False
+        try:
+            return self.cache.compare_and_set(key, expected, value, timeout=timeout)
+        except RedisError:
+            if config.DEBUG:
+                raise
+            _logger.exception('compare_and_set(%r) failed', key)
+            return False
 
     def delete(self, key):
         try:
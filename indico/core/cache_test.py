@@ -69,3 +69,17 @@ def test_expiry(scoped, timeout):
     cache_obj.add('b', 2, timeout=timeout)
     cache_obj.set_many({'c': 3}, timeout=timeout)
     assert cache_obj.get_many('a', 'b', 'c') == [1, 2, 3]
+
+
+@pytest.mark.parametrize('scoped', (False, True))
+def test_compare_and_set(scoped):
+    cache_obj = make_scoped_cache('test') if scoped else cache
+    assert not cache_obj.compare_and_set('a', 'old', 'new')
+    assert cache_obj.get('a') is None
+    cache_obj.set('a', 'old')
+    assert not cache_obj.compare_and_set('a', 'other', 'new')
+    assert cache_obj.get('a') == 'old'
+    assert cache_obj.compare_and_set('a', 'old', 'new', timeout=timedelta(seconds=5))
+    assert cache_obj.get('a') == 'new'
+    assert not cache_obj.compare_and_set('a', 'old', 'newer')
+    assert cache_obj.get('a') == 'new'
@@ -55,6 +55,7 @@ DEFAULTS = {
     'ENABLE_ROOMBOOKING': False,
     'EXPERIMENTAL_EDITING_SERVICE': False,
     'EXTERNAL_REGISTRATION_URL': None,
+    'EXTERNAL_USER_SEARCH_TIMEOUT': 5,
     'HELP_URL': 'https://learn.getindico.io',
     'FAILED_LOGIN_RATE_LIMIT': '5 per 15 minutes; 10 per day',
     'FAVICON_URL': None,
@@ -85,12 +86,14 @@ DEFAULTS = {
     'SENTRY_DSN': None,
     'SENTRY_LOGGING_LEVEL': 'WARNING',
     'SESSION_LIFETIME': 86400 * 31,
+    'SETTINGS_CACHE_SIZE': 10000,
     'SIGNUP_CAPTCHA': True,
     'SIGNUP_RATE_LIMIT': '2 per hour; 5 per day',
     'SMTP_ALLOWED_SENDERS': set(),
     'SMTP_CERTFILE': None,
     'SMTP_KEYFILE': None,
     'SMTP_LOGIN': None,
+    'SMTP_MAX_MESSAGES_PER_CONNECTION': 100,
     'SMTP_PASSWORD': None,
     'SMTP_SENDER_FALLBACK': None,
     'SMTP_SERVER': ('localhost', 25),
@@ -60,6 +60,10 @@ def handle_sqlalchemy_database_error():
     raise ConstraintViolated(msg, exc.orig) from exc
 
 
+def _before_commit(*args, **kwargs):
+    signals.core.before_commit.send()
+
+
 def _after_commit(*args, **kwargs):
     signals.core.after_commit.send()
     if hasattr(g, 'memoize_cache'):
@@ -75,6 +79,7 @@ class IndicoSQLAlchemy(SQLAlchemy):
 
     def _make_session_factory(self, *args, **kwargs):
         factory = super()._make_session_factory(*args, **kwargs)
+        listen(factory, 'before_commit', _before_commit)
         listen(factory, 'after_commit', _after_commit)
         return factory
 
@@ -11,6 +11,7 @@ from itertools import chain
 from sqlalchemy.event import listen
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import Comparator, hybrid_property
+from sqlalchemy.sql import select
 
 from indico.core.db import db
 from indico.core.db.sqlalchemy import PyIntEnum
@@ -129,6 +130,41 @@ class LinkMixin:
             if rel is not None:
                 listen(rel, 'set', partial(_set_link_type, link_type))
 
+    @classmethod
+    def get_linked_effective_protection_mode(cls):
+        """Get an SQL expression for the protection mode of the linked object.
+
+        The expression evaluates to the *effective* protection mode of
+        the linked object, i.e. it never returns `inheriting`.
+
+        Since it relies on the ``effective_protection_mode`` column
+        properties of the linkable models, this may only be called
+        once all mappers have been configured.
+        """
+        from indico.modules.categories import Category
+        from indico.modules.events import Event
+        from indico.modules.events.contributions import Contribution
+        from indico.modules.events.contributions.models.subcontributions import SubContribution
+        from indico.modules.events.sessions import Session
+        from indico.modules.events.sessions.models.blocks import SessionBlock
+        mapping = {
+            LinkType.category: (Category.effective_protection_mode, Category.id == cls.category_id),
+            LinkType.event: (Event.effective_protection_mode, Event.id == cls.linked_event_id),
+            LinkType.session: (Session.effective_protection_mode, Session.id == cls.session_id),
+            LinkType.session_block: (Session.effective_protection_mode,
+                                     (SessionBlock.id == cls.session_block_id) &
+                                     (Session.id == SessionBlock.session_id)),
+            LinkType.contribution: (Contribution.effective_protection_mode, Contribution.id == cls.contribution_id),
+            LinkType.subcontribution: (Contribution.effective_protection_mode,
+                                       (SubContribution.id == cls.subcontribution_id) &
+                                       (Contribution.id == SubContribution.contribution_id)),
+        }
+        return db.case([
+            (cls.link_type == link_type, select([column]).where(criterion).correlate(cls).scalar_subquery())
+            for link_type, (column, criterion) in mapping.items()
+            if link_type in cls.allowed_link_types
+        ])
+
     @declared_attr
     def link_type(cls):
         return db.Column(
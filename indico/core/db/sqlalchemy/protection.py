@@ -6,12 +6,15 @@
 # LICENSE file for more details.
 
 import itertools
+from collections import defaultdict
+from functools import wraps
 
-from flask import has_request_context, session
+from flask import current_app, g, has_app_context, has_request_context, session
 from sqlalchemy import inspect
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.base import NEVER_SET, NO_VALUE
 
 from indico.core import signals
@@ -27,6 +30,102 @@ from indico.util.user import iter_acl
 from indico.web.util import jsonify_template
 
 
+def _get_access_cache():
+    """Get the cache for access checks in the current request.
+
+    Returns ``None`` if access checks should not be cached.
+    """
+    if not has_request_context() or current_app.config['TESTING'] or current_app.config.get('REPL'):
+        return None
+    try:
+        return g.protection_access_cache
+    except AttributeError:
+        g.protection_access_cache = cache = {}
+        return cache
+
+
+def clear_access_cache():
+    """Clear all cached access checks of the current request.
+
+    This happens automatically whenever the protection mode or the ACL
+    of an object changes and after each commit, since e.g. the group
+    memberships of the user may have changed.
+    """
+    if has_app_context():
+        g.pop('protection_access_cache', None)
+
+
+@signals.acl.protection_changed.connect
+@signals.acl.entry_changed.connect
+@signals.core.after_commit.connect
+def _clear_access_cache(sender, **kwargs):
+    clear_access_cache()
+
+
+def _cache_access_check(fn):
+    """Cache the result of an access check during the current request.
+
+    Since parent objects are checked recursively, checking many objects
+    within the same protection tree only walks up the tree once.
+    """
+    @wraps(fn)
+    def wrapper(self, user, allow_admin=True):
+        cache = _get_access_cache()
+        if cache is None:
+            return fn(self, user, allow_admin=allow_admin)
+        key = (self, user, allow_admin)
+        try:
+            return cache[key]
+        except KeyError:
+            rv = cache[key] = fn(self, user, allow_admin=allow_admin)
+            return rv
+
+    return wrapper
+
+
+def apply_acl_entry_strategy(rel, principal):
+    """Apply the loading strategy needed to check ACL entries.
+
+    :param rel: The loader option for the ``acl_entries`` relationship
+    :param principal: The principal model used for the ACL entries
+    """
+    user_strategy = rel.joinedload('user')
+    user_strategy.lazyload('*')
+    user_strategy.load_only('id')
+    rel.joinedload('local_group').load_only('id')
+    if principal.allow_networks:
+        rel.joinedload('ip_network_group').load_only('id')
+    if principal.allow_category_roles:
+        rel.joinedload('category_role').load_only('id')
+    if principal.allow_event_roles:
+        rel.joinedload('event_role').load_only('id')
+    if principal.allow_registration_forms:
+        rel.joinedload('registration_form').load_only('id')
+    return rel
+
+
+def preload_access_data(objects):
+    """Preload everything needed to check access to many objects.
+
+    This loads the ACLs of the objects and of all their protection
+    parents using a constant number of queries per type of object,
+    instead of loading them lazily for each object while checking
+    its access.
+    """
+    seen = set()
+    pending = set(objects)
+    while pending:
+        seen |= pending
+        objects_by_type = defaultdict(list)
+        for obj in pending:
+            objects_by_type[type(obj)].append(obj)
+        pending = set()
+        for obj_type, objs in objects_by_type.items():
+            if issubclass(obj_type, ProtectionMixin):
+                pending.update(obj_type._preload_access_data(objs))
+        pending -= seen | {None}
+
+
 class ProtectionMode(RichIntEnum):
     __titles__ = [_('Public'), _('Inheriting'), _('Protected')]
     public = 0
@@ -181,7 +280,7 @@ class ProtectionMixin:
     def is_user_admin(user):
         return user.is_admin
 
-    @memoize_request
+    @_cache_access_check
     def can_access(self, user, allow_admin=True):
         """Check if the user can access the object.
 
@@ -253,6 +352,45 @@ class ProtectionMixin:
         override = self._check_can_access_override(user, allow_admin=allow_admin, authorized=rv)
         return override if override is not None else rv
 
+    @classmethod
+    def filter_accessible(cls, objects, user, allow_admin=True):
+        """Get the objects from a list which the user can access.
+
+        This is equivalent to checking :meth:`can_access` for each of
+        the objects, but preloads the data needed for the checks in
+        bulk using :func:`preload_access_data`.
+
+        :param objects: The objects to check
+        :param user: The :class:`.User` to check. May be None if the
+                     user is not logged in.
+        :param allow_admin: If admin users should always have access
+        :return: A list containing the accessible objects, in the same
+                 order as they were passed.
+        """
+        objects = list(objects)
+        preload_access_data(objects)
+        return [obj for obj in objects if obj.can_access(user, allow_admin=allow_admin)]
+
+    @classmethod
+    def _preload_access_data(cls, objects):
+        """Preload the data needed to check access to objects of this type.
+
+        By default this loads the ACL entries of all the objects in a
+        single query.  Models can override this to load more data in
+        bulk, e.g. when the data needed to check the protection parent
+        cannot be loaded efficiently while checking the objects.
+
+        :param objects: A list of objects of this type
+        :return: An iterable containing the objects whose data needs to
+                 be preloaded next, usually the protection parents.
+        """
+        if not cls.disable_protection_mode and hasattr(cls, 'acl_entries'):
+            if ids := {obj.id for obj in objects if 'acl_entries' in inspect(obj).unloaded and obj.id is not None}:
+                principal = cls.acl_entries.property.mapper.class_
+                cls.query.filter(cls.id.in_(ids)).options(apply_acl_entry_strategy(selectinload(cls.acl_entries),
+                                                                                   principal)).all()
+        return {obj.protection_parent for obj in objects}
+
     def check_access_key(self, access_key=None):
         """Check whether an access key is valid for the object.
 
@@ -292,6 +430,7 @@ class ProtectionMixin:
         assert self.allow_access_key
         session.setdefault('access_keys', {})[self._access_key_session_key] = access_key
         session.modified = True
+        clear_access_cache()
 
     @property
     def _access_key_session_key(self):
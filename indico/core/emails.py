@@ -8,6 +8,8 @@
 import os
 import pickle
 import tempfile
+import time
+from contextlib import suppress
 from datetime import date
 from email.utils import formataddr, make_msgid, parseaddr
 from fnmatch import fnmatch
@@ -67,6 +69,29 @@ def send_email_task(task, email, log_entry=None):
             db.session.commit()
 
 
+@celery.task(name='send_emails')
+def send_emails_task(emails):
+    """Send several emails using as few SMTP connections as possible.
+
+    Emails which could not be sent are passed on to `send_email_task`,
+    which takes care of retrying them.
+
+    :param emails: A list of ``(email, log_entry_id)`` tuples
+    """
+    from indico.modules.logs import EventLogEntry
+    log_entry_ids = {log_entry_id for __, log_entry_id in emails if log_entry_id is not None}
+    log_entries = ({le.id: le for le in EventLogEntry.query.filter(EventLogEntry.id.in_(log_entry_ids))}
+                   if log_entry_ids else {})
+    failed = do_send_emails([(email, log_entries.get(log_entry_id)) for email, log_entry_id in emails],
+                            _from_task=True)
+    db.session.commit()
+    delay = DELAYS[0] if not config.DEBUG else 1
+    for email, log_entry in failed:
+        logger.warning('Could not send email "%s" (attempt 1/%d); retry in %ds',
+                       truncate(email['subject'], 100), MAX_TRIES, delay)
+        send_email_task.apply_async((email, log_entry), countdown=delay, retries=1)
+
+
 def get_actual_sender_address(sender_address: str, reply_address: set[str]) -> tuple[str, set]:
     site_title = core_settings.get('site_title')
     if not sender_address:
@@ -108,21 +133,84 @@ def do_send_email(email, log_entry=None, _from_task=False):
                        the celery task responsible for sending emails.
     """
     with get_connection() as conn:
-        msg = EmailMessage(subject=email['subject'], body=email['body'], from_email=email['from'],
-                           to=email['to'], cc=email['cc'], bcc=email['bcc'], reply_to=email['reply_to'],
-                           attachments=email['attachments'], connection=conn)
-        if not msg.to:
-            msg.extra_headers['To'] = 'Undisclosed-recipients:;'
-        if email['html']:
-            msg.content_subtype = 'html'
-        msg.extra_headers['message-id'] = make_msgid(domain=urlsplit(config.BASE_URL).hostname)
-        msg.send()
+        _make_message(email, conn).send()
     if not _from_task:
         logger.info('Sent email "%s"', truncate(email['subject'], 100))
     if log_entry:
         update_email_log_state(log_entry)
 
 
+def do_send_emails(emails, _from_task=False):
+    """Send several emails, reusing the SMTP connection.
+
+    A new connection is opened after sending
+    :data:`SMTP_MAX_MESSAGES_PER_CONNECTION` emails or in case sending
+    an email failed.  Errors only affect the email which could not be
+    sent; the caller is responsible for retrying or storing it.
+
+    :param emails: A list of ``(email, log_entry)`` tuples, see
+                   `do_send_email` for details
+    :param _from_task: Indicates that this function is called from
+                       the celery task responsible for sending emails.
+    :return: A list of ``(email, log_entry)`` tuples for the emails
+             which could not be sent.
+    """
+    max_messages = config.SMTP_MAX_MESSAGES_PER_CONNECTION
+    failed = []
+    conn = None
+    conn_messages = num_connections = 0
+    start = time.perf_counter()
+    try:
+        for email, log_entry in emails:
+            try:
+                if conn is None or (max_messages and conn_messages >= max_messages):
+                    _close_connection(conn)
+                    conn = get_connection()
+                    conn.open()
+                    conn_messages = 0
+                    num_connections += 1
+                conn_messages += 1
+                _make_message(email, conn).send()
+            except Exception as exc:
+                logger.warning('Could not send email "%s" [%s]', truncate(email['subject'], 100), exc)
+                failed.append((email, log_entry))
+                # the connection may not be usable anymore
+                _close_connection(conn)
+                conn = None
+                continue
+            if not _from_task:
+                logger.info('Sent email "%s"', truncate(email['subject'], 100))
+            if log_entry:
+                update_email_log_state(log_entry)
+    finally:
+        _close_connection(conn)
+    duration = time.perf_counter() - start
+    num_sent = len(emails) - len(failed)
+    logger.info('Sent %d/%d emails in %.2fs (%.1f emails/s) using %d SMTP connections',
+                num_sent, len(emails), duration, num_sent / duration if duration else 0, num_connections)
+    return failed
+
+
+def _make_message(email, connection):
+    msg = EmailMessage(subject=email['subject'], body=email['body'], from_email=email['from'],
+                       to=email['to'], cc=email['cc'], bcc=email['bcc'], reply_to=email['reply_to'],
+                       attachments=email['attachments'], connection=connection)
+    if not msg.to:
+        msg.extra_headers['To'] = 'Undisclosed-recipients:;'
+    if email['html']:
+        msg.content_subtype = 'html'
+    msg.extra_headers['message-id'] = make_msgid(domain=urlsplit(config.BASE_URL).hostname)
+    return msg
+
+
+def _close_connection(connection):
+    if connection is None:
+        return
+    # failing to properly close the connection does not affect the emails sent over it
+    with suppress(Exception):
+        connection.close()
+
+
 def update_email_log_state(log_entry, failed=False):
     if failed:
         log_entry.data['state'] = 'failed'
@@ -7,8 +7,11 @@
 
 import pytest
 
-from indico.core.emails import get_actual_sender_address
+from indico.core import emails
+from indico.core.emails import do_send_emails, get_actual_sender_address
+from indico.core.notifications import make_email
 from indico.modules.core.settings import core_settings
+from indico.testing.util import extract_emails
 
 
 class MockConfig:
@@ -59,3 +62,25 @@ def test_smtp_sender_config_notset(mocker, sender_email, result):
     core_settings.set('site_title', 'Indico')
     assert get_actual_sender_address(sender_email, set()) == result
     assert get_actual_sender_address(sender_email, {'reply@whatever.com'}) == (result[0], {'reply@whatever.com'})
+
+
+@pytest.mark.usefixtures('db')
+def test_do_send_emails(smtp, mocker, patch_indico_config):
+    patch_indico_config('SMTP_MAX_MESSAGES_PER_CONNECTION', 2)
+    get_connection = mocker.spy(emails, 'get_connection')
+    mails = [make_email('test@example.com', subject=f'Test {i}', body='Test') for i in range(5)]
+    assert do_send_emails([(email, None) for email in mails]) == []
+    assert get_connection.call_count == 3
+    for i in range(5):
+        extract_emails(smtp, one=True, subject=f'Test {i}')
+    assert not smtp.outbox
+
+
+@pytest.mark.usefixtures('db')
+def test_do_send_emails_failure(smtp, mocker):
+    mails = [make_email('test@example.com', subject=f'Test {i}', body='Test') for i in range(3)]
+    mails[1]['attachments'] = [('test.txt', None, 'text/plain')]  # attachment without content
+    assert do_send_emails([(email, None) for email in mails]) == [(mails[1], None)]
+    extract_emails(smtp, one=True, subject='Test 0')
+    extract_emails(smtp, one=True, subject='Test 2')
+    assert not smtp.outbox
@@ -7,7 +7,8 @@
 
 import re
 import time
-from functools import wraps
+from functools import partial, wraps
+from itertools import batched
 from types import GeneratorType
 
 from flask import g
@@ -52,13 +53,13 @@ def send_email(email, event=None, module=None, user=None, log_metadata=None):
     :param log_metadata: A metadata dictionary to be saved in the event's log
     """
     from indico.core.emails import do_send_email, send_email_task
-    fn = send_email_task.delay if config.SMTP_USE_CELERY else do_send_email
     # we log the email immediately (as pending).  if we don't commit,
     # the log message will simply be thrown away later
     log_entry = _log_email(email, event, module, user, log_metadata)
     if 'email_queue' in g:
-        g.email_queue.append((fn, email, log_entry))
+        g.email_queue.append((email, log_entry))
     else:
+        fn = send_email_task.delay if config.SMTP_USE_CELERY else do_send_email
         fn(email, log_entry)
 
 
@@ -96,31 +97,63 @@ def flush_email_queue():
     doing a commit/rollback of any other changes that might have
     been pending.
     """
-    from indico.core.emails import store_failed_email, update_email_log_state
     queue = g.get('email_queue', [])
     if not queue:
         return
     logger.debug('Sending %d queued emails', len(queue))
-    for fn, email, log_entry in queue:
-        try:
-            fn(email, log_entry)
-        except Exception:
-            # Flushing the email queue happens after a commit.
-            # If anything goes wrong here we keep going and just log
-            # it to avoid losing (more) emails in case celery is not
-            # used for email sending or there is a temporary issue
-            # with celery.
-            if log_entry:
-                update_email_log_state(log_entry, failed=True)
-            path = store_failed_email(email, log_entry)
-            logger.exception('Flushing queued email "%s" failed; stored data in %s',
-                             truncate(email['subject'], 100), path)
-            # Wait for a short moment in case it's a very temporary issue
-            time.sleep(0.25)
+    if config.SMTP_USE_CELERY:
+        _flush_email_queue_celery(queue)
+    else:
+        _flush_email_queue_direct(queue)
     del queue[:]
     db.session.commit()
 
 
+def _flush_email_queue_celery(queue):
+    from indico.core.emails import send_email_task, send_emails_task
+    batch_size = config.SMTP_MAX_MESSAGES_PER_CONNECTION
+    if len(queue) == 1 or batch_size == 1:
+        for email, log_entry in queue:
+            _send_queued_emails(partial(send_email_task.delay, email, log_entry), [(email, log_entry)])
+        return
+    # the emails of a batch are sent by a single worker, reusing the SMTP connection
+    for batch in batched(queue, batch_size or len(queue)):
+        emails = [(email, log_entry.id if log_entry else None) for email, log_entry in batch]
+        _send_queued_emails(partial(send_emails_task.delay, emails), batch)
+
+
+def _flush_email_queue_direct(queue):
+    from indico.core.emails import do_send_emails
+    _send_queued_emails(partial(do_send_emails, queue), queue)
+
+
+def _send_queued_emails(fn, emails):
+    """Send queued emails and store them in case of a failure.
+
+    :param fn: A callable sending the emails.  It may return a list of
+               ``(email, log_entry)`` tuples which could not be sent.
+    :param emails: The ``(email, log_entry)`` tuples sent by `fn`
+    """
+    from indico.core.emails import store_failed_email, update_email_log_state
+    try:
+        failed = fn() or []
+    except Exception:
+        # Flushing the email queue happens after a commit.
+        # If anything goes wrong here we keep going and just log
+        # it to avoid losing (more) emails in case celery is not
+        # used for email sending or there is a temporary issue
+        # with celery.
+        logger.exception('Flushing %d queued emails failed', len(emails))
+        failed = emails
+        # Wait for a short moment in case it's a very temporary issue
+        time.sleep(0.25)
+    for email, log_entry in failed:
+        if log_entry:
+            update_email_log_state(log_entry, failed=True)
+        path = store_failed_email(email, log_entry)
+        logger.error('Flushing queued email "%s" failed; stored data in %s', truncate(email['subject'], 100), path)
+
+
 @make_interceptable
 def make_email(to_list=None, cc_list=None, bcc_list=None, *, sender_address=None, reply_address=None, attachments=None,
                subject=None, body=None, template=None, html=False):
@@ -0,0 +1,197 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+"""Process-wide cache for settings.
+
+Settings are cached in each process in a bounded LRU cache, in addition
+to the per-request cache used by the settings proxies.  Every settings
+module has a version token stored in redis, which is replaced after a
+transaction that changed any of the module's settings has been committed.
+Cached entries with an outdated version are ignored, so other processes
+see the new values in their next request.
+
+The version is per module and not per event (or other object the
+settings belong to), so changing e.g. the settings of one event makes
+the cached settings of that module outdated for all events.
+"""
+
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from uuid import uuid4
+
+from flask import current_app, g, has_app_context, has_request_context
+
+from indico.core import signals
+from indico.core.cache import make_scoped_cache
+from indico.core.config import config
+from indico.core.settings.util import _not_in_db
+
+
+_versions = make_scoped_cache('settings-version')
+
+
+class SettingsLRUCache:
+    """A thread-safe LRU cache storing versioned settings values."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Get a cached value.
+
+        :raise KeyError: if the value is not cached or outdated
+        """
+        with self._lock:
+            entry_version, value = self._data[key]
+            if entry_version != version:
+                del self._data[key]
+                raise KeyError(key)
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, version, value):
+        if not (size := config.SETTINGS_CACHE_SIZE):
+            return
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+lru_cache = SettingsLRUCache()
+
+
+def _get_module_versions():
+    try:
+        return g.settings_versions
+    except AttributeError:
+        g.settings_versions = versions = {}
+        return versions
+
+
+def _get_dirty_modules():
+    try:
+        return g.settings_dirty_modules
+    except AttributeError:
+        g.settings_dirty_modules = dirty = set()
+        return dirty
+
+
+def get_module_version(module):
+    """Get the current version token of a settings module.
+
+    The version is only retrieved from redis once per request.  If
+    there is no version yet (or it has been evicted from redis), a new
+    one is created to make sure no outdated entries are used.
+    """
+    versions = _get_module_versions()
+    try:
+        return versions[module]
+    except KeyError:
+        pass
+    version = _versions.get(module)
+    if version is None:
+        _versions.add(module, uuid4().hex)
+        # if redis is not available we get None and thus skip the cache
+        version = _versions.get(module)
+    versions[module] = version
+    return version
+
+
+def is_shared_cache_enabled():
+    return (has_request_context() and bool(config.SETTINGS_CACHE_SIZE) and
+            not current_app.config['TESTING'] and not current_app.config.get('REPL'))
+
+
+def mark_module_dirty(module):
+    """Mark the settings of a module as changed.
+
+    The shared cache is not used for the module anymore during the
+    current request, and once the transaction has been committed the
+    module's version is changed to invalidate the cached settings in
+    all processes.
+    """
+    if has_app_context():
+        _get_dirty_modules().add(module)
+    else:
+        _versions.delete(module)
+
+
+@signals.core.after_commit.connect
+def _invalidate_dirty_modules(sender, **kwargs):
+    if not has_app_context():
+        return
+    dirty = g.pop('settings_dirty_modules', None)
+    if not dirty:
+        return
+    _versions.set_many({module: uuid4().hex for module in dirty})
+    versions = g.get('settings_versions', {})
+    for module in dirty:
+        versions.pop(module, None)
+
+
+class SharedSettingsCache:
+    """A settings cache backed by both the request and the process.
+
+    This behaves like the dict used as the per-request settings cache,
+    but entries which are not in the request cache yet are taken from
+    the process-wide LRU cache if they are still up to date.  Values
+    are copied to avoid modifications of mutable settings leaking into
+    other requests.
+
+    :param request_cache: The per-request settings cache dict
+    """
+
+    def __init__(self, request_cache):
+        self.request_cache = request_cache
+
+    @staticmethod
+    def _copy(value):
+        return value if value is _not_in_db else deepcopy(value)
+
+    @staticmethod
+    def _get_version(key):
+        __, module, __, kwargs = key
+        if module in g.get('settings_dirty_modules', ()):
+            return None
+        # settings for e.g. users are keyed by the user object itself,
+        # those must not be shared across requests
+        if not all(isinstance(v, int | str) for __, v in kwargs):
+            return None
+        return get_module_version(module)
+
+    def __getitem__(self, key):
+        try:
+            return self.request_cache[key]
+        except KeyError:
+            if (version := self._get_version(key)) is None:
+                raise
+        value = self._copy(lru_cache.get(key, version))
+        self.request_cache[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self.request_cache[key] = value
+        if (version := self._get_version(key)) is not None:
+            lru_cache.set(key, version, self._copy(value))
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
@@ -11,6 +11,7 @@ from operator import attrgetter
 
 from flask import g, has_request_context
 
+from indico.core.settings.cache import SharedSettingsCache, is_shared_cache_enabled, mark_module_dirty
 from indico.core.settings.models.settings import Setting, SettingPrincipal
 from indico.core.settings.util import get_all_settings, get_setting, get_setting_acl
 
@@ -24,7 +25,8 @@ class ACLProxyBase:
 
     @property
     def _cache(self):
-        return self.proxy._cache
+        # ACLs contain database objects, so they are never shared across requests
+        return self.proxy._request_cache
 
     def _check_name(self, name):
         self.proxy._check_name(name, True)
@@ -49,6 +51,7 @@ class SettingsProxyBase:
     acl_proxy_class = None
     default_sentinel = object()
     allow_cache_outside_request = False
+    allow_shared_cache = False
 
     def __init__(self, module, defaults=None, strict=True, acls=None, converters=None):
         self.module = module
@@ -136,6 +139,7 @@ class SettingsProxyBase:
     def _flush_cache(self):
         if has_request_context():
             g.get('settings_cache', {}).clear()
+        mark_module_dirty(self.module)
 
     def _convert_from_python(self, name, value):
         if value is None:
@@ -150,7 +154,7 @@ class SettingsProxyBase:
         return converter.to_python(value) if converter else value
 
     @property
-    def _cache(self):
+    def _request_cache(self):
         if not self.allow_cache_outside_request and not has_request_context():
             return {}  # new dict everytime, this effectively disables the cache
         try:
@@ -159,6 +163,13 @@ class SettingsProxyBase:
             g.settings_cache = rv = {}
             return rv
 
+    @property
+    def _cache(self):
+        cache = self._request_cache
+        if self.allow_shared_cache and is_shared_cache_enabled():
+            return SharedSettingsCache(cache)
+        return cache
+
 
 class ACLProxy(ACLProxyBase):
     """Proxy class for core ACL settings."""
@@ -223,6 +234,7 @@ class SettingsProxy(SettingsProxyBase):
     """Proxy class to access settings for a certain module."""
 
     acl_proxy_class = ACLProxy
+    allow_shared_cache = True
 
     def get_all(self, no_defaults=False):
         """Retrieve all settings, including ACLs.
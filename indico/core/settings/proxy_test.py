@@ -9,9 +9,13 @@ from datetime import datetime, timedelta
 
 import pytest
 import pytz
+from flask import g
 
+from indico.core import signals
+from indico.core.cache import ScopedCache
 from indico.core.settings import PrefixSettingsProxy, SettingsProxy
 from indico.core.settings.converters import DatetimeConverter, EnumConverter, TimedeltaConverter
+from indico.core.settings.models.settings import Setting
 from indico.modules.events.settings import EventSettingsProxy
 from indico.modules.users import User
 from indico.util.enum import IndicoIntEnum
@@ -219,3 +223,51 @@ def test_bound_settings(dummy_event, dummy_user):
     assert bound.acls.get('acl') == {dummy_user}
     assert bound.get('e') == TestEnum.bar
     assert isinstance(bound.get('e'), TestEnum)
+
+
+@pytest.fixture
+def shared_settings_cache(app, monkeypatch, memory_cache):
+    from indico.core.settings import cache
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    monkeypatch.setattr(cache, '_versions', ScopedCache(memory_cache, 'settings-version'))
+    cache.lru_cache.clear()
+    yield cache.lru_cache
+    cache.lru_cache.clear()
+
+
+def _new_request():
+    g.pop('settings_cache', None)
+    g.pop('settings_versions', None)
+    g.pop('global_settings_cache', None)
+
+
+@pytest.mark.usefixtures('db', 'request_context')
+def test_shared_cache(shared_settings_cache):
+    proxy = SettingsProxy('test', {'hello': 'world', 'foo': None})
+    proxy.set('hello', 'foo')
+    signals.core.after_commit.send()
+    _new_request()
+    assert proxy.get('hello') == 'foo'
+    assert len(shared_settings_cache) == 2
+    # changes bypassing the proxy are not noticed while the cached value is up to date
+    Setting.set('test', 'hello', 'bar')
+    _new_request()
+    assert proxy.get('hello') == 'foo'
+    # changes through the proxy are visible immediately in the same request...
+    proxy.set('hello', 'baz')
+    assert proxy.get('hello') == 'baz'
+    # ...and in other requests once they have been committed
+    signals.core.after_commit.send()
+    _new_request()
+    assert proxy.get('hello') == 'baz'
+    assert proxy.get('foo') is None
+
+
+@pytest.mark.usefixtures('db', 'request_context')
+def test_shared_cache_acl_not_shared(shared_settings_cache, dummy_user):
+    proxy = SettingsProxy('test', acls={'acl'})
+    proxy.acls.add_principal('acl', dummy_user)
+    signals.core.after_commit.send()
+    _new_request()
+    assert proxy.acls.get('acl') == {dummy_user}
+    assert not len(shared_settings_cache)
@@ -28,6 +28,12 @@ also be triggered by CLI utilities that result in other signals being
 triggered.
 ''')
 
+before_commit = _signals.signal('before-commit', '''
+Called before an SQL transaction is committed.  Changes made to the
+session while handling this signal are committed together with the
+rest of the transaction.
+''')
+
 after_commit = _signals.signal('after-commit', '''
 Called after an SQL transaction has been committed.  Note that the
 session is in 'committed' state when this signal is called, so no SQL
@@ -22,6 +22,7 @@ from speaklater import is_lazy_string
 from indico.legacy.pdfinterface.base import PageBreak, Paragraph, PDFBase, PDFWithTOC, Spacer, escape
 from indico.modules.events.layout.util import get_menu_entry_by_name
 from indico.modules.events.registration.models.items import PersonalDataType
+from indico.modules.events.registration.util import RegistrationDataMatrix
 from indico.modules.events.tracks.models.groups import TrackGroup
 from indico.modules.events.tracks.settings import track_settings
 from indico.util.date_time import format_date, format_datetime, now_utc
@@ -133,11 +134,12 @@ class ProgrammeToPDF(PDFBase):
 
 
 class RegistrantToPDF(PDFBase):
-    def __init__(self, event, reg, display, doc=None, story=None, static_items=None):
+    def __init__(self, event, reg, display, doc=None, story=None, static_items=None, registration_data=None):
         self.event = event
         self._reg = reg
         self._display = display
         self.static_items = static_items
+        self._registration_data = registration_data or RegistrationDataMatrix([reg])
         if not story:
             story = [Spacer(inch, 5*cm)]
         PDFBase.__init__(self, doc, story)
@@ -164,7 +166,8 @@ class RegistrantToPDF(PDFBase):
         style.fontSize = 12
 
         registration = self._reg
-        data = registration.data_by_field
+        registration_data = self._registration_data
+        data = registration_data.get_data_by_field(registration)
 
         def _append_text_to_story(text, space=0.2, style=style):
             p = Paragraph(text, style, registration.full_name)
@@ -189,7 +192,7 @@ class RegistrantToPDF(PDFBase):
                                     spaceAfter=10, dash=None))
 
         full_name_title = format_full_name(registration.first_name, registration.last_name,
-                                           registration.get_personal_data().get('title'),
+                                           registration_data.get_personal_data(registration).get('title'),
                                            last_name_first=False, last_name_upper=False,
                                            abbrev_first_name=False)
 
@@ -232,17 +235,18 @@ class RegistrantToPDF(PDFBase):
                 _print_row(_('Tags'), tags)
 
         for item in self._display:
+            friendly_data = registration_data.get_friendly_data(registration, item.id)
             if item.input_type == 'accommodation' and item.id in data:
-                _print_row(item.title, data[item.id].friendly_data.get('choice'))
-                arrival_date = data[item.id].friendly_data.get('arrival_date')
+                _print_row(item.title, friendly_data.get('choice'))
+                arrival_date = friendly_data.get('arrival_date')
                 _print_row(_('Arrival date'), format_date(arrival_date) if arrival_date else '')
-                departure_date = data[item.id].friendly_data.get('departure_date')
+                departure_date = friendly_data.get('departure_date')
                 _print_row(_('Departure date'), format_date(departure_date) if departure_date else '')
             elif item.input_type == 'multi_choice' and item.id in data:
-                multi_choice_data = ', '.join(data[item.id].friendly_data)
+                multi_choice_data = ', '.join(friendly_data)
                 _print_row(item.title, multi_choice_data)
             elif item.input_type == 'sessions' and item.id in data:
-                sessions_data = '; '.join(data[item.id].friendly_data)
+                sessions_data = '; '.join(friendly_data)
                 _print_row(item.title, sessions_data)
             elif item.is_section:
                 _print_section(item.title)
@@ -250,8 +254,7 @@ class RegistrantToPDF(PDFBase):
                                              PersonalDataType.last_name):
                 continue
             else:
-                value = data[item.id].friendly_data if item.id in data else ''
-                _print_row(item.title, value)
+                _print_row(item.title, friendly_data)
 
         return story
 
@@ -304,8 +307,10 @@ class RegistrantsListToBookPDF(PDFWithTOC):
                 continue
             items.append(section)
             items += fields
+        registration_data = RegistrationDataMatrix(self._regList)
         for reg in self._regList:
-            temp = RegistrantToPDF(self.event, reg, items, static_items=self._static_item_ids)
+            temp = RegistrantToPDF(self.event, reg, items, static_items=self._static_item_ids,
+                                   registration_data=registration_data)
             temp.getBody(self._story, indexedFlowable=self._indexedFlowable, level=1)
             self._story.append(PageBreak())
 
@@ -398,16 +403,15 @@ class RegistrantsListToPDF(PDFBase):
             lp.append(Paragraph('<b>{}</b>'.format(_('Tags')), text_format))
         l.append(lp)
 
+        registration_data = RegistrationDataMatrix(self._regList, {item.id for item in self._display})
         for registration in self._regList:
             lp = []
             lp.append(Paragraph(registration.friendly_id, text_format))
             lp.append(Paragraph(f'{escape(registration.first_name)} {escape(registration.last_name)}', text_format))
-            data = registration.data_by_field
             for item in self._display:
-                friendly_data = data.get(item.id).friendly_data if data.get(item.id) else ''
+                friendly_data = registration_data.get_friendly_data(registration, item.id)
                 if item.input_type == 'accommodation':
                     if friendly_data:
-                        friendly_data = data[item.id].friendly_data
                         lp.append(Paragraph(escape(friendly_data['choice']), text_format))
                         lp.append(Paragraph(format_date(friendly_data['arrival_date']), text_format))
                         lp.append(Paragraph(format_date(friendly_data['departure_date']), text_format))
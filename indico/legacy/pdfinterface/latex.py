@@ -7,9 +7,12 @@
 
 import codecs
 import functools
+import hashlib
 import os
+import shutil
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from importlib.resources import as_file
 from importlib.resources import files as res_files
 from io import BytesIO
@@ -30,6 +33,7 @@ from werkzeug.local import LocalProxy
 
 from indico.core.cache import make_scoped_cache
 from indico.core.config import config
+from indico.core.db import db
 from indico.core.limiter import make_rate_limiter
 from indico.core.logger import Logger
 from indico.legacy.pdfinterface.base import escape
@@ -38,8 +42,9 @@ from indico.modules.events.abstracts.models.reviews import AbstractAction
 from indico.modules.events.abstracts.settings import BOACorrespondingAuthorType, boa_settings
 from indico.modules.events.contributions.util import sort_contribs
 from indico.modules.events.util import create_event_logo_tmp_file
+from indico.modules.files.models.files import File
 from indico.util import mdx_latex
-from indico.util.date_time import format_date, format_human_timedelta, format_time
+from indico.util.date_time import format_date, format_human_timedelta, format_time, now_utc
 from indico.util.fs import chmod_umask
 from indico.util.i18n import _, ngettext
 from indico.util.string import render_markdown
@@ -65,7 +70,9 @@ def generate_cached_pdf(fn, key, obj=None) -> BytesIO:
     ensure proper cache separation in that case.
 
     The generated PDF is cached (longer when the request comes from an unauthenticated user),
-    and rate limiting is applied as well if the user is unauthenticated.
+    and rate limiting is applied as well if the user is unauthenticated.  Note that LaTeX
+    only runs if nobody generated the exact same document before, since the compiled PDFs
+    are kept in the storage backend (see :meth:`LatexRunner.get_pdf_file`).
     """
     user_id = session.user.id if session.user else None
     # Cache for a short time even if the user is logged-in, because IIRC some browsers send more
@@ -84,31 +91,44 @@ def generate_cached_pdf(fn, key, obj=None) -> BytesIO:
     return BytesIO(data)
 
 
+def _make_markdown_converter(tmpdir):
+    # Markdown -> LaTeX renderer
+    # safe_mode - strip out all HTML
+    md = markdown.Markdown(safe_mode='remove')
+    latex_mdx = mdx_latex.LaTeXExtension(configs={'apply_br': True, 'tmpdir': tmpdir})
+    latex_mdx.extendMarkdown(md, markdown.__dict__)
+
+    def _escape_latex_math(string):
+        return mdx_latex.latex_escape(string, ignore_math=True)
+
+    def _convert_markdown(text):
+        return RawLatex(render_markdown(text, md=md.convert, escape_latex_math=_escape_latex_math))
+
+    return _convert_markdown
+
+
 class PDFLaTeXBase:
     _table_of_contents = False
     LATEX_TEMPLATE = None
 
     def __init__(self):
-        # Markdown -> LaTeX renderer
-        # safe_mode - strip out all HTML
-        md = markdown.Markdown(safe_mode='remove')
         self.source_dir = tempfile.mkdtemp(prefix='indico-texgen-', dir=config.TEMP_DIR)
-        latex_mdx = mdx_latex.LaTeXExtension(configs={'apply_br': True, 'tmpdir': self.source_dir})
-        latex_mdx.extendMarkdown(md, markdown.__dict__)
+        self._args = {'markdown': _make_markdown_converter(self.source_dir)}
 
-        def _escape_latex_math(string):
-            return mdx_latex.latex_escape(string, ignore_math=True)
-
-        def _convert_markdown(text):
-            return RawLatex(render_markdown(text, md=md.convert, escape_latex_math=_escape_latex_math))
-
-        self._args = {'markdown': _convert_markdown}
+    def _get_runner(self):
+        """Get the :class:`LatexRunner` used to generate the PDF."""
+        return LatexRunner(self.source_dir, has_toc=self._table_of_contents)
 
     def generate(self, *, as_bytes=False):
-        latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents)
+        latex = self._get_runner()
         filename = latex.run(self.LATEX_TEMPLATE, **self._args)
         return Path(filename).read_bytes() if as_bytes else filename
 
+    def generate_file(self):
+        """Generate the PDF and return the :class:`.File` containing it."""
+        latex = self._get_runner()
+        return latex.get_pdf_file(self.LATEX_TEMPLATE, **self._args)
+
     def generate_source_archive(self):
         latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents)
         latex.prepare(self.LATEX_TEMPLATE, **self._args)
@@ -176,12 +196,82 @@ def _latex_escape(s, ignore_braces=False):
     return RawLatex(mdx_latex.latex_escape(s, ignore_braces=ignore_braces))
 
 
+def get_latex_source_hash(source_dir, has_toc=False):
+    """Get a hash identifying the LaTeX sources in a directory.
+
+    The hash covers the names and contents of all files in the directory
+    (e.g. the TeX source, logos and images), so it only matches if the
+    compiled PDF would be identical.  Symlinks (used for the fonts which
+    are the same for all documents) are skipped.
+    """
+    source_hash = hashlib.sha256(f'{config.XELATEX_PATH}\0{has_toc}\0'.encode())
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path):
+                continue
+            with open(path, 'rb') as f:
+                file_hash = hashlib.file_digest(f, 'sha256').hexdigest()
+            source_hash.update(f'{os.path.relpath(path, source_dir)}\0{file_hash}\0'.encode())
+    return source_hash.hexdigest()
+
+
+def get_stored_latex_pdf(source_hash):
+    """Get a previously compiled PDF from the storage backend.
+
+    :param source_hash: The hash of the LaTeX sources as returned by
+                        :func:`get_latex_source_hash`.
+    :return: A :class:`.File` or ``None`` if no such PDF exists.
+    """
+    return get_stored_latex_pdfs({source_hash}).get(source_hash)
+
+
+def get_stored_latex_pdfs(source_hashes):
+    """Get previously compiled PDFs from the storage backend.
+
+    :param source_hashes: A collection of LaTeX source hashes.
+    :return: A dict mapping source hashes to :class:`.File` objects.
+             Hashes for which no PDF exists are missing in the dict.
+    """
+    if not source_hashes:
+        return {}
+    query = (File.query
+             .filter(File.meta.op('?')('latex_hash'),
+                     File.meta['latex_hash'].astext.in_(set(source_hashes)))
+             .order_by(File.id.desc()))
+    # ordered so the oldest file wins if the same PDF was stored more than once
+    return {f.meta['latex_hash']: f for f in query}
+
+
+def _store_latex_pdf(source_hash, path):
+    f = File(filename=os.path.basename(path), content_type='application/pdf', meta={'latex_hash': source_hash})
+    with open(path, 'rb') as fd:
+        f.save(('latex', source_hash[:2]), fd)
+    f.claim()
+    db.session.add(f)
+    db.session.flush()
+    return f
+
+
 class LatexRunner:
-    """Handle the PDF generation from a chosen LaTeX template."""
+    """Handle the PDF generation from a chosen LaTeX template.
+
+    :param source_dir: The directory in which the sources are generated
+                       and compiled.
+    :param has_toc: Whether the document contains a table of contents,
+                    which requires running LaTeX twice.
+    :param includes: A dict mapping file names to :class:`.File` objects
+                     which are only copied into the source directory in
+                     case LaTeX actually runs.  Since they are not part of
+                     the source hash, their names must identify their
+                     content.
+    """
 
-    def __init__(self, source_dir, has_toc=False):
+    def __init__(self, source_dir, has_toc=False, includes=None):
         self.source_dir = source_dir
         self.has_toc = has_toc
+        self.includes = includes or {}
 
     def run_latex(self, source_file, log_file=None):
         pdflatex_cmd = [config.XELATEX_PATH,
@@ -231,6 +321,8 @@ class LatexRunner:
         env.globals['_'] = _
         env.globals['ngettext'] = ngettext
         env.globals['session'] = session
+        # use this instead of \today, which is not part of the source used to look up compiled PDFs
+        env.globals['now'] = now_utc()
         template = env.get_or_select_template(template_name)
         return template.render(font_dir='fonts/', **kwargs)
 
@@ -247,10 +339,39 @@ class LatexRunner:
             os.symlink(font_dir, os.path.join(self.source_dir, 'fonts'))
         return source_filename, target_filename
 
+    def get_pdf_file(self, template_name, **kwargs):
+        """Get the compiled PDF from the storage backend.
+
+        The PDFs are stored under the hash of their sources, so LaTeX only
+        runs if there is no PDF for the exact same sources yet, regardless
+        of who generated it and when.  In that case the compiled PDF is
+        also available in the source directory.
+
+        :return: The :class:`.File` containing the PDF
+        """
+        return get_pdf_files([(self, template_name, kwargs)])[0]
+
     def run(self, template_name, **kwargs):
-        if not config.LATEX_ENABLED:
-            raise RuntimeError('LaTeX is not enabled')
-        source_filename, target_filename = self.prepare(template_name, **kwargs)
+        """Get the path of the compiled PDF.
+
+        This works like :meth:`get_pdf_file` but copies a stored PDF into
+        the source directory if LaTeX did not run.
+        """
+        stored = self.get_pdf_file(template_name, **kwargs)
+        target_filename = os.path.join(self.source_dir, template_name + '.pdf')
+        if not os.path.exists(target_filename):
+            with stored.open() as src, open(target_filename, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        return target_filename
+
+    def _copy_includes(self):
+        for filename, file in self.includes.items():
+            path = os.path.join(self.source_dir, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with file.open() as src, open(path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+
+    def _compile(self, source_filename, target_filename):
         log_filename = os.path.join(self.source_dir, 'output.log')
         log_file = open(log_filename, 'a+')  # noqa: SIM115
         try:
@@ -264,7 +385,42 @@ class LatexRunner:
                 # something went terribly wrong, no LaTeX file was produced
                 raise LaTeXRuntimeException(source_filename, log_filename)
 
-        return target_filename
+
+def get_pdf_files(documents):
+    """Get several compiled PDFs from the storage backend.
+
+    This works like :meth:`LatexRunner.get_pdf_file` but LaTeX runs in
+    parallel for all documents which have not been compiled before.
+
+    :param documents: A list of ``(runner, template_name, kwargs)`` tuples,
+                      each runner needs its own source directory.
+    :return: A list containing the :class:`.File` for each document.
+    """
+    if not config.LATEX_ENABLED:
+        raise RuntimeError('LaTeX is not enabled')
+    prepared = []
+    for runner, template_name, kwargs in documents:
+        source_filename, target_filename = runner.prepare(template_name, **kwargs)
+        source_hash = get_latex_source_hash(runner.source_dir, runner.has_toc)
+        prepared.append((source_hash, runner, source_filename, target_filename))
+    stored = get_stored_latex_pdfs({source_hash for source_hash, *__ in prepared})
+    if stored:
+        Logger.get('pdflatex').debug('Using %d stored PDFs', len(stored))
+    # identical documents only need to be compiled once
+    pending = {source_hash: (runner, source_filename, target_filename)
+               for source_hash, runner, source_filename, target_filename in prepared
+               if source_hash not in stored}
+    for runner, __, __ in pending.values():
+        runner._copy_includes()
+    if pending:
+        # LaTeX runs in a subprocess, so threads are enough to keep all CPUs busy
+        with ThreadPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as executor:
+            futures = {source_hash: executor.submit(runner._compile, source_filename, target_filename)
+                       for source_hash, (runner, source_filename, target_filename) in pending.items()}
+        for source_hash, future in futures.items():
+            future.result()
+            stored[source_hash] = _store_latex_pdf(source_hash, pending[source_hash][2])
+    return [stored[source_hash] for source_hash, *__ in prepared]
 
 
 def extract_affiliations(contrib):
@@ -467,8 +623,9 @@ class ContribsToPDF(PDFLaTeXBase):
 
 class ContributionBook(PDFLaTeXBase):
     LATEX_TEMPLATE = 'contribution_list_book'
+    FRAGMENT_TEMPLATE = 'contribution_fragment'
 
-    def __init__(self, event, user, contribs=None, tz=None, sort_by=''):
+    def __init__(self, event, user, contribs=None, tz=None, sort_by='', chunked=None):
         super().__init__()
 
         tz = tz or event.timezone
@@ -505,15 +662,51 @@ class ContributionBook(PDFLaTeXBase):
             'boa_text_end': boa_settings.get(event, 'extra_text_end'),
             'min_lines_per_abstract': boa_settings.get(event, 'min_lines_per_abstract'),
             'link_format': boa_settings.get(event, 'link_format'),
+            'fragments': None,
         })
 
         self._args['logo_img'] = create_event_logo_tmp_file(event, self.source_dir) if event.logo else None
+        self.chunked = boa_settings.get(event, 'chunked') if chunked is None else chunked
+
+    def _can_access(self, contrib):
+        return contrib.can_access(self._args['user'])
+
+    def _get_runner(self):
+        """Get the runner for the book, compiling its fragments if needed.
+
+        In chunked mode every contribution is compiled separately (and in
+        parallel), starting on a new page.  The fragments are stored under
+        the hash of their sources, so editing a contribution only requires
+        recompiling its own fragment and the book itself, which merely
+        includes the pages of the fragment PDFs.
+        """
+        if not self.chunked:
+            return super()._get_runner()
+        contribs = [contrib for contrib in self._args['contribs'] if self._can_access(contrib)]
+        documents = []
+        for contrib in contribs:
+            fragment_dir = tempfile.mkdtemp(prefix='indico-texgen-', dir=config.TEMP_DIR)
+            documents.append((LatexRunner(fragment_dir), self.FRAGMENT_TEMPLATE, {
+                'markdown': _make_markdown_converter(fragment_dir),
+                'contrib': contrib,
+                'affiliation_contribs': self._args['affiliation_contribs'],
+                'corresp_authors': self._args['corresp_authors'],
+                'link_format': self._args['link_format'],
+            }))
+        files = get_pdf_files(documents)
+        includes = {f'fragments/{f.meta["latex_hash"]}.pdf': f for f in files}
+        self._args['fragments'] = [(contrib, f'fragments/{f.meta["latex_hash"]}.pdf')
+                                   for contrib, f in zip(contribs, files, strict=True)]
+        return LatexRunner(self.source_dir, has_toc=self._table_of_contents, includes=includes)
 
 
 class AbstractBook(ContributionBook):
     LATEX_TEMPLATE = 'book_of_abstracts'
     _table_of_contents = True
 
+    def _can_access(self, contrib):
+        return contrib.can_access(session.user)
+
     def __init__(self, event, tz=None):
         sort_by = boa_settings.get(event, 'sort_by')
         super().__init__(event, None, sort_by=sort_by)
@@ -0,0 +1,73 @@
+"""Add category statistics table
+
+Revision ID: 8d0c5a7e3f21
+Revises: 4615aff776e0
+Create Date: 2025-04-15 12:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from indico.core.db.sqlalchemy import UTCDateTime
+
+
+# revision identifiers, used by Alembic.
+revision = '8d0c5a7e3f21'
+down_revision = '4615aff776e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'statistics',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.Column('contribution_count', sa.Integer(), nullable=False),
+        sa.Column('attachment_count', sa.Integer(), nullable=False),
+        sa.Column('min_created_dt', UTCDateTime, nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.categories.id']),
+        sa.PrimaryKeyConstraint('category_id', 'year'),
+        schema='categories'
+    )
+    op.execute('''
+        WITH event_stats AS (
+            SELECT category_id, extract(year FROM start_dt)::int AS year, count(*) AS count,
+                   min(created_dt) AS min_created_dt
+            FROM events.events
+            WHERE NOT is_deleted AND category_id IS NOT NULL
+            GROUP BY category_id, year
+        ), contribution_stats AS (
+            SELECT e.category_id, extract(year FROM tte.start_dt)::int AS year, count(*) AS count
+            FROM events.timetable_entries tte
+            JOIN events.events e ON e.id = tte.event_id
+            WHERE tte.type = 2 AND NOT e.is_deleted AND e.category_id IS NOT NULL
+            GROUP BY e.category_id, year
+        ), attachment_stats AS (
+            SELECT e.category_id, extract(year FROM e.start_dt)::int AS year, count(*) AS count
+            FROM attachments.attachments a
+            JOIN attachments.folders f ON f.id = a.folder_id
+            JOIN events.events e ON e.id = f.event_id
+            LEFT JOIN events.sessions s ON s.id = f.session_id
+            LEFT JOIN events.contributions c ON c.id = f.contribution_id
+            LEFT JOIN events.subcontributions sc ON sc.id = f.subcontribution_id
+            LEFT JOIN events.contributions scc ON scc.id = sc.contribution_id
+            WHERE f.link_type != 1 AND NOT a.is_deleted AND NOT f.is_deleted AND NOT e.is_deleted AND
+                  e.category_id IS NOT NULL AND
+                  NOT coalesce(s.is_deleted, c.is_deleted, sc.is_deleted, false) AND
+                  (scc.is_deleted IS NULL OR NOT scc.is_deleted)
+            GROUP BY e.category_id, year
+        )
+        INSERT INTO categories.statistics
+            (category_id, year, event_count, contribution_count, attachment_count, min_created_dt)
+        SELECT category_id, year, coalesce(ev.count, 0), coalesce(co.count, 0), coalesce(att.count, 0),
+               ev.min_created_dt
+        FROM event_stats ev
+        FULL JOIN contribution_stats co USING (category_id, year)
+        FULL JOIN attachment_stats att USING (category_id, year)
+    ''')
+
+
+def downgrade():
+    op.drop_table('statistics', schema='categories')
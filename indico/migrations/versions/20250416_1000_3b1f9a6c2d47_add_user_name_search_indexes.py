@@ -0,0 +1,33 @@
+"""Add user name search indexes
+
+Revision ID: 3b1f9a6c2d47
+Revises: 8d0c5a7e3f21
+Create Date: 2025-04-16 10:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f9a6c2d47'
+down_revision = '8d0c5a7e3f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('''
+        CREATE INDEX ix_users_search_name_unaccent
+        ON users.users
+        USING gin (indico.indico_unaccent(lower(((first_name)::text || ' '::text) || (last_name)::text)) gin_trgm_ops);
+    ''')
+    op.execute('''
+        CREATE INDEX ix_users_search_name_reversed_unaccent
+        ON users.users
+        USING gin (indico.indico_unaccent(lower(((last_name)::text || ' '::text) || (first_name)::text)) gin_trgm_ops);
+    ''')
+
+
+def downgrade():
+    op.drop_index('ix_users_search_name_reversed_unaccent', table_name='users', schema='users')
+    op.drop_index('ix_users_search_name_unaccent', table_name='users', schema='users')
@@ -0,0 +1,27 @@
+"""Add LaTeX hash index to files
+
+Revision ID: 9e4b2c7d1a53
+Revises: 3b1f9a6c2d47
+Create Date: 2025-04-17 10:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b2c7d1a53'
+down_revision = '3b1f9a6c2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('''
+        CREATE INDEX ix_files_latex_hash
+        ON indico.files ((meta ->> 'latex_hash'))
+        WHERE meta ? 'latex_hash';
+    ''')
+
+
+def downgrade():
+    op.drop_index('ix_files_latex_hash', table_name='files', schema='indico')
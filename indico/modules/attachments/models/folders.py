@@ -8,10 +8,11 @@
 from collections import defaultdict
 
 from flask import g
-from sqlalchemy.event import listens_for
+from sqlalchemy.event import listen, listens_for
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declared_attr
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import column_property, joinedload, mapper
+from sqlalchemy.sql import select
 
 from indico.core.db import db
 from indico.core.db.sqlalchemy.links import LinkMixin, LinkType
@@ -229,3 +230,30 @@ def _wrong_attachments_modified(target, value, *unused):
 
 AttachmentFolder.register_link_events()
 AttachmentFolder.register_protection_events()
+
+
+@listens_for(mapper, 'before_configured', once=True)
+def _mappers_configuring():
+    # The effective protection mode of the linked objects is defined in
+    # their own `after_configured` handlers, so we register ours only now
+    # to make sure it runs after them
+    listen(mapper, 'after_configured', _mapper_configured, once=True)
+
+
+def _mapper_configured():
+    # AttachmentFolder.effective_protection_mode -- the effective protection
+    # mode (public/protected) of the folder, even if it's inheriting it from
+    # the object it's linked to
+    query = db.case({ProtectionMode.inheriting.value: AttachmentFolder.get_linked_effective_protection_mode()},
+                    else_=AttachmentFolder.protection_mode, value=AttachmentFolder.protection_mode)
+    AttachmentFolder.effective_protection_mode = column_property(query, deferred=True)
+
+    # Attachment.effective_protection_mode -- the effective protection mode
+    # (public/protected) of the attachment, even if it's inheriting it from
+    # its folder
+    query = (select([db.case({ProtectionMode.inheriting.value: AttachmentFolder.effective_protection_mode},
+                             else_=Attachment.protection_mode, value=Attachment.protection_mode)])
+             .where(AttachmentFolder.id == Attachment.folder_id)
+             .correlate(Attachment)
+             .scalar_subquery())
+    Attachment.effective_protection_mode = column_property(query, deferred=True)
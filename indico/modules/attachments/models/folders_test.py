@@ -5,6 +5,9 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import pytest
+
+from indico.core.db.sqlalchemy.protection import ProtectionMode
 from indico.modules.attachments import AttachmentFolder
 
 
@@ -42,3 +45,28 @@ def test_remove_principal(dummy_user, dummy_event):
     # doesn't do anything but must not fail either
     folder.remove_principal(dummy_user)
     assert not folder.acl_entries
+
+
+@pytest.mark.parametrize(('contrib_pm', 'folder_pm', 'attachment_pm',
+                          'folder_effective_pm', 'attachment_effective_pm'), (
+    (ProtectionMode.inheriting, ProtectionMode.inheriting, ProtectionMode.inheriting,
+     ProtectionMode.protected, ProtectionMode.protected),
+    (ProtectionMode.public, ProtectionMode.inheriting, ProtectionMode.inheriting,
+     ProtectionMode.public, ProtectionMode.public),
+    (ProtectionMode.public, ProtectionMode.protected, ProtectionMode.inheriting,
+     ProtectionMode.protected, ProtectionMode.protected),
+    (ProtectionMode.public, ProtectionMode.protected, ProtectionMode.public,
+     ProtectionMode.protected, ProtectionMode.public),
+    (ProtectionMode.inheriting, ProtectionMode.public, ProtectionMode.protected,
+     ProtectionMode.public, ProtectionMode.protected),
+))
+def test_effective_protection_mode(db, dummy_user, dummy_event, dummy_contribution, create_attachment, contrib_pm,
+                                   folder_pm, attachment_pm, folder_effective_pm, attachment_effective_pm):
+    dummy_event.protection_mode = ProtectionMode.protected
+    dummy_contribution.protection_mode = contrib_pm
+    attachment = create_attachment(dummy_user, dummy_contribution, title='dummy')
+    attachment.folder.protection_mode = folder_pm
+    attachment.protection_mode = attachment_pm
+    db.session.flush()
+    assert attachment.folder.effective_protection_mode == folder_effective_pm
+    assert attachment.effective_protection_mode == attachment_effective_pm
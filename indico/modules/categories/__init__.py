@@ -42,6 +42,83 @@ def _merge_users(target, source, **kwargs):
     CategoryPrincipal.merge_users(target, source, 'category')
 
 
+def _mark_statistics_dirty(*category_ids):
+    from indico.modules.categories.util import mark_category_statistics_dirty
+    for category_id in category_ids:
+        mark_category_statistics_dirty(category_id)
+
+
+@signals.event.created.connect
+@signals.event.deleted.connect
+@signals.event.restored.connect
+@signals.event.imported.connect
+def _event_statistics_changed(event, **kwargs):
+    _mark_statistics_dirty(event.category_id)
+
+
+@signals.event.moved.connect
+def _event_moved_statistics_changed(event, old_parent, **kwargs):
+    _mark_statistics_dirty(event.category_id, old_parent.id if old_parent else None)
+
+
+def _year_changed(changes):
+    if 'start_dt' not in changes:
+        return False
+    old, new = changes['start_dt']
+    return old is None or new is None or old.year != new.year
+
+
+@signals.event.times_changed.connect
+def _times_changed_statistics_changed(sender, obj, changes, **kwargs):
+    # the statistics are grouped by year, so moving things around within the year does not affect them
+    from indico.modules.events.timetable.models.breaks import Break
+    if sender is not Break and _year_changed(changes):
+        _mark_statistics_dirty(obj.event.category_id)
+
+
+@signals.event.timetable_entry_created.connect
+def _timetable_entry_created_statistics_changed(entry, **kwargs):
+    from indico.modules.events.timetable.models.entries import TimetableEntryType
+    if entry.type == TimetableEntryType.CONTRIBUTION:
+        _mark_statistics_dirty(entry.event.category_id)
+
+
+@signals.event.timetable_entry_updated.connect
+def _timetable_entry_updated_statistics_changed(entry, changes, **kwargs):
+    from indico.modules.events.timetable.models.entries import TimetableEntryType
+    if entry.type != TimetableEntryType.BREAK and _year_changed(changes):
+        _mark_statistics_dirty(entry.event.category_id)
+
+
+@signals.event.timetable_entry_deleted.connect
+def _timetable_entry_deleted_statistics_changed(entry, **kwargs):
+    from indico.modules.events.timetable.models.entries import TimetableEntryType
+    if entry.type != TimetableEntryType.BREAK:
+        _mark_statistics_dirty(entry.event.category_id)
+
+
+@signals.event.contribution_deleted.connect
+@signals.event.subcontribution_deleted.connect
+@signals.event.session_deleted.connect
+def _event_contents_statistics_changed(obj, **kwargs):
+    _mark_statistics_dirty(obj.event.category_id)
+
+
+@signals.attachments.attachment_created.connect
+@signals.attachments.attachment_deleted.connect
+@signals.attachments.folder_deleted.connect
+def _attachments_statistics_changed(obj, **kwargs):
+    folder = getattr(obj, 'folder', obj)
+    if event := folder.event:
+        _mark_statistics_dirty(event.category_id)
+
+
+@signals.core.before_commit.connect
+def _before_commit(sender, **kwargs):
+    from indico.modules.categories.util import flush_dirty_category_statistics
+    flush_dirty_category_statistics()
+
+
 def _is_moderation_visible(category):
     return (
         category.event_creation_mode == EventCreationMode.moderated or
@@ -7,10 +7,8 @@
 
 from datetime import date, datetime, time, timedelta
 from enum import Enum, auto
-from functools import partial
 from io import BytesIO
-from itertools import chain, groupby
-from operator import attrgetter, itemgetter
+from operator import itemgetter
 from time import mktime
 
 import dateutil
@@ -36,7 +34,7 @@ from indico.modules.categories.util import get_category_stats, get_upcoming_even
 from indico.modules.categories.views import WPCategory, WPCategoryCalendar
 from indico.modules.events.management.settings import global_event_settings
 from indico.modules.events.models.events import Event
-from indico.modules.events.timetable.util import get_category_timetable
+from indico.modules.events.timetable.util import iter_category_timetable_days
 from indico.modules.news.util import get_recent_news
 from indico.modules.rb.models.locations import Location
 from indico.modules.users import User
@@ -56,10 +54,6 @@ from indico.web.rh import RH, allow_signed_url
 from indico.web.util import jsonify_data
 
 
-def _flat_map(func, list_):
-    return chain.from_iterable(map(func, list_))
-
-
 class RHCategoryIcon(RHDisplayCategoryBase):
     _category_query_options = (undefer('icon'),)
 
@@ -89,12 +83,6 @@ class RHCategoryLogo(RHDisplayCategoryBase):
 class RHCategoryStatisticsJSON(RHDisplayCategoryBase):
     def _process(self):
         stats = get_category_stats(self.category.id)
-        if 'min_year' not in stats:
-            # in case the instance was freshly updated and still has data
-            # cached we need to invalidate it to avoid breaking the page
-            # TODO: remove this in 3.0; by then people had enough time to update to 2.3...
-            get_category_stats.clear_cached(self.category.id)
-            stats = get_category_stats(self.category.id)
         data = {
             'events': stats['events_by_year'],
             'contributions': stats['contribs_by_year'],
@@ -374,10 +362,9 @@ class RHExportCategoryAtom(RHDisplayCategoryBase):
 class RHCategoryOverview(RHDisplayCategoryBase):
     """Display the events for a particular day, week or month."""
 
-    def _get_timetable(self):
-        return get_category_timetable([self.category.id], self.start_dt, self.end_dt,
-                                      detail_level=self.detail, tz=self.category.display_tzinfo,
-                                      from_categ=self.category, grouped=False)
+    def _get_timetable_days(self):
+        return iter_category_timetable_days(self.category, self.start_dt, self.end_dt, detail_level=self.detail,
+                                            tz=self.category.display_tzinfo, user=session.user)
 
     def _process_args(self):
         RHDisplayCategoryBase._process_args(self)
@@ -413,24 +400,26 @@ class RHCategoryOverview(RHDisplayCategoryBase):
             self.end_dt = self.start_dt + relativedelta(months=1)
 
     def _process(self):
-        info = self._get_timetable()
-        events = info['events']
+        tzinfo = self.category.display_tzinfo
+
+        def _event_sort_key(event):
+            # Ongoing events are shown after all other events on the same day and are sorted by start_date
+            ongoing = event.ongoing
+            return (ongoing, -mktime(event.first_occurence_start_dt.timetuple()) if ongoing else event.start_dt.time())
+
+        # Events spanning multiple days appear on all days, using a proxy with the timetable of that day
+        events_by_date = {
+            day: sorted((_EventProxy(event, day, tzinfo, timetable_objects)
+                         for event, timetable_objects in day_events), key=_event_sort_key)
+            for day, day_events in self._get_timetable_days()
+        }
 
         # Only categories with icons are listed in the sidebar
         subcategory_ids = {event.category.effective_icon_data['source_id']
-                           for event in events if event.category.has_effective_icon}
+                           for events in events_by_date.values() for event in events
+                           if event.category.has_effective_icon}
         subcategories = Category.query.filter(Category.id.in_(subcategory_ids)).all()
 
-        # Events spanning multiple days must appear on all days
-        events = _flat_map(partial(self._process_multiday_events, info), events)
-
-        def _event_sort_key(event):
-            # Ongoing events are shown after all other events on the same day and are sorted by start_date
-            ongoing = getattr(event, 'ongoing', False)
-            return (event.start_dt.date(), ongoing,
-                    -mktime(event.first_occurence_start_dt.timetuple()) if ongoing else event.start_dt.time())
-        events = sorted(events, key=_event_sort_key)
-
         params = {
             'detail': self.detail,
             'period': self.period,
@@ -446,14 +435,9 @@ class RHCategoryOverview(RHDisplayCategoryBase):
             'mathjax': True
         }
 
-        if self.detail != 'event':
-            cte = self.category.get_protection_parent_cte()
-            params['accessible_categories'] = {cat_id
-                                               for cat_id, prot_parent_id in db.session.query(cte)
-                                               if prot_parent_id == self.category.id}
-
         if self.period == 'day':
-            return WPCategory.render_template('display/overview/day.html', self.category, events=events, **params)
+            return WPCategory.render_template('display/overview/day.html', self.category,
+                                              events=events_by_date.get(self.start_dt.date(), []), **params)
         elif self.period == 'week':
             days = self._get_week_days()
             template = 'display/overview/week.html'
@@ -463,10 +447,7 @@ class RHCategoryOverview(RHDisplayCategoryBase):
             days = self._get_calendar_days()
             template = 'display/overview/month.html'
 
-        events_by_day = [
-            (day, self._pop_head_while(lambda x: x.start_dt.date() <= day.date(), events))  # noqa: B023
-            for day in days
-        ]
+        events_by_day = [(day, events_by_date.get(day.date(), [])) for day in days]
 
         # Check whether all weekends are empty
         hide_weekend = (not any(map(itemgetter(1), events_by_day[5::7])) and
@@ -499,42 +480,15 @@ class RHCategoryOverview(RHDisplayCategoryBase):
             current_dt = beginning_of_next_day
             beginning_of_next_day = current_dt + relativedelta(days=1)
 
-    @staticmethod
-    def _pop_head_while(predicate, list_):
-        # Pop the head of the list while the predicate is true and return the popped elements
-        res = []
-        while len(list_) and predicate(list_[0]):
-            res.append(list_[0])
-            list_.pop(0)
-        return res
-
     def _other_day_url(self, date):
         return url_for('.overview', self.category, detail=self.detail, period=self.period,
                        date=format_date(date, 'yyyy-MM-dd'))
 
-    def _process_multiday_events(self, info, event):
-        # Add "fake" proxy events for events spanning multiple days such that there is one event per day
-        # Function type: Event -> List[Event]
-        tzinfo = self.category.display_tzinfo
-
-        # Breaks, contributions and sessions grouped by start_dt. Each EventProxy will return the relevant ones only
-        timetable_objects = sorted(chain(*list(info[event.id].values())), key=attrgetter('timetable_entry.start_dt'))
-        timetable_objects_by_date = {x[0]: list(x[1]) for x
-                                     in groupby(timetable_objects, key=lambda x: x.start_dt.astimezone(tzinfo).date())}
-
-        # All the days of the event shown in the overview
-        event_days = self._get_days(max(self.start_dt, event.start_dt.astimezone(tzinfo)),
-                                    min(self.end_dt, event.end_dt.astimezone(tzinfo)))
-
-        # Generate a proxy object with adjusted start_dt and timetable_objects for each day
-        return [_EventProxy(event, day, tzinfo, timetable_objects_by_date.get(day.date(), [])) for day in event_days]
-
 
 class _EventProxy:
     def __init__(self, event, date, tzinfo, timetable_objects):
         start_dt = datetime.combine(date, event.start_dt.astimezone(tzinfo).timetz())
-        assert date >= event.start_dt
-        assert date <= event.end_dt
+        assert event.start_dt.astimezone(tzinfo).date() <= date <= event.end_dt.astimezone(tzinfo).date()
         object.__setattr__(self, '_start_dt', start_dt)
         object.__setattr__(self, '_real_event', event)
         object.__setattr__(self, '_event_tz_start_date', event.start_dt.astimezone(tzinfo).date())
@@ -5,14 +5,17 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import itertools
+
 import pytz
 from flask import session
-from sqlalchemy import DDL, orm
+from sqlalchemy import DDL, inspect, orm
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB, array
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import column_property
+from sqlalchemy.orm import column_property, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import exists, func, literal, select
 
 from indico.core import signals
@@ -21,7 +24,7 @@ from indico.core.db import db
 from indico.core.db.sqlalchemy import PyIntEnum
 from indico.core.db.sqlalchemy.attachments import AttachedItemsMixin
 from indico.core.db.sqlalchemy.descriptions import DescriptionMixin, RenderMode
-from indico.core.db.sqlalchemy.protection import ProtectionManagersMixin, ProtectionMode
+from indico.core.db.sqlalchemy.protection import ProtectionManagersMixin, ProtectionMode, apply_acl_entry_strategy
 from indico.core.db.sqlalchemy.searchable import SearchableTitleMixin
 from indico.core.db.sqlalchemy.util.models import auto_table_args
 from indico.modules.logs.models.entries import CategoryLogEntry, CategoryLogRealm, LogKind
@@ -311,6 +314,26 @@ class Category(SearchableTitleMixin, DescriptionMixin, ProtectionManagersMixin,
     def protection_parent(self):
         return self.parent if not self.is_root else None
 
+    @classmethod
+    def _preload_access_data(cls, categories):
+        # load the whole parent chains at once instead of going up one level at a time
+        from indico.modules.categories.models.principals import CategoryPrincipal
+        if not (ids := {c.id for c in categories
+                        if c.id is not None and {'acl_entries', 'parent'} & inspect(c).unloaded}):
+            return ()
+        chain_ids = set(itertools.chain.from_iterable(
+            chain for chain, in db.session.query(cls.chain_ids).filter(cls.id.in_(ids))
+        ))
+        chain = {c.id: c for c in (cls.query
+                                   .filter(cls.id.in_(chain_ids))
+                                   .options(apply_acl_entry_strategy(selectinload(cls.acl_entries),
+                                                                     CategoryPrincipal)))}
+        # the session only keeps weak references, so we link the parents to keep them
+        # alive (and avoid lazy-loading them) while checking access
+        for category in chain.values():
+            set_committed_value(category, 'parent', chain.get(category.parent_id))
+        return {c.protection_parent for c in categories}
+
     @locator_property
     def locator(self):
         return {'category_id': self.id}
@@ -0,0 +1,61 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from indico.core.db import db
+from indico.core.db.sqlalchemy import UTCDateTime
+from indico.util.string import format_repr
+
+
+class CategoryStatistics(db.Model):
+    """Materialized statistics of the events in a category.
+
+    Each row contains the numbers for one year and only covers the
+    events directly inside the category.  The statistics of a category
+    including its subcategories are obtained by summing up the rows of
+    all categories in its subtree.
+    """
+
+    __tablename__ = 'statistics'
+    __table_args__ = {'schema': 'categories'}
+
+    category_id = db.Column(
+        db.Integer,
+        db.ForeignKey('categories.categories.id'),
+        primary_key=True,
+        autoincrement=False
+    )
+    year = db.Column(
+        db.Integer,
+        primary_key=True,
+        autoincrement=False
+    )
+    #: The number of events starting in the year
+    event_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+    #: The number of contributions scheduled in the year
+    contribution_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+    #: The number of attachments in events starting in the year
+    attachment_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+    #: The creation date of the oldest event starting in the year
+    min_created_dt = db.Column(
+        UTCDateTime,
+        nullable=True
+    )
+
+    def __repr__(self):
+        return format_repr(self, 'category_id', 'year')
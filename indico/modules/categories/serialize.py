@@ -6,18 +6,56 @@
 # LICENSE file for more details.
 
 from io import BytesIO
+from itertools import batched
 
 from feedgen.feed import FeedGenerator
 from flask import session
 from sqlalchemy.orm import joinedload, load_only, subqueryload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 
+from indico.core.db.sqlalchemy.protection import clear_access_cache
 from indico.modules.categories import Category
 from indico.modules.events import Event
-from indico.modules.events.ical import events_to_ical
+from indico.modules.events.ical import events_to_ical, iter_events_ical
 from indico.modules.events.settings import event_contact_settings
 from indico.util.string import sanitize_html
 
 
+def _get_ical_events_query(category_ids, event_filter):
+    own_room_strategy = joinedload('own_room')
+    own_room_strategy.load_only('location_id', 'site', 'building', 'floor', 'number', 'verbose_name')
+    own_room_strategy.lazyload('owner')
+    own_venue_strategy = joinedload('own_venue').load_only('name')
+    return (Event.query
+            .filter(Event.category_chain_overlaps(category_ids),
+                    ~Event.is_deleted,
+                    event_filter)
+            .options(load_only('id', 'category_id', 'start_dt', 'end_dt', 'title', 'description', 'own_venue_name',
+                               'own_room_name', 'protection_mode', 'access_key', 'label_id', 'logo_metadata',
+                               'effective_protection_mode'),
+                     subqueryload('acl_entries'),
+                     subqueryload('vc_room_associations'),
+                     joinedload('person_links'),
+                     own_room_strategy,
+                     own_venue_strategy)
+            .order_by(Event.start_dt))
+
+
+def _preload_ical_data(events):
+    # avoid query spam from accessing contact names/emails
+    event_contact_settings.preload_bulk({e.id for e in events})
+    # load the parent categories at once to avoid query spam from `protection_parent`
+    # lookups. sqlalchemy's identity map only keeps weak references, so we link them to
+    # the events (and their parents) right away to keep them around while serializing
+    categories = {c.id: c for c in (Category._get_chain_query(Category.id.in_({e.category_id for e in events}))
+                                    .options(load_only('id', 'parent_id', 'protection_mode'),
+                                             joinedload('acl_entries')))}
+    for category in categories.values():
+        set_committed_value(category, 'parent', categories.get(category.parent_id))
+    for event in events:
+        set_committed_value(event, 'category', categories[event.category_id])
+
+
 def serialize_categories_ical(category_ids, user, event_filter=True, event_filter_fn=None, update_query=None):
     """Export the events in a category to iCal.
 
@@ -30,41 +68,48 @@ def serialize_categories_ical(category_ids, user, event_filter=True, event_filte
     :param update_query: A callable that can update the query used to retrieve the events.
                          Must return the updated query object.
     """
-    own_room_strategy = joinedload('own_room')
-    own_room_strategy.load_only('location_id', 'site', 'building', 'floor', 'number', 'verbose_name')
-    own_room_strategy.lazyload('owner')
-    own_venue_strategy = joinedload('own_venue').load_only('name')
-    query = (Event.query
-             .filter(Event.category_chain_overlaps(category_ids),
-                     ~Event.is_deleted,
-                     event_filter)
-             .options(load_only('id', 'category_id', 'start_dt', 'end_dt', 'title', 'description', 'own_venue_name',
-                                'own_room_name', 'protection_mode', 'access_key', 'label_id', 'logo_metadata',
-                                'effective_protection_mode'),
-                      subqueryload('acl_entries'),
-                      subqueryload('vc_room_associations'),
-                      joinedload('person_links'),
-                      own_room_strategy,
-                      own_venue_strategy)
-             .order_by(Event.start_dt))
+    query = _get_ical_events_query(category_ids, event_filter)
     if update_query:
         query = update_query(query)
     it = iter(query)
     if event_filter_fn:
         it = filter(event_filter_fn, it)
     events = list(it)
-    # avoid query spam from accessing contact names/emails
-    event_contact_settings.preload_bulk({e.id for e in events})
-    # make sure the parent categories are in sqlalchemy's identity cache.
-    # this avoids query spam from `protection_parent` lookups
-    _parent_categs = (Category._get_chain_query(Category.id.in_({e.category_id for e in events}))  # noqa: F841,RUF100
-                      .options(load_only('id', 'parent_id', 'protection_mode'),
-                               joinedload('acl_entries'))
-                      .all())
-
+    _preload_ical_data(events)
     return BytesIO(events_to_ical(events, user))
 
 
+def iter_categories_ical(category_ids, user, event_filter=True, event_filter_fn=None, update_query=None,
+                         chunk_size=500):
+    """Export the events in a category to iCal incrementally.
+
+    This takes the same arguments as :func:`serialize_categories_ical`,
+    but only loads the IDs of all events at once.  The events themselves
+    are loaded and serialized in chunks so the memory usage does not
+    depend on the number of events.
+
+    :param chunk_size: The number of events to load at once
+    """
+    query = Event.query.filter(Event.category_chain_overlaps(category_ids), ~Event.is_deleted, event_filter)
+    query = query.order_by(Event.start_dt)
+    if update_query:
+        query = update_query(query)
+    event_ids = [id_ for id_, in query.with_entities(Event.id)]
+
+    def _iter_events():
+        for chunk in batched(event_ids, chunk_size):
+            events = {e.id: e for e in _get_ical_events_query(category_ids, event_filter).filter(Event.id.in_(chunk))}
+            events = [events[id_] for id_ in chunk if id_ in events]
+            if event_filter_fn:
+                events = list(filter(event_filter_fn, events))
+            _preload_ical_data(events)
+            yield from events
+            # the cached access checks would keep the events of all chunks in memory
+            clear_access_cache()
+
+    return iter_events_ical(_iter_events(), user)
+
+
 def serialize_category_atom(category, url, user, event_filter):
     """Export the events in a category to Atom.
 
@@ -6,6 +6,7 @@
 # LICENSE file for more details.
 
 from datetime import timedelta
+from itertools import batched
 
 from celery.schedules import crontab
 
@@ -17,11 +18,21 @@ from indico.modules.users import User, UserSetting
 from indico.modules.users.models.suggestions import SuggestedCategory
 from indico.modules.users.util import get_related_categories
 from indico.util.date_time import now_utc
-from indico.util.suggestions import get_category_scores
+from indico.util.suggestions import get_category_scores_for_users
 
 
 # Minimum score for a category to be suggested
 SUGGESTION_MIN_SCORE = 0.25
+# Number of users whose suggestions are calculated at once
+SUGGESTION_BATCH_SIZE = 100
+
+
+def _get_suggestions_disabled_category_ids():
+    disabled = [id_ for id_, in db.session.query(Category.id).filter(Category.suggestions_disabled)]
+    if not disabled:
+        return set()
+    cte = Category.get_subtree_ids_cte(disabled)
+    return {id_ for id_, in db.session.query(cte.c.id)}
 
 
 @celery.periodic_task(name='category_suggestions', run_every=crontab(minute='0', hour='7'))
@@ -30,20 +41,22 @@ def category_suggestions():
              .filter(~User.is_deleted,
                      User._all_settings.any(db.and_(UserSetting.module == 'users',
                                                     UserSetting.name == 'suggest_categories',
-                                                    db.cast(UserSetting.value, db.String) == 'true'))))
-    for user in users:
-        existing = {x.category: x for x in user.suggested_categories}
-        related = set(get_related_categories(user, detailed=False))
-        for category, score in get_category_scores(user).items():
-            if score < SUGGESTION_MIN_SCORE:
-                continue
-            if (category in related or category.is_deleted or category.suggestions_disabled or
-                    any(p.suggestions_disabled for p in category.parent_chain_query)):
-                continue
-            logger.debug('Suggesting %s with score %.03f for %s', category, score, user)
-            suggestion = existing.get(category) or SuggestedCategory(category=category, user=user)
-            suggestion.score = score
-        user.settings.set('suggest_categories', False)
+                                                    db.cast(UserSetting.value, db.String) == 'true')))
+             .order_by(User.id))
+    disabled_ids = _get_suggestions_disabled_category_ids()
+    for user_batch in batched(users, SUGGESTION_BATCH_SIZE):
+        for user, scores in get_category_scores_for_users(user_batch).items():
+            existing = {x.category: x for x in user.suggested_categories}
+            related = set(get_related_categories(user, detailed=False))
+            for category, score in scores.items():
+                if score < SUGGESTION_MIN_SCORE:
+                    continue
+                if category in related or category.is_deleted or category.id in disabled_ids:
+                    continue
+                logger.debug('Suggesting %s with score %.03f for %s', category, score, user)
+                suggestion = existing.get(category) or SuggestedCategory(category=category, user=user)
+                suggestion.score = score
+            user.settings.set('suggest_categories', False)
         db.session.commit()
 
 
@@ -73,3 +86,12 @@ def category_cleanup():
             if i % 100 == 0:
                 db.session.commit()
         db.session.commit()
+
+
+@celery.periodic_task(name='category_statistics', run_every=crontab(minute='30', hour='4', day_of_week='sun'))
+def category_statistics():
+    # the statistics are updated whenever something changes, but rebuilding them now and then
+    # makes sure that changes which did not trigger any signal do not go unnoticed forever
+    from indico.modules.categories.util import rebuild_category_statistics
+    rebuild_category_statistics()
+    db.session.commit()
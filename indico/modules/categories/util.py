@@ -5,8 +5,10 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from collections import defaultdict
 from datetime import date, timedelta
 
+from flask import g, has_app_context
 from pytz import timezone
 from sqlalchemy.orm import load_only
 from sqlalchemy.orm.attributes import set_committed_value
@@ -17,7 +19,8 @@ from indico.core.db.sqlalchemy.links import LinkType
 from indico.core.db.sqlalchemy.protection import ProtectionMode
 from indico.modules.attachments import Attachment
 from indico.modules.attachments.models.folders import AttachmentFolder
-from indico.modules.categories import upcoming_events_settings
+from indico.modules.categories import Category, upcoming_events_settings
+from indico.modules.categories.models.statistics import CategoryStatistics
 from indico.modules.events import Event
 from indico.modules.events.contributions import Contribution
 from indico.modules.events.contributions.models.subcontributions import SubContribution
@@ -31,68 +34,39 @@ from indico.util.iterables import materialize_iterable
 from indico.util.signals import make_interceptable
 
 
-def get_events_by_year(category_id=None):
-    """Get the number of events for each year.
+def _calculate_statistics(category_filter):
+    """Calculate the statistics of the events matching a filter.
 
-    :param category_id: The category ID to get statistics for. Events
-                        from subcategories are also included.
-    :return: A dictionary mapping years to event counts.
+    :param category_filter: A filter criterion for `Event`
+    :return: A dict mapping ``(category_id, year)`` tuples to dicts
+             containing the statistics of the events in that category
+             and year.
     """
-    category_filter = Event.category_chain_overlaps(category_id) if category_id else True
+    stats = defaultdict(lambda: {'event_count': 0, 'contribution_count': 0, 'attachment_count': 0,
+                                 'min_created_dt': None})
+    event_year = db.cast(db.extract('year', Event.start_dt), db.Integer).label('year')
     query = (db.session
-             .query(db.cast(db.extract('year', Event.start_dt), db.Integer).label('year'),
-                    db.func.count())
+             .query(Event.category_id, event_year, db.func.count(), db.func.min(Event.created_dt))
              .filter(~Event.is_deleted,
                      category_filter)
-             .order_by('year')
-             .group_by('year'))
-    return dict(query)
-
-
-def get_contribs_by_year(category_id=None):
-    """Get the number of contributions for each year.
+             .group_by(Event.category_id, 'year'))
+    for category_id, year, count, min_created_dt in query:
+        stats[(category_id, year)].update(event_count=count, min_created_dt=min_created_dt)
 
-    :param category_id: The category ID to get statistics for.
-                        Contributions from subcategories are also
-                        included.
-    :return: A dictionary mapping years to contribution counts.
-    """
-    category_filter = Event.category_chain_overlaps(category_id) if category_id else True
     query = (db.session
-             .query(db.cast(db.extract('year', TimetableEntry.start_dt), db.Integer).label('year'),
+             .query(Event.category_id, db.cast(db.extract('year', TimetableEntry.start_dt), db.Integer).label('year'),
                     db.func.count())
              .join(TimetableEntry.event)
              .filter(TimetableEntry.type == TimetableEntryType.CONTRIBUTION,
                      ~Event.is_deleted,
                      category_filter)
-             .order_by('year')
-             .group_by('year'))
-    return dict(query)
-
-
-def get_min_year(category_id=None):
-    """Get the min year.
-
-    :param category_id: The category ID to get statistics for.
-    :return: The year.
-    """
-    category_filter = Event.category_chain_overlaps(category_id) if category_id else True
-    min_dt = db.session.query(db.func.min(Event.created_dt)).filter(~Event.is_deleted, category_filter).scalar()
-    return min_dt.year if min_dt else date.today().year
-
-
-def get_attachment_count(category_id=None):
-    """Get the number of attachments in events in a category.
+             .group_by(Event.category_id, 'year'))
+    for category_id, year, count in query:
+        stats[(category_id, year)]['contribution_count'] = count
 
-    :param category_id: The category ID to get statistics for.
-                        Attachments from subcategories are also
-                        included.
-    :return: The number of attachments
-    """
-    category_filter = Event.category_chain_overlaps(category_id) if category_id else True
     subcontrib_contrib = db.aliased(Contribution)
     query = (db.session
-             .query(db.func.count(Attachment.id))
+             .query(Event.category_id, event_year, db.func.count(Attachment.id))
              .join(Attachment.folder)
              .join(AttachmentFolder.event)
              .outerjoin(AttachmentFolder.session)
@@ -107,25 +81,116 @@ def get_attachment_count(category_id=None):
                      ~db.func.coalesce(Session.is_deleted, Contribution.is_deleted, SubContribution.is_deleted, False),
                      # in case of a subcontribution we also need to check that the contrib is not deleted
                      (subcontrib_contrib.is_deleted.is_(None) | ~subcontrib_contrib.is_deleted),
-                     category_filter))
-    return query.scalar()
+                     category_filter)
+             .group_by(Event.category_id, 'year'))
+    for category_id, year, count in query:
+        stats[(category_id, year)]['attachment_count'] = count
+    return stats
+
+
+def refresh_category_statistics(category_ids):
+    """Recalculate the materialized statistics of some categories.
+
+    Only events directly inside the categories are taken into account,
+    so this is cheap even for categories with many subcategories.
+
+    :param category_ids: The IDs of the categories to refresh
+    """
+    category_ids = set(category_ids)
+    if not category_ids:
+        return
+    # concurrent transactions refreshing the same category would otherwise both insert
+    # new rows after deleting the old ones. locking in a consistent order avoids deadlocks
+    lock_key = db.func.hashtext('categories.statistics')
+    for category_id in sorted(category_ids):
+        db.session.execute(db.select([db.func.pg_advisory_xact_lock(lock_key, category_id)]))
+    CategoryStatistics.query.filter(CategoryStatistics.category_id.in_(category_ids)).delete(synchronize_session=False)
+    _store_statistics(_calculate_statistics(Event.category_id.in_(category_ids)))
+
+
+def rebuild_category_statistics():
+    """Recalculate the materialized statistics of all categories."""
+    # wait for transactions refreshing some categories and block new ones until we are done
+    db.session.execute(db.text('LOCK TABLE categories.statistics IN SHARE ROW EXCLUSIVE MODE'))
+    CategoryStatistics.query.delete(synchronize_session=False)
+    _store_statistics(_calculate_statistics(Event.category_id.isnot(None)))
+
+
+def _store_statistics(stats):
+    if stats:
+        db.session.execute(CategoryStatistics.__table__.insert(),
+                           [{'category_id': category_id, 'year': year, **data}
+                            for (category_id, year), data in stats.items()])
+
+
+def _get_dirty_statistics():
+    try:
+        return g.category_statistics_dirty
+    except AttributeError:
+        g.category_statistics_dirty = dirty = set()
+        return dirty
+
+
+def mark_category_statistics_dirty(category_id):
+    """Mark the statistics of a category as changed.
+
+    The statistics are refreshed right before the transaction is
+    committed, so they are always consistent with the events.
+    """
+    if category_id is not None and has_app_context():
+        _get_dirty_statistics().add(category_id)
+
+
+def flush_dirty_category_statistics():
+    """Refresh the statistics of all categories marked as changed."""
+    if not has_app_context():
+        return
+    if dirty := g.pop('category_statistics_dirty', None):
+        refresh_category_statistics(dirty)
 
 
-@memoize_redis(86400)
 def get_category_stats(category_id=None):
     """Get category statistics.
 
-    This function is mainly a helper so we can get and cache
-    all values at once and keep a last-update timestamp.
+    The statistics are taken from the materialized per-category
+    statistics, which are kept up to date whenever events or their
+    contents change.
 
     :param category_id: The category ID to get statistics for.
-                        Subcategories are also included.
+                        Subcategories are also included.  If omitted
+                        (or in case of the root category), all events
+                        are included, even unlisted ones.
     """
-    return {'events_by_year': get_events_by_year(category_id),
-            'contribs_by_year': get_contribs_by_year(category_id),
-            'attachments': get_attachment_count(category_id),
+    query = (db.session
+             .query(CategoryStatistics.year,
+                    db.func.sum(CategoryStatistics.event_count),
+                    db.func.sum(CategoryStatistics.contribution_count),
+                    db.func.sum(CategoryStatistics.attachment_count),
+                    db.func.min(CategoryStatistics.min_created_dt))
+             .group_by(CategoryStatistics.year))
+    if category_id:
+        cte = Category.get_subtree_ids_cte([category_id])
+        query = query.filter(CategoryStatistics.category_id == cte.c.id)
+    rows = [(year, int(events), int(contribs), int(attachments), min_created_dt)
+            for year, events, contribs, attachments, min_created_dt in query]
+    if not category_id:
+        # unlisted events do not belong to any category, so they are not materialized
+        rows += [(year, data['event_count'], data['contribution_count'], data['attachment_count'],
+                  data['min_created_dt'])
+                 for (__, year), data in _calculate_statistics(Event.category_id.is_(None)).items()]
+    events_by_year = defaultdict(int)
+    contribs_by_year = defaultdict(int)
+    for year, events, contribs, __, __ in rows:
+        if events:
+            events_by_year[year] += events
+        if contribs:
+            contribs_by_year[year] += contribs
+    min_dt = min((row[4] for row in rows if row[4] is not None), default=None)
+    return {'events_by_year': dict(sorted(events_by_year.items())),
+            'contribs_by_year': dict(sorted(contribs_by_year.items())),
+            'attachments': sum(row[3] for row in rows),
             'updated': now_utc(),
-            'min_year': get_min_year(category_id)}
+            'min_year': min_dt.year if min_dt else date.today().year}
 
 
 @memoize_redis(3600)
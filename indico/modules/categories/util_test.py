@@ -5,9 +5,14 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from datetime import datetime
+
 import pytest
+import pytz
 
-from indico.modules.categories.util import can_create_unlisted_events
+from indico.modules.categories.util import (can_create_unlisted_events, flush_dirty_category_statistics,
+                                            get_category_stats, mark_category_statistics_dirty,
+                                            rebuild_category_statistics)
 from indico.modules.events.settings import unlisted_events_settings
 
 
@@ -26,3 +31,28 @@ def test_can_create_unlisted_events(dummy_user, create_user):
     unlisted_events_settings.acls.set('authorized_creators', {dummy_user})
     assert can_create_unlisted_events(dummy_user)
     assert can_create_unlisted_events(admin_user)
+
+
+@pytest.mark.usefixtures('db')
+def test_category_stats(create_category, create_event):
+    parent = create_category(1, title='Parent')
+    child = create_category(2, title='Child', parent=parent)
+    other = create_category(3, title='Other')
+    create_event(start_dt=datetime(2023, 1, 1, 10, tzinfo=pytz.utc), category=parent)
+    create_event(start_dt=datetime(2024, 1, 1, 10, tzinfo=pytz.utc), category=child)
+    create_event(start_dt=datetime(2024, 2, 1, 10, tzinfo=pytz.utc), category=other)
+    rebuild_category_statistics()
+    assert get_category_stats(parent.id)['events_by_year'] == {2023: 1, 2024: 1}
+    assert get_category_stats(child.id)['events_by_year'] == {2024: 1}
+    assert get_category_stats(other.id)['events_by_year'] == {2024: 1}
+    # statistics are only refreshed for categories marked as dirty
+    event = create_event(start_dt=datetime(2025, 1, 1, 10, tzinfo=pytz.utc), category=child)
+    assert get_category_stats(parent.id)['events_by_year'] == {2023: 1, 2024: 1}
+    mark_category_statistics_dirty(child.id)
+    flush_dirty_category_statistics()
+    assert get_category_stats(parent.id)['events_by_year'] == {2023: 1, 2024: 1, 2025: 1}
+    event.is_deleted = True
+    mark_category_statistics_dirty(child.id)
+    flush_dirty_category_statistics()
+    assert get_category_stats(parent.id)['events_by_year'] == {2023: 1, 2024: 1}
+    assert get_category_stats(child.id)['events_by_year'] == {2024: 1}
@@ -27,6 +27,11 @@ from indico.web.menu import SideMenuItem
 logger = Logger.get('events.abstracts')
 
 
+@signals.core.import_tasks.connect
+def _import_tasks(sender, **kwargs):
+    import indico.modules.events.abstracts.tasks  # noqa: F401
+
+
 @signals.event.updated.connect
 @signals.event.contribution_created.connect
 @signals.event.contribution_updated.connect
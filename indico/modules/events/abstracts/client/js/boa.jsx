@@ -5,6 +5,7 @@
 // modify it under the terms of the MIT License; see the
 // LICENSE file for more details.
 
+import boaStatusURL from 'indico-url:abstracts.export_boa_status';
 import customBOAURL from 'indico-url:abstracts.manage_custom_boa';
 import uploadBOAFileURL from 'indico-url:abstracts.upload_boa_file';
 
@@ -177,3 +178,28 @@ document.addEventListener('DOMContentLoaded', () => {
     container
   );
 });
+
+document.addEventListener('DOMContentLoaded', () => {
+  const container = document.querySelector('#boa-generation');
+  if (!container) {
+    return;
+  }
+  const {eventId, taskId, downloadUrl} = container.dataset;
+
+  async function poll() {
+    let res;
+    try {
+      res = await indicoAxios.get(boaStatusURL({event_id: eventId, task_id: taskId}));
+    } catch (error) {
+      handleAxiosError(error);
+      return;
+    }
+    if (res.data.ready) {
+      window.location.href = downloadUrl;
+    } else {
+      setTimeout(poll, 3000);
+    }
+  }
+
+  poll();
+});
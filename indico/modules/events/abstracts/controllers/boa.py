@@ -7,14 +7,18 @@
 
 import os
 
-from flask import flash, request, session
+from flask import flash, jsonify, request, session
 from werkzeug.exceptions import NotFound
 
+from indico.core.celery import AsyncResult
 from indico.core.config import config
+from indico.core.errors import IndicoError
 from indico.modules.events.abstracts.controllers.base import RHAbstractsBase, RHManageAbstractsBase
 from indico.modules.events.abstracts.forms import BOASettingsForm
 from indico.modules.events.abstracts.settings import boa_settings
-from indico.modules.events.abstracts.util import clear_boa_cache, create_boa, create_boa_tex
+from indico.modules.events.abstracts.util import (clear_boa_cache, create_boa_async, create_boa_tex, get_cached_boa,
+                                                  is_boa_task)
+from indico.modules.events.abstracts.views import WPDisplayBookOfAbstracts
 from indico.modules.events.contributions import contribution_settings
 from indico.modules.files.controllers import UploadFileMixin
 from indico.modules.logs.models.entries import EventLogRealm, LogKind
@@ -92,13 +96,43 @@ class RHExportBOA(RHAbstractsBase):
             config.LATEX_ENABLED and
             self.event.can_manage(session.user, permission='abstracts')
         ):
-            return send_file('book-of-abstracts.pdf', create_boa(self.event), 'application/pdf')
+            return self._send_latex_boa()
         if self.event.has_custom_boa:
             return self.event.custom_boa.send()
         elif config.LATEX_ENABLED:
-            return send_file('book-of-abstracts.pdf', create_boa(self.event), 'application/pdf')
+            return self._send_latex_boa()
         raise NotFound
 
+    def _send_latex_boa(self):
+        if (file := get_cached_boa(self.event)) is not None:
+            return file.storage.send_file(file.storage_file_id, 'application/pdf', 'book-of-abstracts.pdf')
+        # generating the book of abstracts may take a long time, so we do it in the
+        # background and reload this page once it's available
+        task_id = create_boa_async(self.event, session.user)
+        return WPDisplayBookOfAbstracts.render_template('display/boa_generating.html', self.event,
+                                                        task_id=task_id, download_url=request.url)
+
+
+class RHExportBOAStatus(RHAbstractsBase):
+    """Check whether the book of abstracts has been generated."""
+
+    def _check_access(self):
+        RHExportBOA._check_access(self)
+
+    def _process(self):
+        if get_cached_boa(self.event) is not None:
+            return jsonify(ready=True)
+        task_id = request.view_args['task_id']
+        if not is_boa_task(self.event, task_id):
+            raise NotFound
+        res = AsyncResult(task_id)
+        if not res.ready():
+            return jsonify(ready=False)
+        elif res.failed():
+            raise IndicoError(_('Book of Abstracts generation failed'))
+        # the book of abstracts has been invalidated in the meantime; downloading it starts a new task
+        return jsonify(ready=True)
+
 
 class RHExportBOATeX(RHManageAbstractsBase):
     """Export a zip file with the book of abstracts in TeX format."""
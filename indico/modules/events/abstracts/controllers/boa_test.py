@@ -0,0 +1,42 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import pytest
+
+from indico.core.cache import ScopedCache
+from indico.modules.events.abstracts import util
+from indico.modules.events.abstracts.util import create_boa_async, forget_boa_task
+from indico.modules.events.features.util import set_feature_enabled
+
+
+@pytest.fixture
+def boa_tasks_cache(monkeypatch, memory_cache):
+    monkeypatch.setattr(util, '_boa_tasks_cache', ScopedCache(memory_cache, 'boa-tasks'))
+
+
+@pytest.mark.usefixtures('boa_tasks_cache')
+def test_boa_status(mocker, test_client, dummy_event, dummy_user):
+    mocker.patch('indico.modules.events.abstracts.tasks.generate_boa.apply_async')
+    result = mocker.patch('indico.modules.events.abstracts.controllers.boa.AsyncResult').return_value
+    set_feature_enabled(dummy_event, 'abstracts', True)
+    task_id = create_boa_async(dummy_event, dummy_user)
+    url = f'/event/{dummy_event.id}/book-of-abstracts/{task_id}'
+    result.ready.return_value = False
+    resp = test_client.get(url)
+    assert resp.status_code == 200
+    assert resp.json == {'ready': False}
+    # the task is forgotten once it finished, but its result is still checked
+    forget_boa_task(dummy_event)
+    result.ready.return_value = True
+    result.failed.return_value = True
+    assert test_client.get(url).status_code == 500
+    result.failed.return_value = False
+    resp = test_client.get(url)
+    assert resp.status_code == 200
+    assert resp.json == {'ready': True}
+    # tasks of other events cannot be checked
+    assert test_client.get(f'/event/{dummy_event.id}/book-of-abstracts/something-else').status_code == 404
@@ -100,6 +100,10 @@ class BOASettingsForm(IndicoForm):
     min_lines_per_abstract = IntegerField(_('Minimum lines per abstract'),
                                           description=_('Minimum lines to reserve per abstract.'))
     link_format = IndicoEnumSelectField(_('Link formatting'), [DataRequired()], enum=BOALinkFormat, sorted=True)
+    chunked = BooleanField(_('Compile separately'), widget=SwitchWidget(),
+                           description=_('Compile each abstract on its own, which is much faster for large books. '
+                                         'Every abstract starts on a new page, the minimum lines per abstract are '
+                                         'ignored and links inside the abstracts are not preserved.'))
 
 
 class AbstractSubmissionSettingsForm(IndicoForm):
@@ -147,10 +147,11 @@ boa_settings = EventSettingsProxy('abstracts_book', {
     'sort_by': BOASortField.id,
     'corresponding_author': BOACorrespondingAuthorType.submitter,
     'show_abstract_ids': False,
-    'cache_path': None,
+    'cache_file_id': None,
     'cache_path_tex': None,
     'min_lines_per_abstract': 0,
     'link_format': BOALinkFormat.frame,
+    'chunked': False,
 }, converters={
     'sort_by': EnumConverter(BOASortField),
     'corresponding_author': EnumConverter(BOACorrespondingAuthorType),
@@ -0,0 +1,26 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from flask import session
+
+from indico.core.celery import celery
+from indico.core.db import db
+from indico.modules.events.abstracts import logger
+from indico.modules.events.abstracts.util import create_boa, forget_boa_task
+
+
+@celery.task(name='generate_boa', ignore_result=False, request_context=True)
+def generate_boa(event, user):
+    """Create the book of abstracts of an event in the background."""
+    session.set_session_user(user)
+    try:
+        logger.info('Generating book of abstracts for %r', event)
+        file = create_boa(event)
+        db.session.commit()
+        return file.id
+    finally:
+        forget_boa_task(event)
@@ -5,14 +5,13 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
-import errno
 import itertools
-import os
-import shutil
 from collections import defaultdict, namedtuple
+from uuid import uuid4
 
 from sqlalchemy.orm import contains_eager, joinedload, load_only, noload
 
+from indico.core.cache import make_scoped_cache
 from indico.core.config import config
 from indico.core.db import db
 from indico.core.db.sqlalchemy.util.session import no_autoflush
@@ -28,12 +27,16 @@ from indico.modules.events.contributions.models.fields import ContributionFieldV
 from indico.modules.events.models.persons import EventPerson
 from indico.modules.events.tracks.models.principals import TrackPrincipal
 from indico.modules.events.tracks.models.tracks import Track
+from indico.modules.files.models.files import File
 from indico.util.i18n import force_locale
 from indico.util.spreadsheets import unique_col
 from indico.util.string import format_email_with_name
 from indico.web.flask.templating import get_template_module
 
 
+_boa_tasks_cache = make_scoped_cache('boa-tasks')
+
+
 def build_default_email_template(event, tpl_type):
     """
     Build a default e-mail template based on a notification type
@@ -308,26 +311,59 @@ def get_track_reviewer_abstract_counts(event, user):
             for track, total, reviewed, unreviewed in query}
 
 
+def get_cached_boa(event):
+    """Get the book of abstracts if it has already been generated.
+
+    :return: The :class:`.File` containing the PDF or ``None``
+    """
+    file_id = boa_settings.get(event, 'cache_file_id')
+    return File.get(file_id) if file_id is not None else None
+
+
 def create_boa(event):
     """Create the book of abstracts if necessary.
 
-    :return: The path to the PDF file
+    :return: The :class:`.File` containing the PDF
     """
-    path = boa_settings.get(event, 'cache_path')
-    if path:
-        path = os.path.join(config.CACHE_DIR, path)
-        if os.path.exists(path):
-            # update file mtime so it's not deleted during cache cleanup
-            os.utime(path, None)
-            return path
+    if (file := get_cached_boa(event)) is not None:
+        return file
     with force_locale(config.DEFAULT_LOCALE):
-        pdf = AbstractBook(event)
-        tmp_path = pdf.generate()
-    filename = f'boa-{event.id}.pdf'
-    full_path = os.path.join(config.CACHE_DIR, filename)
-    shutil.move(tmp_path, full_path)
-    boa_settings.set(event, 'cache_path', filename)
-    return full_path
+        file = AbstractBook(event).generate_file()
+    boa_settings.set(event, 'cache_file_id', file.id)
+    return file
+
+
+def create_boa_async(event, user):
+    """Create the book of abstracts in the background.
+
+    If it is already being created, no new task is started.
+
+    :param event: The event to create the book of abstracts for
+    :param user: The user the book of abstracts is created as
+    :return: The ID of the task creating the book of abstracts
+    """
+    from indico.modules.events.abstracts.tasks import generate_boa
+    task_id = str(uuid4())
+    # this is kept after the task finished so its result can still be checked
+    _boa_tasks_cache.set((event.id, task_id), True, timeout=3600)
+    if not _boa_tasks_cache.add(event.id, task_id, timeout=3600):
+        return _boa_tasks_cache.get(event.id)
+    generate_boa.apply_async((event, user), task_id=task_id)
+    return task_id
+
+
+def is_boa_task(event, task_id):
+    """Check whether a task has been started to create the book of abstracts.
+
+    Unlike the running task, this is also remembered after the task
+    has finished.
+    """
+    return _boa_tasks_cache.get((event.id, task_id)) is not None
+
+
+def forget_boa_task(event):
+    """Forget the task creating the book of abstracts."""
+    _boa_tasks_cache.delete(event.id)
 
 
 def create_boa_tex(event):
@@ -341,15 +377,12 @@ def create_boa_tex(event):
 
 
 def clear_boa_cache(event):
-    """Delete the cached book of abstract."""
-    path = boa_settings.get(event, 'cache_path')
-    if path:
-        try:
-            os.remove(os.path.join(config.CACHE_DIR, path))
-        except OSError as e:
-            if e.errno != errno.ENOENT:
-                raise
-        boa_settings.delete(event, 'cache_path')
+    """Delete the cached book of abstract.
+
+    The PDF itself is kept, since other events may use the very same
+    file if they happen to have identical books of abstracts.
+    """
+    boa_settings.delete(event, 'cache_file_id')
 
 
 def get_events_with_abstract_reviewer_convener(user, dt=None):
@@ -0,0 +1,62 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from pathlib import Path
+
+from indico.legacy.pdfinterface.latex import LatexRunner, get_latex_source_hash, get_pdf_files
+
+
+def test_get_latex_source_hash(tmp_path):
+    (tmp_path / 'doc.tex').write_text(r'\documentclass{article}')
+    (tmp_path / 'logo.png').write_bytes(b'logo')
+    initial_hash = get_latex_source_hash(tmp_path)
+    assert get_latex_source_hash(tmp_path) == initial_hash
+    assert get_latex_source_hash(tmp_path, has_toc=True) != initial_hash
+    # symlinks (fonts) are ignored
+    (tmp_path / 'fonts').symlink_to(tmp_path / 'logo.png')
+    assert get_latex_source_hash(tmp_path) == initial_hash
+    # but changes to any other file are not
+    (tmp_path / 'logo.png').write_bytes(b'other logo')
+    assert get_latex_source_hash(tmp_path) != initial_hash
+    (tmp_path / 'logo.png').write_bytes(b'logo')
+    assert get_latex_source_hash(tmp_path) == initial_hash
+    (tmp_path / 'logo.png').rename(tmp_path / 'logo2.png')
+    assert get_latex_source_hash(tmp_path) != initial_hash
+
+
+def test_get_pdf_files(db, mocker, tmp_path):
+    class MockConfig:
+        LATEX_ENABLED = True
+        XELATEX_PATH = 'xelatex'
+
+    def _prepare(self, template_name, text):
+        source = Path(self.source_dir, f'{template_name}.tex')
+        source.write_text(text)
+        return str(source), str(source.with_suffix('.pdf'))
+
+    def _compile(self, source_filename, target_filename):
+        compiled.append(Path(source_filename).read_text())
+        Path(target_filename).write_text(f'PDF: {compiled[-1]}')
+
+    compiled = []
+    mocker.patch('indico.legacy.pdfinterface.latex.config', MockConfig())
+    mocker.patch.object(LatexRunner, 'prepare', _prepare)
+    mocker.patch.object(LatexRunner, '_compile', _compile)
+
+    def _get_pdfs(*texts):
+        documents = []
+        for i, text in enumerate(texts):
+            source_dir = tmp_path / str(len(compiled)) / str(i)
+            source_dir.mkdir(parents=True)
+            documents.append((LatexRunner(str(source_dir)), 'fragment', {'text': text}))
+        return [f.open().read() for f in get_pdf_files(documents)]
+
+    assert _get_pdfs('a', 'b', 'a') == [b'PDF: a', b'PDF: b', b'PDF: a']
+    assert sorted(compiled) == ['a', 'b']
+    # only the changed document is compiled again
+    assert _get_pdfs('a', 'c', 'b') == [b'PDF: a', b'PDF: c', b'PDF: b']
+    assert sorted(compiled) == ['a', 'b', 'c']
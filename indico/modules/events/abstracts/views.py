@@ -35,6 +35,10 @@ class WPDisplayCallForAbstracts(WPDisplayAbstracts):
     pass
 
 
+class WPDisplayBookOfAbstracts(WPDisplayAbstractsBase):
+    menu_entry_name = 'abstracts_book'
+
+
 class WPDisplayAbstractsReviewing(WPDisplayAbstracts):
     menu_entry_name = 'abstract_reviewing_area'
     bundles = ('module_events.management.js',)
@@ -8,11 +8,13 @@
 import fnmatch
 import re
 from datetime import datetime
+from functools import partial
 from hashlib import md5
+from itertools import batched
 from operator import attrgetter
 
 import pytz
-from flask import request
+from flask import current_app, request, stream_with_context
 from sqlalchemy import Date, cast
 from sqlalchemy.orm import joinedload, selectinload, subqueryload, undefer
 from werkzeug.exceptions import ServiceUnavailable
@@ -20,11 +22,11 @@ from werkzeug.exceptions import ServiceUnavailable
 from indico.core import signals
 from indico.core.db import db
 from indico.core.db.sqlalchemy.principals import PrincipalType
-from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.core.db.sqlalchemy.protection import ProtectionMode, clear_access_cache
 from indico.modules.attachments.api.util import build_folders_api_data, build_material_legacy_api_data
 from indico.modules.categories import Category
 from indico.modules.categories.models.legacy_mapping import LegacyCategoryMapping
-from indico.modules.categories.serialize import serialize_categories_ical
+from indico.modules.categories.serialize import iter_categories_ical, serialize_categories_ical
 from indico.modules.events import Event
 from indico.modules.events.contributions import contribution_settings
 from indico.modules.events.contributions.models.contributions import Contribution
@@ -39,7 +41,7 @@ from indico.util.i18n import orig_string
 from indico.util.signals import values_from_signal
 from indico.web.flask.util import send_file, url_for
 from indico.web.http_api.hooks.base import HTTPAPIHook, IteratedDataFetcher
-from indico.web.http_api.responses import HTTPAPIError
+from indico.web.http_api.responses import HTTPAPIError, StreamedResults
 from indico.web.http_api.util import get_query_parameter
 
 
@@ -99,6 +101,7 @@ class CategoryEventHook(HTTPAPIHook):
     TYPES = ('event', 'categ')
     RE = r'(?P<idlist>\w+(?:-\w+)*)'
     DEFAULT_DETAIL = 'events'
+    STREAMING = True
     MAX_RECORDS = {
         'events': 1000,
         'contributions': 500,
@@ -407,6 +410,9 @@ class SerializerBase:
 
 
 class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
+    #: The number of events loaded at once when streaming results
+    STREAM_CHUNK_SIZE = 100
+
     def __init__(self, user, hook):
         super().__init__(user, hook)
         self._eventType = hook._eventType
@@ -475,19 +481,48 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
         except ValueError:
             raise HTTPAPIError('Category IDs must be numeric', 400)
         if format == 'ics':
-            buf = serialize_categories_ical(idlist, self.user,
-                                            event_filter=Event.happens_between(self._fromDT, self._toDT),
-                                            event_filter_fn=self._filter_event,
-                                            update_query=self._update_query)
+            ical_args = {'event_filter': Event.happens_between(self._fromDT, self._toDT),
+                         'event_filter_fn': self._filter_event,
+                         'update_query': self._update_query}
+            if self._stream:
+                return current_app.response_class(
+                    stream_with_context(iter_categories_ical(idlist, self.user, **ical_args)),
+                    mimetype='text/calendar', headers={'Content-Disposition': 'inline; filename=events.ics'}
+                )
+            buf = serialize_categories_ical(idlist, self.user, **ical_args)
             return send_file('events.ics', buf, 'text/calendar')
-        else:
-            query = (Event.query
-                     .filter(~Event.is_deleted,
-                             Event.category_chain_overlaps(idlist),
-                             Event.happens_between(self._fromDT, self._toDT))
-                     .options(*self._get_query_options(self._detail_level)))
+        query = (Event.query
+                 .filter(~Event.is_deleted,
+                         Event.category_chain_overlaps(idlist),
+                         Event.happens_between(self._fromDT, self._toDT)))
         query = self._update_query(query)
-        return self.serialize_events(x for x in query if self._filter_event(x) and x.can_access(self.user))
+        if self._stream:
+            return self._stream_events(query, self.category_extra)
+        query = query.options(*self._get_query_options(self._detail_level))
+        return self.serialize_events(Event.filter_accessible((x for x in query if self._filter_event(x)), self.user))
+
+    def _iter_events_chunked(self, query):
+        # only the IDs are loaded at once; the events (and everything needed to serialize
+        # them) are loaded in chunks so the memory usage does not depend on the number of
+        # events being exported
+        event_ids = [id_ for id_, in query.with_entities(Event.id)]
+        options = self._get_query_options(self._detail_level)
+        for chunk in batched(event_ids, self.STREAM_CHUNK_SIZE):
+            events = {e.id: e for e in Event.query.filter(Event.id.in_(chunk)).options(*options)}
+            events = [events[id_] for id_ in chunk if id_ in events and self._filter_event(events[id_])]
+            yield from Event.filter_accessible(events, self.user)
+            # the cached access checks would keep the events of all chunks in memory
+            clear_access_cache()
+
+    def _stream_events(self, query, extra_func=None):
+        category_ids = set()
+
+        def _serialize():
+            for event in self._iter_events_chunked(query):
+                category_ids.add(event.category_id)
+                yield self._build_event_api_data(event)
+
+        return StreamedResults(_serialize(), partial(extra_func, category_ids) if extra_func else None)
 
     def category_extra(self, ids):
         if self._toDT is None:
@@ -520,7 +555,7 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
             SessionBlock.query.join(Session).join(Event).filter(*event_filters),
             'timetable_entry'
         )
-        return self.serialize_events(x for x in query if self._filter_event(x) and x.can_access(self.user))
+        return self.serialize_events(Event.filter_accessible((x for x in query if self._filter_event(x)), self.user))
 
     def _filter_event(self, event):
         if self._room or self._location or self._eventType:
@@ -5,6 +5,7 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from collections.abc import Iterable
 from datetime import timedelta
 from email import message
 from email.mime.base import MIMEBase
@@ -178,6 +179,49 @@ def event_to_ical(
                           organizer=organizer)
 
 
+def _create_calendar(method=None):
+    calendar = icalendar.Calendar()
+    calendar.add('version', '2.0')
+    calendar.add('prodid', '-//CERN//INDICO//EN')
+
+    if method:
+        calendar.add('method', method)
+
+    return calendar
+
+
+def _get_event_components(event, user, scope, skip_access_check, organizer):
+    from indico.modules.events.contributions.ical import generate_contribution_component
+    from indico.modules.events.sessions.ical import generate_session_block_component
+
+    if not skip_access_check and not event.can_access(user):
+        return []
+
+    if scope == CalendarScope.contribution and event.contributions_count > 0:
+        return [
+            generate_contribution_component(contrib, organizer=organizer)
+            for contrib in event.contributions
+            if contrib.start_dt and contrib.can_access(user)
+        ]
+    elif scope == CalendarScope.session and event.session_block_count > 0:
+        components = [
+            generate_session_block_component(block, organizer=organizer)
+            for session in event.sessions
+            if session.start_dt and session.can_access(user)
+            for block in session.blocks
+        ]
+        components += [
+            generate_contribution_component(contrib, organizer=organizer)
+            for contrib in event.contributions
+            if contrib.start_dt and contrib.session_id is None and contrib.can_access(user)
+        ]
+        return components
+    else:
+        return [
+            generate_event_component(event, user, organizer=organizer, skip_access_check=skip_access_check)
+        ]
+
+
 def events_to_ical(
     events: list[Event],
     user: User | None = None,
@@ -196,44 +240,32 @@ def events_to_ical(
     :param method: METHOD field of the iCalendar object
     :param organizer: ORGANIZER field of the iCalendar object
     """
-    from indico.modules.events.contributions.ical import generate_contribution_component
-    from indico.modules.events.sessions.ical import generate_session_block_component
-
-    calendar = icalendar.Calendar()
-    calendar.add('version', '2.0')
-    calendar.add('prodid', '-//CERN//INDICO//EN')
-
-    if method:
-        calendar.add('method', method)
-
+    calendar = _create_calendar(method)
     for event in events:
-        if not skip_access_check and not event.can_access(user):
-            continue
-
-        if scope == CalendarScope.contribution and event.contributions_count > 0:
-            components = [
-                generate_contribution_component(contrib, organizer=organizer)
-                for contrib in event.contributions
-                if contrib.start_dt and contrib.can_access(user)
-            ]
-        elif scope == CalendarScope.session and event.session_block_count > 0:
-            components = [
-                generate_session_block_component(block, organizer=organizer)
-                for session in event.sessions
-                if session.start_dt and session.can_access(user)
-                for block in session.blocks
-            ]
-            components += [
-                generate_contribution_component(contrib, organizer=organizer)
-                for contrib in event.contributions
-                if contrib.start_dt and contrib.session_id is None and contrib.can_access(user)
-            ]
-        else:
-            components = [
-                generate_event_component(event, user, organizer=organizer, skip_access_check=skip_access_check)
-            ]
-
-        for component in components:
+        for component in _get_event_components(event, user, scope, skip_access_check, organizer):
             calendar.add_component(component)
 
     return calendar.to_ical()
+
+
+def iter_events_ical(
+    events: Iterable[Event],
+    user: User | None = None,
+    scope: str | None = None,
+    *,
+    skip_access_check: bool = False,
+    method: str | None = None,
+    organizer: tuple[str, str] | None = None
+):
+    """Serialize multiple events into an ical incrementally.
+
+    This works like :func:`events_to_ical` but yields the ical data
+    of each event as soon as it has been generated, so it can be used
+    to stream large calendars.
+    """
+    end = b'END:VCALENDAR\r\n'
+    yield _create_calendar(method).to_ical().removesuffix(end)
+    for event in events:
+        for component in _get_event_components(event, user, scope, skip_access_check, organizer):
+            yield component.to_ical()
+    yield end
@@ -12,10 +12,11 @@ import pytest
 
 from indico.core import signals
 from indico.core.db.sqlalchemy.principals import EmailPrincipal, PrincipalType
-from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.core.db.sqlalchemy.protection import ProtectionMode, clear_access_cache
 from indico.core.permissions import get_available_permissions
 from indico.modules.events import Event
 from indico.modules.events.models.principals import EventPrincipal
+from indico.modules.users import User
 from indico.testing.util import bool_matrix
 
 
@@ -460,3 +461,63 @@ def test_has_management_permission_db(create_event, create_user, dummy_user):
     assert not _query().count()
     assert _query('foo').one() == entry
     assert _query('ANY').count() == 2
+
+
+@pytest.mark.usefixtures('request_context')
+def test_can_access_cache(app, monkeypatch, dummy_category, create_event, create_user):
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    user = create_user(123)
+    dummy_category.protection_mode = ProtectionMode.public
+    event = create_event(category=dummy_category, protection_mode=ProtectionMode.inheriting)
+    assert event.can_access(user)
+    assert event.can_access(None)
+    # changing the protection mode of a parent invalidates the cached checks
+    dummy_category.protection_mode = ProtectionMode.protected
+    assert not event.can_access(user)
+    # changing the ACL of a parent invalidates them as well
+    dummy_category.update_principal(user, read_access=True)
+    assert event.can_access(user)
+    assert not event.can_access(None)
+
+
+@pytest.mark.usefixtures('request_context')
+def test_filter_accessible(db, dummy_category, create_category, create_event, create_user):
+    user = create_user(123)
+    other_user = create_user(456)
+    protected_category = create_category(1, title='Protected', protection_mode=ProtectionMode.protected)
+    protected_category.update_principal(user, read_access=True)
+    events = [
+        create_event(category=dummy_category, protection_mode=ProtectionMode.public),
+        create_event(category=dummy_category, protection_mode=ProtectionMode.protected),
+        create_event(category=protected_category, protection_mode=ProtectionMode.inheriting),
+        create_event(category=protected_category, protection_mode=ProtectionMode.protected),
+    ]
+    events[1].update_principal(other_user, read_access=True)
+    db.session.flush()
+    db.session.expire_all()
+    for check_user in (user, other_user, None):
+        expected = [e for e in events if e.can_access(check_user)]
+        db.session.expire_all()
+        assert Event.filter_accessible(events, check_user) == expected
+
+
+@pytest.mark.usefixtures('request_context')
+def test_filter_accessible_query_count(db, create_category, create_event, create_user, count_queries):
+    user_id = create_user(123).id
+    query_counts = []
+    for num_events in (2, 6):
+        event_ids = []
+        for i in range(num_events):
+            parent = create_category(100 * num_events + 2 * i, protection_mode=ProtectionMode.protected)
+            category = create_category(100 * num_events + 2 * i + 1, parent=parent)
+            event_ids.append(create_event(category=category).id)
+        db.session.flush()
+        db.session.expunge_all()
+        clear_access_cache()
+        user = User.get(user_id)
+        events = Event.query.filter(Event.id.in_(event_ids)).all()
+        with count_queries() as count:
+            assert Event.filter_accessible(events, user) == []
+        query_counts.append(count())
+    # the parent categories and ACLs are loaded in bulk, not for each event
+    assert query_counts[0] == query_counts[1]
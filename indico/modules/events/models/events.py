@@ -14,12 +14,13 @@ from urllib.parse import urlsplit
 import pytz
 from flask import has_request_context, render_template, session
 from markupsafe import Markup
-from sqlalchemy import DDL, and_, or_, orm
+from sqlalchemy import DDL, and_, inspect, or_, orm
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
 from sqlalchemy.orm import column_property, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.base import NEVER_SET, NO_VALUE
 from sqlalchemy.sql import select
 
@@ -552,6 +553,17 @@ class Event(SearchableTitleMixin, DescriptionMixin, LocationMixin, ProtectionMan
     def protection_parent(self):
         return self.category
 
+    @classmethod
+    def _preload_access_data(cls, events):
+        # load all categories at once so getting the protection parents does not
+        # result in a separate query for each event
+        events_without_category = [e for e in events if 'category' in inspect(e).unloaded and e.category_id is not None]
+        if category_ids := {e.category_id for e in events_without_category}:
+            categories = {c.id: c for c in Category.query.filter(Category.id.in_(category_ids))}
+            for event in events_without_category:
+                set_committed_value(event, 'category', categories.get(event.category_id))
+        return super()._preload_access_data(events)
+
     @property
     def start_dt_local(self):
         return self.start_dt.astimezone(self.tzinfo)
@@ -10,7 +10,7 @@ from functools import partial
 from flask import g
 from sqlalchemy.event import listen, listens_for
 from sqlalchemy.ext.declarative import declared_attr
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import column_property, joinedload, mapper
 
 from indico.core.db import db
 from indico.core.db.sqlalchemy import PyIntEnum, UTCDateTime
@@ -268,3 +268,19 @@ def _update_note_html(target, value, *unused):
 
 
 EventNote.register_link_events()
+
+
+@listens_for(mapper, 'before_configured', once=True)
+def _mappers_configuring():
+    # The effective protection mode of the linked objects is defined in
+    # their own `after_configured` handlers, so we register ours only now
+    # to make sure it runs after them
+    listen(mapper, 'after_configured', _mapper_configured, once=True)
+
+
+def _mapper_configured():
+    # EventNote.effective_protection_mode -- the effective protection mode
+    # (public/protected) of the object the note is attached to since notes
+    # always inherit their protection
+    EventNote.effective_protection_mode = column_property(EventNote.get_linked_effective_protection_mode(),
+                                                          deferred=True)
@@ -9,6 +9,7 @@ import pytest
 from sqlalchemy import inspect
 from sqlalchemy.exc import IntegrityError
 
+from indico.core.db.sqlalchemy.protection import ProtectionMode
 from indico.modules.events.notes.models.notes import EventNote, EventNoteRevision, RenderMode
 
 
@@ -165,3 +166,21 @@ def test_delete(note, dummy_user):
     assert len(note.revisions) == 2
     assert note.html == ''
     assert note.is_deleted
+
+
+@pytest.mark.parametrize(('event_pm', 'subcontrib', 'effective_pm'), (
+    (ProtectionMode.public, False, ProtectionMode.public),
+    (ProtectionMode.protected, False, ProtectionMode.protected),
+    (ProtectionMode.public, True, ProtectionMode.public),
+    (ProtectionMode.protected, True, ProtectionMode.protected),
+))
+def test_effective_protection_mode(db, dummy_event, dummy_contribution, dummy_subcontribution, event_pm, subcontrib,
+                                   effective_pm):
+    dummy_event.protection_mode = event_pm
+    note = EventNote(object=dummy_subcontribution if subcontrib else dummy_event)
+    db.session.flush()
+    assert note.effective_protection_mode == effective_pm
+    dummy_contribution.protection_mode = ProtectionMode.public
+    db.session.flush()
+    db.session.expire(note)
+    assert note.effective_protection_mode == (ProtectionMode.public if subcontrib else effective_pm)
@@ -132,4 +132,37 @@ import {$T} from 'indico/utils/i18n';
 
     handleRegListRowSelection();
   };
+
+  global.setupRegistrationImportProgress = function setupRegistrationImportProgress() {
+    const $container = $('#registration-import-progress');
+    const {statusUrl, listUrl} = $container.data();
+
+    function poll() {
+      if (!$.contains(document.documentElement, $container[0])) {
+        // the dialog has been closed
+        return;
+      }
+      $.ajax({
+        url: statusUrl,
+        error: handleAjaxError,
+        success(data) {
+          if (data.total) {
+            $container.find('.i-progress-bar').width(`${(100 * data.done) / data.total}%`);
+            $container
+              .find('.i-progress-label')
+              .text(
+                $T.gettext('{0} of {1} registrations imported').format(data.done, data.total)
+              );
+          }
+          if (data.finished) {
+            location.href = listUrl;
+          } else {
+            setTimeout(poll, 3000);
+          }
+        },
+      });
+    }
+
+    poll();
+  };
 })(window);
@@ -16,12 +16,13 @@ from operator import attrgetter
 
 from flask import flash, jsonify, redirect, render_template, request, session
 from pypdf import PdfWriter
-from sqlalchemy.orm import joinedload, subqueryload
+from sqlalchemy.orm import joinedload, load_only, subqueryload
 from webargs import fields
 from werkzeug.exceptions import BadRequest, Forbidden, NotFound
 
 from indico.core import signals
 from indico.core.cache import make_scoped_cache
+from indico.core.celery import AsyncResult
 from indico.core.config import config
 from indico.core.db import db
 from indico.core.errors import IndicoError, NoReportError
@@ -53,10 +54,12 @@ from indico.modules.events.registration.notifications import (notify_registratio
 from indico.modules.events.registration.placeholders.registrations import PicturePlaceholder
 from indico.modules.events.registration.settings import event_badge_settings
 from indico.modules.events.registration.util import (ActionMenuEntry, create_registration,
+                                                     create_registrations_from_records,
                                                      generate_spreadsheet_from_registrations,
                                                      get_flat_section_submission_data, get_initial_form_values,
                                                      get_ticket_attachments, get_title_uuid, get_user_data,
-                                                     import_registrations_from_csv, make_registration_schema)
+                                                     import_registrations_async, is_registration_import_task,
+                                                     make_registration_schema, validate_registrations_csv)
 from indico.modules.events.registration.views import WPManageRegistration
 from indico.modules.events.util import ZipGeneratorMixin
 from indico.modules.logs import LogKind
@@ -452,6 +455,9 @@ class RHRegistrationsExportBase(RHRegistrationsActionBase):
 class RHRegistrationsExportPDFTable(RHRegistrationsExportBase):
     """Export registration list to a PDF in table style."""
 
+    # the registration data is loaded by the PDF generator
+    registration_query_options = (subqueryload('tags'),)
+
     def _process(self):
         pdf = RegistrantsListToPDF(self.event, reglist=self.registrations, display=self.export_config['regform_items'],
                                    static_items=self.export_config['static_item_ids'])
@@ -468,33 +474,60 @@ class RHRegistrationsExportPDFTable(RHRegistrationsExportBase):
 class RHRegistrationsExportPDFBook(RHRegistrationsExportBase):
     """Export registration list to a PDF in book style."""
 
+    # the registration data is loaded by the PDF generator
+    registration_query_options = (joinedload('transaction'), subqueryload('tags'))
+
     def _process(self):
         static_item_ids, item_ids = self.list_generator.get_item_ids()
         pdf = RegistrantsListToBookPDF(self.event, self.regform, self.registrations, item_ids, static_item_ids)
         return send_file('RegistrantsBook.pdf', BytesIO(pdf.getPDFBin()), 'application/pdf')
 
 
-class RHRegistrationsExportCSV(RHRegistrationsExportBase):
+class RHRegistrationsExportSpreadsheetBase(RHRegistrationsExportBase):
+    """Base class for the registration list spreadsheet exports."""
+
+    # only the IDs are loaded at once; the registrations are loaded in chunks
+    # while the file is being generated so the memory usage does not depend on
+    # the number of registrations being exported
+    registration_query_options = (load_only('id'),)
+    chunk_size = 1000
+
+    def _iter_registrations(self):
+        registration_ids = [r.id for r in self.registrations]
+        for chunk in itertools.batched(registration_ids, self.chunk_size):
+            registrations = {r.id: r for r in (Registration.query
+                                               .filter(Registration.id.in_(chunk))
+                                               .options(joinedload('transaction'), subqueryload('tags')))}
+            yield from (registrations[id_] for id_ in chunk if id_ in registrations)
+
+    def _generate_spreadsheet(self):
+        return generate_spreadsheet_from_registrations(self._iter_registrations(),
+                                                       self.export_config['regform_items'],
+                                                       self.export_config['static_item_ids'])
+
+
+class RHRegistrationsExportCSV(RHRegistrationsExportSpreadsheetBase):
     """Export registration list to a CSV file."""
 
     def _process(self):
-        headers, rows = generate_spreadsheet_from_registrations(self.registrations, self.export_config['regform_items'],
-                                                                self.export_config['static_item_ids'])
+        headers, rows = self._generate_spreadsheet()
         return send_csv('registrations.csv', headers, rows)
 
 
-class RHRegistrationsExportExcel(RHRegistrationsExportBase):
+class RHRegistrationsExportExcel(RHRegistrationsExportSpreadsheetBase):
     """Export registration list to an XLSX file."""
 
     def _process(self):
-        headers, rows = generate_spreadsheet_from_registrations(self.registrations, self.export_config['regform_items'],
-                                                                self.export_config['static_item_ids'])
+        headers, rows = self._generate_spreadsheet()
         return send_xlsx('registrations.xlsx', headers, rows, tz=self.event.tzinfo)
 
 
 class RHRegistrationsImport(RHRegistrationsActionBase):
     """Import registrations from a CSV file."""
 
+    #: Files with more rows than this are imported in the background
+    async_import_threshold = 500
+
     def _process(self):
         form = ImportRegistrationsForm(regform=self.regform)
 
@@ -503,10 +536,18 @@ class RHRegistrationsImport(RHRegistrationsActionBase):
                 raise Forbidden(_('Registration is disabled due to an expired retention period'))
             skip_moderation = self.regform.moderation_enabled and form.skip_moderation.data
             delimiter = form.delimiter.data.delimiter
-            registrations = import_registrations_from_csv(self.regform, form.source_file.data,
-                                                          skip_moderation=skip_moderation,
-                                                          notify_users=form.notify_users.data,
-                                                          delimiter=delimiter)
+            records = validate_registrations_csv(self.regform, form.source_file.data, delimiter=delimiter)
+            if len(records) > self.async_import_threshold:
+                task_id = import_registrations_async(self.regform, records, session.user,
+                                                     skip_moderation=skip_moderation,
+                                                     notify_users=form.notify_users.data)
+                return jsonify_template('events/registration/management/import_registrations_progress.html',
+                                        regform=self.regform, total=len(records),
+                                        status_url=url_for('.registrations_import_status', self.regform,
+                                                           task_id=task_id))
+            registrations = create_registrations_from_records(self.regform, records,
+                                                              skip_moderation=skip_moderation,
+                                                              notify_users=form.notify_users.data)
             flash(ngettext('{} registration has been imported.',
                            '{} registrations have been imported.',
                            len(registrations)).format(len(registrations)), 'success')
@@ -516,6 +557,23 @@ class RHRegistrationsImport(RHRegistrationsActionBase):
                                 regform=self.regform)
 
 
+class RHRegistrationsImportStatus(RHManageRegFormBase):
+    """Get the progress of a registration import running in the background."""
+
+    def _process(self):
+        task_id = request.view_args['task_id']
+        if not is_registration_import_task(self.regform, task_id):
+            raise NotFound
+        res = AsyncResult(task_id)
+        if res.state == 'PROGRESS':
+            return jsonify(finished=False, **res.info)
+        elif not res.ready():
+            return jsonify(finished=False, done=0, total=None)
+        elif res.failed():
+            raise IndicoError(_('Registration import failed'))
+        return jsonify(finished=True, done=res.result, total=res.result)
+
+
 class RHRegistrationsPrintBadges(RHRegistrationsActionBase):
     ALLOW_LOCKED = True
     normalize_url_spec = {
@@ -9,12 +9,14 @@ from decimal import Decimal
 
 import pytest
 from flask import request
-from werkzeug.exceptions import UnprocessableEntity
+from werkzeug.exceptions import NotFound, UnprocessableEntity
 
+from indico.core.errors import IndicoError
 from indico.modules.events.registration.controllers.management.fields import _fill_form_field_with_data
 from indico.modules.events.registration.controllers.management.reglists import (RHRegistrationCreate,
                                                                                 RHRegistrationEdit,
-                                                                                RHRegistrationsBasePrice)
+                                                                                RHRegistrationsBasePrice,
+                                                                                RHRegistrationsImportStatus)
 from indico.modules.events.registration.models.form_fields import RegistrationFormField
 from indico.modules.events.registration.models.items import RegistrationFormSection
 from indico.modules.events.registration.models.registrations import RegistrationState
@@ -161,3 +163,38 @@ def test_registration_update_base_price(dummy_regform, dummy_user, app_context,
 
     assert reg.base_price == Decimal(expected_price)
     assert reg.state == expected_state
+
+
+def test_registrations_import_status(mocker, dummy_regform, app_context):
+    mocker.patch('indico.modules.events.registration.controllers.management.reglists.is_registration_import_task',
+                 side_effect=lambda regform, task_id: task_id == 'import-task')
+    result = mocker.patch('indico.modules.events.registration.controllers.management.reglists.AsyncResult')
+    result = result.return_value
+    with app_context.test_request_context():
+        request.view_args = {
+            'reg_form_id': dummy_regform.id,
+            'event_id': dummy_regform.event_id,
+            'task_id': 'import-task',
+        }
+        rh = RHRegistrationsImportStatus()
+        rh._process_args()
+
+        result.state = 'PENDING'
+        result.ready.return_value = False
+        assert rh._process().json == {'finished': False, 'done': 0, 'total': None}
+        result.state = 'PROGRESS'
+        result.info = {'done': 100, 'total': 600}
+        assert rh._process().json == {'finished': False, 'done': 100, 'total': 600}
+        result.state = 'SUCCESS'
+        result.ready.return_value = True
+        result.failed.return_value = False
+        result.result = 600
+        assert rh._process().json == {'finished': True, 'done': 600, 'total': 600}
+        result.state = 'FAILURE'
+        result.failed.return_value = True
+        with pytest.raises(IndicoError):
+            rh._process()
+
+        request.view_args['task_id'] = 'other-task'
+        with pytest.raises(NotFound):
+            rh._process()
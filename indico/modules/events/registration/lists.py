@@ -14,6 +14,7 @@ from indico.modules.events.registration.models.items import PersonalDataType, Re
 from indico.modules.events.registration.models.registrations import (Registration, RegistrationData, RegistrationState,
                                                                      RegistrationVisibility)
 from indico.modules.events.registration.models.tags import RegistrationTag
+from indico.modules.events.registration.util import RegistrationDataMatrix
 from indico.modules.events.util import ListGeneratorBase
 from indico.util.i18n import _
 from indico.util.string import natural_sort_key
@@ -156,8 +157,7 @@ class RegistrationListGenerator(ListGeneratorBase):
         return (Registration.query
                 .with_parent(self.regform)
                 .filter(~Registration.is_deleted)
-                .options(joinedload('data').joinedload('field_data').joinedload('field'),
-                         joinedload('tags'),
+                .options(joinedload('tags'),
                          undefer('num_receipt_files'))
                 .order_by(db.func.lower(Registration.last_name), db.func.lower(Registration.first_name)))
 
@@ -231,6 +231,7 @@ class RegistrationListGenerator(ListGeneratorBase):
         return {
             'regform': self.regform,
             'registrations': registrations,
+            'registration_data': RegistrationDataMatrix(registrations),
             'total_registrations': total_entries,
             'static_columns': static_columns,
             'dynamic_columns': regform_items,
@@ -8,6 +8,7 @@
 from collections import defaultdict
 
 from celery.schedules import crontab
+from flask import session
 
 from indico.core import signals
 from indico.core.celery import celery
@@ -18,7 +19,8 @@ from indico.modules.events.registration import logger
 from indico.modules.events.registration.models.form_fields import RegistrationFormField, RegistrationFormFieldData
 from indico.modules.events.registration.models.forms import RegistrationForm
 from indico.modules.events.registration.models.registrations import Registration, RegistrationData
-from indico.modules.events.registration.util import close_registration
+from indico.modules.events.registration.util import (close_registration, create_registrations_from_records,
+                                                     forget_registration_import_task)
 from indico.modules.receipts.models.files import ReceiptFile
 from indico.util.date_time import now_utc
 from indico.util.string import snakify_keys
@@ -113,3 +115,26 @@ def delete_previous_registration_file(reg_data, storage_backend, storage_file_id
     logger.debug('Deleting registration file: %s from %s storage', storage_file_id, storage_backend)
     storage = get_storage(storage_backend)
     storage.delete(storage_file_id)
+
+
+@celery.task(name='import_registrations', bind=True, ignore_result=False, request_context=True)
+def import_registrations(self, regform, records, user, skip_moderation, notify_users):
+    """Create registrations from a validated CSV file in the background.
+
+    The progress is available in the task's metadata while the import
+    is running.
+    """
+    session.set_session_user(user)
+
+    def _update_progress(done):
+        self.update_state(state='PROGRESS', meta={'done': done, 'total': len(records)})
+
+    try:
+        logger.info('Importing %d registrations into %r', len(records), regform)
+        registrations = create_registrations_from_records(regform, records, skip_moderation=skip_moderation,
+                                                          notify_users=notify_users,
+                                                          progress_callback=_update_progress)
+        db.session.commit()
+        return len(registrations)
+    finally:
+        forget_registration_import_task(regform)
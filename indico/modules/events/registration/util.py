@@ -18,9 +18,12 @@ from marshmallow import RAISE, ValidationError, fields, validates
 from PIL import Image, ImageOps
 from qrcode import QRCode, constants
 from sqlalchemy import and_, or_
-from sqlalchemy.orm import contains_eager, joinedload, load_only, undefer
+from sqlalchemy.orm import contains_eager, joinedload, load_only, subqueryload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 
 from indico.core import signals
+from indico.core.cache import make_scoped_cache
+from indico.core.celery import AsyncResult
 from indico.core.config import config
 from indico.core.db import db
 from indico.core.db.sqlalchemy.util.session import no_autoflush
@@ -48,7 +51,7 @@ from indico.modules.events.registration.notifications import (notify_invitation,
                                                               notify_registration_modification)
 from indico.modules.logs import LogKind
 from indico.modules.logs.util import make_diff_log
-from indico.modules.users.util import get_user_by_email
+from indico.modules.users.util import get_user_by_email, get_users_by_email
 from indico.util.countries import get_country_reverse
 from indico.util.date_time import format_date, now_utc
 from indico.util.i18n import _
@@ -57,6 +60,10 @@ from indico.util.spreadsheets import csv_text_io_wrapper, unique_col
 from indico.util.string import camelize_keys, validate_email, validate_email_verbose
 
 
+_import_tasks_cache = make_scoped_cache('registration-import-tasks')
+_IMPORT_PROGRESS_INTERVAL = 100
+
+
 @dataclasses.dataclass
 class ActionMenuEntry:
     text: str
@@ -86,7 +93,6 @@ def import_user_records_from_csv(fileobj, columns, delimiter=','):
     with csv_text_io_wrapper(fileobj) as ftxt:
         reader = csv.reader(ftxt.read().splitlines(), delimiter=delimiter)
     used_emails = set()
-    email_row_map = {}
     user_records = []
     for row_num, row in enumerate(reader, 1):
         values = [value.strip() for value in row]
@@ -108,15 +114,19 @@ def import_user_records_from_csv(fileobj, columns, delimiter=','):
 
         if record['email'] in used_emails:
             raise UserValueError(_('Row {}: email address is not unique').format(row_num))
+
+        used_emails.add(record['email'])
+        user_records.append(record)
+
+    # the users are looked up all at once after the basic validation of the file
+    users = get_users_by_email(used_emails)
+    email_row_map = {}
+    for row_num, record in enumerate(user_records, 1):
         if conflict_row_num := email_row_map.get(record['email']):
             raise UserValueError(_('Row {}: email address belongs to the same user as in row {}')
                                  .format(row_num, conflict_row_num))
-
-        used_emails.add(record['email'])
-        if user := get_user_by_email(record['email']):
+        if user := users.get(record['email']):
             email_row_map.update((e, row_num) for e in user.all_emails)
-
-        user_records.append(record)
     return user_records
 
 
@@ -388,9 +398,21 @@ def create_personal_data_fields(regform):
 
 
 @no_autoflush
-def create_registration(regform, data, invitation=None, management=False, notify_user=True, skip_moderation=None):
-    user = session.user if session else None
-    registration = Registration(registration_form=regform, user=get_user_by_email(data['email']),
+def create_registration(regform, data, invitation=None, management=False, notify_user=True, skip_moderation=None, *,
+                        user=None, lookup=True):
+    """Create a new registration.
+
+    :param user: The user to associate with the registration; only used
+                 if `lookup` is disabled.
+    :param lookup: Whether to look up the user and the pending invitation
+                   matching the email address.  Disable this when both of
+                   them are passed explicitly (e.g. because they were
+                   already looked up in bulk).
+    """
+    session_user = session.user if session else None
+    if lookup:
+        user = get_user_by_email(data['email'])
+    registration = Registration(registration_form=regform, user=user,
                                 base_price=regform.base_price, currency=regform.currency, created_by_manager=management)
     if skip_moderation is None:
         skip_moderation = management
@@ -409,7 +431,7 @@ def create_registration(regform, data, invitation=None, management=False, notify
             setattr(data_entry, attr, field_value)
         if form_item.type == RegistrationFormItemType.field_pd and form_item.personal_data_type.column:
             setattr(registration, form_item.personal_data_type.column, value)
-    if invitation is None:
+    if invitation is None and lookup:
         # Associate invitation based on email in case the user did not use the link
         invitation = (RegistrationInvitation.query
                       .filter_by(email=data['email'], registration_id=None)
@@ -424,10 +446,11 @@ def create_registration(regform, data, invitation=None, management=False, notify
     db.session.flush()
     signals.event.registration_created.send(registration, management=management, data=data)
     notify_registration_creation(registration, notify_user=notify_user, from_management=management)
-    logger.info('New registration %s by %s', registration, user)
+    logger.info('New registration %s by %s', registration, session_user)
     registration.log(EventLogRealm.management if management else EventLogRealm.participants,
                      LogKind.positive, 'Registration',
-                     f'New registration: {registration.full_name}', user, data={'Email': registration.email})
+                     f'New registration: {registration.full_name}', session_user,
+                     data={'Email': registration.email})
     return registration
 
 
@@ -522,12 +545,95 @@ def update_registration_consent_to_publish(registration, consent_to_publish):
     registration.consent_to_publish = consent_to_publish
 
 
-def generate_spreadsheet_from_registrations(registrations, regform_items, static_items):
+class RegistrationDataMatrix:
+    """Column-oriented data of a list of registrations.
+
+    The data of all the registrations is loaded with a single query
+    (instead of loading the data of each registration separately) and
+    stored by field.  Since getting the friendly version of some data
+    is expensive, it is computed only once for each value, no matter
+    how often it is used.
+
+    :param registrations: the registrations to load the data for
+    :param field_ids: the IDs of the fields to load the data for; if
+                      omitted, all the data is loaded and also made
+                      available via `Registration.data`
+    """
+
+    def __init__(self, registrations, field_ids=None):
+        registrations = list(registrations)
+        #: The loaded fields, by field id
+        self.fields = {}
+        #: The data of each field, by field id and registration id
+        self.columns = {}
+        self._friendly_columns = {}
+        if not registrations or (field_ids is not None and not field_ids):
+            return
+        query = (RegistrationData.query
+                 .join(RegistrationData.field_data)
+                 .filter(RegistrationData.registration_id.in_({r.id for r in registrations}))
+                 .options(contains_eager('field_data').joinedload('field')))
+        if field_ids is not None:
+            query = query.filter(RegistrationFormFieldData.field_id.in_(field_ids))
+        data_by_registration = {r.id: [] for r in registrations}
+        for data in query:
+            field = data.field_data.field
+            self.fields[field.id] = field
+            self.columns.setdefault(field.id, {})[data.registration_id] = data
+            data_by_registration[data.registration_id].append(data)
+        if field_ids is None:
+            for registration in registrations:
+                set_committed_value(registration, 'data', data_by_registration[registration.id])
+
+    def get_data(self, registration, field_id):
+        """Get the `RegistrationData` of a registration for a field."""
+        return self.columns.get(field_id, {}).get(registration.id)
+
+    def get_data_by_field(self, registration):
+        """Get the data of a registration, like `Registration.data_by_field`."""
+        return {field_id: column[registration.id]
+                for field_id, column in self.columns.items()
+                if registration.id in column}
+
+    def get_friendly_data(self, registration, field_id, default=''):
+        """Get the friendly data of a registration for a field.
+
+        :param default: the value to return if the registration has no
+                        data for the field
+        """
+        friendly_column = self._friendly_columns.setdefault(field_id, {})
+        try:
+            return friendly_column[registration.id]
+        except KeyError:
+            pass
+        if (data := self.get_data(registration, field_id)) is None:
+            return default
+        friendly_column[registration.id] = rv = data.friendly_data
+        return rv
+
+    def get_personal_data(self, registration):
+        """Get the personal data of a registration, like `Registration.get_personal_data`."""
+        personal_data = {}
+        for field_id, field in self.fields.items():
+            data = self.get_data(registration, field_id)
+            if field.personal_data_type is not None and data is not None and data.data:
+                personal_data[field.personal_data_type.name] = self.get_friendly_data(registration, field_id)
+        personal_data.setdefault('first_name', registration.first_name)
+        personal_data.setdefault('last_name', registration.last_name)
+        personal_data.setdefault('email', registration.email)
+        return personal_data
+
+
+def generate_spreadsheet_from_registrations(registrations, regform_items, static_items, *, chunk_size=1000):
     """Generate a spreadsheet data from a given registration list.
 
-    :param registrations: The list of registrations to include in the file
+    :param registrations: The registrations to include in the file
     :param regform_items: The registration form items to be used as columns
     :param static_items: Registration form information as extra columns
+    :param chunk_size: The number of registrations to load the data for at once
+    :return: A tuple containing the column captions and an iterator
+             lazily yielding a row (in the order of the captions) for
+             each registration
     """
     field_names = ['ID', 'Name']
     special_item_mapping = {
@@ -547,33 +653,32 @@ def generate_spreadsheet_from_registrations(registrations, regform_items, static
         if item.input_type == 'accommodation':
             field_names.append(unique_col('{} ({})'.format(item.title, 'Arrival'), item.id))
             field_names.append(unique_col('{} ({})'.format(item.title, 'Departure'), item.id))
-    field_names.extend(title for name, (title, fn) in special_item_mapping.items() if name in static_items)
-    rows = []
-    for registration in registrations:
-        data = registration.data_by_field
-        registration_dict = {
-            'ID': registration.friendly_id,
-            'Name': f'{registration.first_name} {registration.last_name}'
-        }
-        for item in regform_items:
-            key = unique_col(item.title, item.id)
-            if item.input_type == 'accommodation':
-                registration_dict[key] = data[item.id].friendly_data.get('choice') if item.id in data else ''
-                key = unique_col('{} ({})'.format(item.title, 'Arrival'), item.id)
-                arrival_date = data[item.id].friendly_data.get('arrival_date') if item.id in data else None
-                registration_dict[key] = format_date(arrival_date) if arrival_date else ''
-                key = unique_col('{} ({})'.format(item.title, 'Departure'), item.id)
-                departure_date = data[item.id].friendly_data.get('departure_date') if item.id in data else None
-                registration_dict[key] = format_date(departure_date) if departure_date else ''
-            else:
-                registration_dict[key] = data[item.id].friendly_data if item.id in data else ''
-        for name, (title, fn) in special_item_mapping.items():
-            if name not in static_items:
-                continue
-            value = fn(registration)
-            registration_dict[title] = value
-        rows.append(registration_dict)
-    return field_names, rows
+    special_items = [(title, fn) for name, (title, fn) in special_item_mapping.items() if name in static_items]
+    field_names.extend(title for title, fn in special_items)
+
+    field_ids = {item.id for item in regform_items}
+
+    def _iter_rows():
+        # the data is loaded in chunks so we do not need to keep the data of all
+        # registrations in memory when the registrations are loaded lazily
+        for chunk in itertools.batched(registrations, chunk_size):
+            registration_data = RegistrationDataMatrix(chunk, field_ids)
+            for registration in chunk:
+                row = [registration.friendly_id, f'{registration.first_name} {registration.last_name}']
+                for item in regform_items:
+                    if item.input_type == 'accommodation':
+                        friendly_data = registration_data.get_friendly_data(registration, item.id, {})
+                        arrival_date = friendly_data.get('arrival_date')
+                        departure_date = friendly_data.get('departure_date')
+                        row.append(friendly_data.get('choice', ''))
+                        row.append(format_date(arrival_date) if arrival_date else '')
+                        row.append(format_date(departure_date) if departure_date else '')
+                    else:
+                        row.append(registration_data.get_friendly_data(registration, item.id))
+                row.extend(fn(registration) for title, fn in special_items)
+                yield row
+
+    return field_names, _iter_rows()
 
 
 def get_registrations_with_tickets(user, event):
@@ -652,18 +757,24 @@ def get_events_registered(user, dt=None):
 
 def build_registrations_api_data(event):
     api_data = []
-    query = (RegistrationForm.query.with_parent(event)
-             .options(joinedload('registrations').joinedload('data').joinedload('field_data')))
-    for regform in query:
-        for registration in regform.active_registrations:
-            registration_info = _build_base_registration_info(registration)
-            registration_info['checkin_secret'] = registration.ticket_uuid
-            api_data.append(registration_info)
+    registrations = (Registration.query
+                     .join(Registration.registration_form)
+                     .filter(RegistrationForm.event_id == event.id,
+                             ~RegistrationForm.is_deleted,
+                             Registration.is_active)
+                     .order_by(RegistrationForm.id, Registration.id)
+                     .options(subqueryload('tags'))
+                     .all())
+    registration_data = RegistrationDataMatrix(registrations)
+    for registration in registrations:
+        registration_info = _build_base_registration_info(registration, registration_data)
+        registration_info['checkin_secret'] = registration.ticket_uuid
+        api_data.append(registration_info)
     return api_data
 
 
-def _build_base_registration_info(registration):
-    personal_data = _build_personal_data(registration)
+def _build_base_registration_info(registration, registration_data=None):
+    personal_data = _build_personal_data(registration, registration_data)
     return {
         'registrant_id': str(registration.id),
         'checked_in': registration.checked_in,
@@ -674,8 +785,11 @@ def _build_base_registration_info(registration):
     }
 
 
-def _build_personal_data(registration):
-    personal_data = registration.get_personal_data()
+def _build_personal_data(registration, registration_data=None):
+    if registration_data is not None:
+        personal_data = registration_data.get_personal_data(registration)
+    else:
+        personal_data = registration.get_personal_data()
     personal_data['firstName'] = personal_data.pop('first_name')
     personal_data['surname'] = personal_data.pop('last_name')
     personal_data['country'] = personal_data.pop('country', '')
@@ -870,30 +984,131 @@ def create_invitation(regform, user, email_sender, email_subject, email_body, *,
     return invitation
 
 
-def import_registrations_from_csv(regform, fileobj, skip_moderation=True, notify_users=False, delimiter=','):
-    """Import event registrants from a CSV file into a form."""
-    columns = ['first_name', 'last_name', 'affiliation', 'position', 'phone', 'email']
-    user_records = import_user_records_from_csv(fileobj, columns=columns, delimiter=delimiter)
+def _get_existing_registration_errors(regform, records):
+    """Check which records belong to people who are already registered.
 
+    :return: A dict mapping the (1-based) row numbers of those records
+             to an error message.
+    """
     reg_data = (db.session.query(Registration.user_id, Registration.email)
                 .with_parent(regform)
                 .filter(Registration.is_active)
                 .all())
     registered_user_ids = {rd.user_id for rd in reg_data if rd.user_id is not None}
     registered_emails = {rd.email for rd in reg_data}
-
-    for row_num, record in enumerate(user_records, 1):
+    users = get_users_by_email(record['email'] for record in records)
+    errors = {}
+    for row_num, record in enumerate(records, 1):
         if record['email'] in registered_emails:
-            raise UserValueError(_('Row {}: a registration with this email already exists').format(row_num))
+            errors[row_num] = _('Row {}: a registration with this email already exists').format(row_num)
+        elif (user := users.get(record['email'])) and user.id in registered_user_ids:
+            errors[row_num] = _('Row {}: a registration for this user already exists').format(row_num)
+    return errors
 
-        user = get_user_by_email(record['email'])
-        if user and user.id in registered_user_ids:
-            raise UserValueError(_('Row {}: a registration for this user already exists').format(row_num))
 
-    return [
-        create_registration(regform, data, management=True, notify_user=notify_users, skip_moderation=skip_moderation)
-        for data in user_records
-    ]
+def validate_registrations_csv(regform, fileobj, delimiter=','):
+    """Parse and validate a CSV file with registrations to import.
+
+    The whole file is validated before any registration is created, so
+    an error in any row results in nothing being imported.
+
+    :return: A list of dicts containing the data of the registrations.
+    """
+    if is_registration_import_running(regform):
+        raise UserValueError(_('Registrations are still being imported into this form. Please try again once '
+                               'the import has finished.'))
+    columns = ['first_name', 'last_name', 'affiliation', 'position', 'phone', 'email']
+    user_records = import_user_records_from_csv(fileobj, columns=columns, delimiter=delimiter)
+    if errors := _get_existing_registration_errors(regform, user_records):
+        raise UserValueError(next(iter(errors.values())))
+    return user_records
+
+
+def create_registrations_from_records(regform, records, *, skip_moderation=True, notify_users=False,
+                                      progress_callback=None):
+    """Create registrations from records validated by :func:`validate_registrations_csv`.
+
+    The users and pending invitations of all the records are loaded at
+    once instead of separately for each registration.  Records of people
+    who registered since the records have been validated are skipped.
+
+    :param progress_callback: A function called with the number of
+                              registrations created so far after each
+                              batch of registrations.
+    """
+    if errors := _get_existing_registration_errors(regform, records):
+        for error in errors.values():
+            logger.warning('Skipping record while importing registrations into %r: %s', regform, error)
+        records = [record for row_num, record in enumerate(records, 1) if row_num not in errors]
+    users = get_users_by_email(record['email'] for record in records)
+    invitations = {}
+    for invitation in (RegistrationInvitation.query
+                       .with_parent(regform)
+                       .filter_by(registration_id=None)
+                       .order_by(RegistrationInvitation.id)):
+        invitations.setdefault(invitation.email, invitation)
+    registrations = []
+    for i, data in enumerate(records, 1):
+        registrations.append(create_registration(regform, data, invitation=invitations.get(data['email']),
+                                                 management=True, notify_user=notify_users,
+                                                 skip_moderation=skip_moderation, user=users.get(data['email']),
+                                                 lookup=False))
+        if progress_callback and (i % _IMPORT_PROGRESS_INTERVAL == 0 or i == len(records)):
+            progress_callback(i)
+    return registrations
+
+
+def import_registrations_async(regform, records, user, *, skip_moderation=True, notify_users=False):
+    """Create registrations from validated records in the background.
+
+    Only one import may run for a registration form at the same time.
+
+    :return: The ID of the task importing the registrations.
+    """
+    from indico.modules.events.registration.tasks import import_registrations
+    task_id = str(uuid.uuid4())
+    # this is kept after the task finished so its result can still be checked
+    _import_tasks_cache.set((regform.id, task_id), True, timeout=3600)
+    if is_registration_import_running(regform) or not _import_tasks_cache.add(regform.id, task_id, timeout=3600):
+        raise UserValueError(_('Registrations are still being imported into this form. Please try again once '
+                               'the import has finished.'))
+    import_registrations.apply_async((regform, records, user, skip_moderation, notify_users), task_id=task_id)
+    return task_id
+
+
+def is_registration_import_task(regform, task_id):
+    """Check whether a task has been started to import registrations into a form.
+
+    Unlike the running task, this is also remembered after the task
+    has finished.
+    """
+    return _import_tasks_cache.get((regform.id, task_id)) is not None
+
+
+def is_registration_import_running(regform):
+    """Check whether registrations are being imported in the background.
+
+    If the task has finished without forgetting itself (e.g. because it
+    failed before even starting the import), it is forgotten now.
+    """
+    if (task_id := _import_tasks_cache.get(regform.id)) is None:
+        return False
+    if AsyncResult(task_id).ready():
+        forget_registration_import_task(regform)
+        return False
+    return True
+
+
+def forget_registration_import_task(regform):
+    """Forget the task importing registrations into a registration form."""
+    _import_tasks_cache.delete(regform.id)
+
+
+def import_registrations_from_csv(regform, fileobj, skip_moderation=True, notify_users=False, delimiter=','):
+    """Import event registrants from a CSV file into a form."""
+    records = validate_registrations_csv(regform, fileobj, delimiter=delimiter)
+    return create_registrations_from_records(regform, records, skip_moderation=skip_moderation,
+                                             notify_users=notify_users)
 
 
 def import_invitations_from_csv(regform, fileobj, email_sender, email_subject, email_body, *,
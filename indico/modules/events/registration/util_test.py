@@ -9,23 +9,32 @@ import itertools
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
 from flask import session
 
+from indico.core.cache import ScopedCache
 from indico.core.db import db
 from indico.core.errors import UserValueError
 from indico.modules.events.models.persons import EventPerson
 from indico.modules.events.registration.controllers.management.fields import _fill_form_field_with_data
 from indico.modules.events.registration.models.form_fields import RegistrationFormField
-from indico.modules.events.registration.models.invitations import RegistrationInvitation
+from indico.modules.events.registration.models.invitations import InvitationState, RegistrationInvitation
 from indico.modules.events.registration.models.items import RegistrationFormItemType, RegistrationFormSection
 from indico.modules.events.registration.models.registrations import RegistrationVisibility
-from indico.modules.events.registration.util import (create_registration, get_event_regforms_registrations,
-                                                     get_registered_event_persons, get_ticket_qr_code_data,
-                                                     get_user_data, import_invitations_from_csv,
+from indico.modules.events.registration import util
+from indico.modules.events.registration.tasks import import_registrations
+from indico.modules.events.registration.util import (RegistrationDataMatrix, create_registration,
+                                                     create_registrations_from_records,
+                                                     forget_registration_import_task,
+                                                     generate_spreadsheet_from_registrations,
+                                                     get_event_regforms_registrations, get_registered_event_persons,
+                                                     get_ticket_qr_code_data, get_user_data,
+                                                     import_invitations_from_csv, import_registrations_async,
                                                      import_registrations_from_csv, import_user_records_from_csv,
-                                                     modify_registration)
+                                                     is_registration_import_running, is_registration_import_task,
+                                                     modify_registration, validate_registrations_csv)
 from indico.modules.users.models.users import UserTitle
 from indico.testing.util import assert_json_snapshot
 
@@ -161,6 +170,117 @@ def test_import_registrations(dummy_regform, dummy_user):
     assert 'phone' not in data
 
 
+def test_import_registrations_validate_all(dummy_regform):
+    # nothing is imported if a later row is invalid
+    csv = b'\n'.join([b'John,Doe,ACME Inc.,Regional Manager,+1-202-555-0140,jdoe@example.test',
+                      b'Buggy,Entry,ACME Inc.,CEO,,not-an-email'])
+    with pytest.raises(UserValueError):
+        import_registrations_from_csv(dummy_regform, BytesIO(csv))
+    assert not dummy_regform.registrations
+
+
+def test_create_registrations_from_records(dummy_regform, dummy_user):
+    invitation = RegistrationInvitation(email='jane@example.test', first_name='Jane', last_name='Smith',
+                                        affiliation='ACME Inc.', skip_moderation=True)
+    dummy_regform.invitations.append(invitation)
+    db.session.flush()
+    csv = b'\n'.join([b'John,Doe,ACME Inc.,Regional Manager,+1-202-555-0140,jdoe@example.test',
+                      b'Jane,Smith,ACME Inc.,CEO,,jane@example.test',
+                      b'Billy Bob,Doe,,,,1337@EXAMPLE.test'])
+    records = validate_registrations_csv(dummy_regform, BytesIO(csv))
+    progress = []
+    registrations = create_registrations_from_records(dummy_regform, records, progress_callback=progress.append)
+    assert progress == [3]
+    assert [r.user for r in registrations] == [None, None, dummy_user]
+    assert invitation.registration == registrations[1]
+    assert invitation.state == InvitationState.accepted
+
+    with pytest.raises(UserValueError) as e:
+        validate_registrations_csv(dummy_regform, BytesIO(csv))
+    assert 'Row 1: a registration with this email already exists' in str(e.value)
+
+
+def test_create_registrations_from_records_registered_meanwhile(dummy_regform):
+    csv = b'\n'.join([b'John,Doe,ACME Inc.,Regional Manager,+1-202-555-0140,jdoe@example.test',
+                      b'Jane,Smith,ACME Inc.,CEO,,jane@example.test'])
+    records = validate_registrations_csv(dummy_regform, BytesIO(csv))
+    # someone registers while the import is waiting to be processed
+    import_registrations_from_csv(dummy_regform, BytesIO(b'Jane,Smith,ACME Inc.,CEO,,jane@example.test'))
+    registrations = create_registrations_from_records(dummy_regform, records)
+    assert [r.email for r in registrations] == ['jdoe@example.test']
+    assert len(dummy_regform.registrations) == 2
+
+
+def test_import_registrations_async_running(monkeypatch, memory_cache, dummy_regform, dummy_user):
+    monkeypatch.setattr(util, '_import_tasks_cache', ScopedCache(memory_cache, 'registration-import-tasks'))
+    apply_async = MagicMock()
+    monkeypatch.setattr(import_registrations, 'apply_async', apply_async)
+    async_result = MagicMock()
+    async_result.return_value.ready.return_value = False
+    monkeypatch.setattr(util, 'AsyncResult', async_result)
+    csv = b'John,Doe,ACME Inc.,Regional Manager,+1-202-555-0140,jdoe@example.test'
+    records = validate_registrations_csv(dummy_regform, BytesIO(csv))
+    task_id = import_registrations_async(dummy_regform, records, dummy_user)
+    apply_async.assert_called_once_with((dummy_regform, records, dummy_user, True, False), task_id=task_id)
+    assert is_registration_import_task(dummy_regform, task_id)
+    assert not is_registration_import_task(dummy_regform, 'something-else')
+    # only one import may run at the same time
+    with pytest.raises(UserValueError):
+        validate_registrations_csv(dummy_regform, BytesIO(csv))
+    with pytest.raises(UserValueError):
+        import_registrations_async(dummy_regform, records, dummy_user)
+    assert apply_async.call_count == 1
+    forget_registration_import_task(dummy_regform)
+    assert validate_registrations_csv(dummy_regform, BytesIO(csv)) == records
+    # the finished task can still be checked
+    assert is_registration_import_task(dummy_regform, task_id)
+
+
+def test_import_registrations_async_task_died(monkeypatch, memory_cache, dummy_regform, dummy_user):
+    monkeypatch.setattr(util, '_import_tasks_cache', ScopedCache(memory_cache, 'registration-import-tasks'))
+    monkeypatch.setattr(import_registrations, 'apply_async', MagicMock())
+    async_result = MagicMock()
+    async_result.return_value.ready.return_value = False
+    monkeypatch.setattr(util, 'AsyncResult', async_result)
+    csv = b'John,Doe,ACME Inc.,Regional Manager,+1-202-555-0140,jdoe@example.test'
+    records = validate_registrations_csv(dummy_regform, BytesIO(csv))
+    task_id = import_registrations_async(dummy_regform, records, dummy_user)
+    assert is_registration_import_running(dummy_regform)
+    async_result.assert_called_with(task_id)
+    # the task failed without forgetting itself
+    async_result.return_value.ready.return_value = True
+    assert not is_registration_import_running(dummy_regform)
+    assert import_registrations_async(dummy_regform, records, dummy_user) != task_id
+
+
+def test_registration_data_matrix(dummy_regform):
+    csv = b'\n'.join([b'John,Doe,ACME Inc.,Regional Manager,+1-202-555-0140,jdoe@example.test',
+                      b'Jane,Smith,ACME Inc.,CEO,,jane@example.test'])
+    registrations = import_registrations_from_csv(dummy_regform, BytesIO(csv))
+    fields = {f.personal_data_type.name: f for f in dummy_regform.active_fields if f.personal_data_type}
+    db.session.expire_all()
+
+    registration_data = RegistrationDataMatrix(registrations)
+    for registration in registrations:
+        assert registration_data.get_personal_data(registration) == registration.get_personal_data()
+        assert registration_data.get_data_by_field(registration) == registration.data_by_field
+    assert registration_data.get_friendly_data(registrations[0], fields['phone'].id) == '+1-202-555-0140'
+    assert registration_data.get_friendly_data(registrations[1], fields['phone'].id) == ''
+
+    registration_data = RegistrationDataMatrix(registrations, {fields['position'].id})
+    assert set(registration_data.columns) == {fields['position'].id}
+    assert registration_data.get_friendly_data(registrations[1], fields['position'].id) == 'CEO'
+    assert registration_data.get_friendly_data(registrations[1], fields['affiliation'].id) == ''
+
+    headers, rows = generate_spreadsheet_from_registrations(registrations, [fields['position']], {'state'},
+                                                            chunk_size=1)
+    assert headers == ['ID', 'Name', (fields['position'].title, fields['position'].id), 'Registration state']
+    assert list(rows) == [
+        [registrations[0].friendly_id, 'John Doe', 'Regional Manager', registrations[0].state.title],
+        [registrations[1].friendly_id, 'Jane Smith', 'CEO', registrations[1].state.title],
+    ]
+
+
 def test_import_registrations_error(dummy_regform, dummy_user):
     dummy_user.secondary_emails.add('dummy@example.test')
 
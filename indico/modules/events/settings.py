@@ -110,6 +110,7 @@ class EventSettingsProxy(SettingsProxyBase):
     """Proxy class to access event-specific settings for a certain module."""
 
     acl_proxy_class = EventACLProxy
+    allow_shared_cache = True
 
     @property
     def query(self):
@@ -9,6 +9,7 @@ from flask import render_template, session
 
 from indico.core import signals
 from indico.core.logger import Logger
+from indico.modules.events.timetable.cache import get_entry_days, mark_timetable_dirty
 from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
 from indico.util.date_time import now_utc
 from indico.util.i18n import _
@@ -66,3 +67,69 @@ def _render_now_happening_info(event, text_color_css, **kwargs):
             return
         return render_template('events/display/now_happening.html', event=event, entries=entries,
                                text_color_css=text_color_css)
+
+
+@signals.event.timetable_entry_created.connect
+@signals.event.timetable_entry_deleted.connect
+def _timetable_entry_changed(entry, **kwargs):
+    mark_timetable_dirty(entry.event, get_entry_days(entry))
+
+
+@signals.event.timetable_entry_updated.connect
+def _timetable_entry_updated(entry, changes, **kwargs):
+    old_start_dt = changes['start_dt'][0] if 'start_dt' in changes else None
+    mark_timetable_dirty(entry.event, get_entry_days(entry, old_start_dt))
+
+
+@signals.event.times_changed.connect
+def _times_changed(sender, entry, obj, changes, **kwargs):
+    if entry is None:
+        # the times of the event itself changed
+        mark_timetable_dirty(obj)
+        return
+    old_dts = [changes[attr][0] for attr in ('start_dt', 'end_dt') if attr in changes]
+    mark_timetable_dirty(entry.event, get_entry_days(entry, *old_dts))
+
+
+@signals.event.contribution_created.connect
+@signals.event.contribution_updated.connect
+@signals.event.contribution_deleted.connect
+@signals.event.session_block_updated.connect
+@signals.event.session_block_deleted.connect
+def _scheduled_object_changed(obj, **kwargs):
+    entry = obj.timetable_entry
+    mark_timetable_dirty(obj.event, get_entry_days(entry) if entry else set())
+
+
+@signals.event.updated.connect
+@signals.event.imported.connect
+@signals.event.session_updated.connect
+@signals.event.session_deleted.connect
+@signals.event.person_updated.connect
+def _event_object_changed(obj, **kwargs):
+    mark_timetable_dirty(obj.event)
+
+
+@signals.event.location_changed.connect
+@signals.acl.protection_changed.connect
+@signals.acl.entry_changed.connect
+def _object_setting_changed(sender, obj, **kwargs):
+    # protection/location changes of categories or rooms do not invalidate the timetable
+    # immediately; it expires from the cache after a while anyway
+    if (event := getattr(obj, 'event', None)) is not None:
+        mark_timetable_dirty(event)
+
+
+@signals.attachments.folder_created.connect
+@signals.attachments.folder_deleted.connect
+@signals.attachments.folder_updated.connect
+def _folder_changed(folder, **kwargs):
+    if folder.event is not None:
+        mark_timetable_dirty(folder.event)
+
+
+@signals.attachments.attachment_created.connect
+@signals.attachments.attachment_deleted.connect
+@signals.attachments.attachment_updated.connect
+def _attachment_changed(attachment, **kwargs):
+    _folder_changed(attachment.folder)
@@ -0,0 +1,195 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+"""Versioned cache for serialized timetables.
+
+Every event has a timetable version token stored in redis, which is
+replaced after a transaction that changed anything shown in the event's
+timetable has been committed.  Serialized timetables are cached under
+the version they were built from, so outdated copies are never used.
+
+When the changes of a transaction only affected some days of the
+timetable, the days serialized for the update sent to the client are
+merged into the cached copy of the previous version, so the next load
+of the timetable does not need to rebuild it from scratch.
+"""
+
+import threading
+from datetime import timedelta
+from uuid import uuid4
+
+from flask import g, has_app_context
+
+from indico.core import signals
+from indico.core.cache import make_scoped_cache
+
+
+_versions = make_scoped_cache('timetable-version')
+_timetables = make_scoped_cache('timetable')
+
+#: How long a serialized timetable is cached.  Changes which are not
+#: tracked (e.g. to room names) become visible after this time.
+CACHE_TTL = timedelta(hours=1)
+
+#: Used instead of `g` to track changes made outside an app context
+_no_app_context = threading.local()
+
+
+def _get_event_versions():
+    try:
+        return g.timetable_versions
+    except AttributeError:
+        g.timetable_versions = versions = {}
+        return versions
+
+
+def _get_dirty_events():
+    store = g if has_app_context() else _no_app_context
+    try:
+        return store.timetable_dirty_events
+    except AttributeError:
+        store.timetable_dirty_events = dirty = {}
+        return dirty
+
+
+def _get_patches():
+    try:
+        return g.timetable_patches
+    except AttributeError:
+        g.timetable_patches = patches = {}
+        return patches
+
+
+def get_timetable_version(event):
+    """Get the current timetable version token of an event.
+
+    The version is only retrieved from redis once per request.  If
+    there is no version yet (or it has been evicted from redis), a new
+    one is created to make sure no outdated entries are used.
+    """
+    versions = _get_event_versions()
+    try:
+        return versions[event.id]
+    except KeyError:
+        pass
+    version = _versions.get(event.id)
+    if version is None:
+        _versions.add(event.id, uuid4().hex)
+        # if redis is not available we get None and thus skip the cache
+        version = _versions.get(event.id)
+    versions[event.id] = version
+    return version
+
+
+def get_entry_days(entry, *extra_dts):
+    """Get the days of the timetable an entry is shown on.
+
+    :param extra_dts: Additional datetimes, e.g. the old start time
+                      of an entry that has been moved.
+    :return: A set of dates in the event's timezone
+    """
+    tzinfo = entry.event.tzinfo
+    dts = [entry.start_dt, entry.end_dt, *extra_dts]
+    return {dt.astimezone(tzinfo).date() for dt in dts if dt is not None}
+
+
+def mark_timetable_dirty(event, days=None):
+    """Mark the timetable of an event as changed.
+
+    The event gets a new timetable version once the transaction has
+    been committed.
+
+    :param event: The event whose timetable changed
+    :param days: The days (in the event's timezone) which are affected
+                 by the change, or ``None`` if the change may affect
+                 the whole timetable.
+    """
+    dirty = _get_dirty_events()
+    if days is None:
+        dirty[event.id] = None
+    elif (dirty_days := dirty.setdefault(event.id, set())) is not None:
+        dirty_days.update(days)
+
+
+def get_dirty_timetable_days(event):
+    """Get the days of the timetable changed in the current transaction.
+
+    :return: A set of dates, or ``None`` if the timetable did not change
+             or if the changes may affect any day.
+    """
+    if not has_app_context():
+        return None
+    return _get_dirty_events().get(event.id)
+
+
+def get_cached_timetable(event, key):
+    version = get_timetable_version(event)
+    if version is None:
+        return None
+    return _timetables.get((event.id, version, *key))
+
+
+def set_cached_timetable(event, key, timetable):
+    version = get_timetable_version(event)
+    if version is not None:
+        _timetables.set((event.id, version, *key), timetable, timeout=CACHE_TTL)
+
+
+def add_timetable_patch(event, key, days):
+    """Remember updated days to merge them into the cached timetable.
+
+    :param key: The cache key of the full timetable
+    :param days: A dict containing the serialized data of some days
+    """
+    # make sure we know which version the cached timetable to patch has
+    get_timetable_version(event)
+    _get_patches().setdefault(event.id, {}).setdefault(key, {}).update(days)
+
+
+def _replace_version(event_id, old_version, patched):
+    """Replace the timetable version of an event after a change.
+
+    If the version is still the one the change was based on, it is
+    atomically replaced and the patched timetables are cached for the
+    new version.  Otherwise someone else changed the timetable as well,
+    so there is no up-to-date copy to patch and only a new version is
+    set to invalidate all cached timetables.
+
+    :param old_version: The version the change was based on, or ``None``
+                        to skip patching the cached timetables
+    :param patched: A dict mapping cache keys to patched timetables
+    """
+    new_version = uuid4().hex
+    if old_version is None or not _versions.compare_and_set(event_id, old_version, new_version):
+        _versions.set(event_id, new_version)
+    elif patched:
+        _timetables.set_many({(event_id, new_version, *key): timetable for key, timetable in patched.items()},
+                             timeout=CACHE_TTL)
+
+
+@signals.core.after_commit.connect
+def _update_dirty_versions(sender, **kwargs):
+    if has_app_context():
+        dirty = g.pop('timetable_dirty_events', None)
+        patches = g.pop('timetable_patches', {})
+        versions = _get_event_versions()
+    else:
+        dirty = _no_app_context.__dict__.pop('timetable_dirty_events', None)
+        patches = versions = {}
+    if not dirty:
+        return
+    for event_id, days in dirty.items():
+        old_version = versions.pop(event_id, None)
+        patched = {}
+        if days is not None and old_version is not None:
+            day_keys = {day.strftime('%Y%m%d') for day in days}
+            for key, updated_days in patches.get(event_id, {}).items():
+                if not day_keys <= updated_days.keys():
+                    continue
+                if (timetable := _timetables.get((event_id, old_version, *key))) is not None:
+                    patched[key] = timetable | updated_days
+        _replace_version(event_id, old_version, patched)
@@ -0,0 +1,109 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from flask import g
+
+from indico.core import signals
+from indico.core.cache import ScopedCache
+from indico.modules.events.timetable import cache
+from indico.modules.events.timetable.cache import (add_timetable_patch, get_cached_timetable,
+                                                   get_dirty_timetable_days, get_timetable_version,
+                                                   mark_timetable_dirty, set_cached_timetable)
+
+
+@pytest.fixture
+def timetable_cache(monkeypatch, memory_cache):
+    monkeypatch.setattr(cache, '_versions', ScopedCache(memory_cache, 'timetable-version'))
+    monkeypatch.setattr(cache, '_timetables', ScopedCache(memory_cache, 'timetable'))
+
+
+def _new_request():
+    g.pop('timetable_versions', None)
+
+
+@pytest.mark.usefixtures('request_context', 'timetable_cache')
+def test_timetable_cache_patch():
+    event = SimpleNamespace(id=123)
+    key = ('manager', True, 'UTC', None, False, False)
+    set_cached_timetable(event, key, {'20250101': {'c1': 'old'}, '20250102': {'c2': 'old'}})
+    old_version = get_timetable_version(event)
+    _new_request()
+    assert get_cached_timetable(event, key) == {'20250101': {'c1': 'old'}, '20250102': {'c2': 'old'}}
+    # changes of some days are merged into the cached timetable after committing
+    mark_timetable_dirty(event, {date(2025, 1, 2)})
+    assert get_dirty_timetable_days(event) == {date(2025, 1, 2)}
+    add_timetable_patch(event, key, {'20250102': {'c2': 'new', 'c3': 'new'}})
+    signals.core.after_commit.send()
+    _new_request()
+    assert get_timetable_version(event) != old_version
+    assert get_cached_timetable(event, key) == {'20250101': {'c1': 'old'}, '20250102': {'c2': 'new', 'c3': 'new'}}
+    # without updated data for all the changed days the cached timetable is discarded
+    mark_timetable_dirty(event, {date(2025, 1, 1)})
+    mark_timetable_dirty(event, {date(2025, 1, 2)})
+    add_timetable_patch(event, key, {'20250102': {}})
+    signals.core.after_commit.send()
+    _new_request()
+    assert get_cached_timetable(event, key) is None
+
+
+@pytest.mark.usefixtures('request_context', 'timetable_cache')
+def test_timetable_cache_full_invalidation():
+    event = SimpleNamespace(id=123)
+    key = ('anonymous', False, 'UTC', None, False, False)
+    set_cached_timetable(event, key, {'20250101': {}})
+    mark_timetable_dirty(event, {date(2025, 1, 1)})
+    mark_timetable_dirty(event)
+    assert get_dirty_timetable_days(event) is None
+    add_timetable_patch(event, key, {'20250101': {'c1': 'new'}})
+    signals.core.after_commit.send()
+    _new_request()
+    assert get_cached_timetable(event, key) is None
+    # nothing changed, so the version stays the same
+    version = get_timetable_version(event)
+    set_cached_timetable(event, key, {'20250101': {}})
+    signals.core.after_commit.send()
+    _new_request()
+    assert get_timetable_version(event) == version
+    assert get_cached_timetable(event, key) == {'20250101': {}}
+
+
+@pytest.mark.usefixtures('request_context', 'timetable_cache')
+def test_timetable_cache_concurrent_change():
+    event = SimpleNamespace(id=123)
+    key = ('manager', True, 'UTC', None, False, False)
+    set_cached_timetable(event, key, {'20250101': {'c1': 'old'}})
+    mark_timetable_dirty(event, {date(2025, 1, 1)})
+    add_timetable_patch(event, key, {'20250101': {'c1': 'new'}})
+    # someone else changed the timetable before our transaction was committed
+    cache._versions.set(event.id, 'concurrent')
+    signals.core.after_commit.send()
+    _new_request()
+    assert get_timetable_version(event) not in {'concurrent', None}
+    assert get_cached_timetable(event, key) is None
+
+
+@pytest.mark.usefixtures('timetable_cache')
+def test_timetable_cache_no_app_context():
+    event = SimpleNamespace(id=123)
+    key = ('anonymous', False, 'UTC', None, False, False)
+    set_cached_timetable(event, key, {'20250101': {}})
+    version = get_timetable_version(event)
+
+    def _mark_dirty():
+        mark_timetable_dirty(event)
+        # the version must not change before the transaction has been committed
+        assert cache._versions.get(event.id) == version
+        signals.core.after_commit.send()
+
+    with ThreadPoolExecutor() as executor:
+        executor.submit(_mark_dirty).result()
+    assert cache._versions.get(event.id) not in {version, None}
@@ -14,6 +14,7 @@ from indico.modules.events.contributions import Contribution
 from indico.modules.events.contributions.clone import ContributionCloner
 from indico.modules.events.contributions.operations import delete_contribution
 from indico.modules.events.sessions.operations import delete_session_block
+from indico.modules.events.timetable.cache import get_entry_days, mark_timetable_dirty
 from indico.modules.events.timetable.controllers import (RHManageTimetableBase, RHManageTimetableEntryBase,
                                                          SessionManagementLevel)
 from indico.modules.events.timetable.legacy import (TimetableSerializer, serialize_entry_update, serialize_event_info,
@@ -169,6 +170,7 @@ class RHBreakREST(RHManageTimetableBase):
             if colors not in get_colors():
                 raise BadRequest
             self.break_.colors = colors
+            mark_timetable_dirty(self.event, get_entry_days(self.entry))
 
 
 class RHCloneContribution(RHManageTimetableBase):
@@ -6,16 +6,20 @@
 # LICENSE file for more details.
 
 from collections import defaultdict
+from datetime import datetime
 from hashlib import md5
 from itertools import chain
 
-from flask import has_request_context, session
+from flask import has_request_context, request, session
 from sqlalchemy.orm import defaultload
 
 from indico.modules.events.contributions.models.persons import AuthorType
 from indico.modules.events.models.events import EventType
+from indico.modules.events.timetable.cache import (add_timetable_patch, get_cached_timetable,
+                                                   get_dirty_timetable_days, set_cached_timetable)
 from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
-from indico.util.date_time import iterdays
+from indico.modules.networks.models.networks import IPNetworkGroup
+from indico.util.date_time import get_day_end, get_day_start, iterdays
 from indico.web.flask.util import url_for
 
 
@@ -27,8 +31,72 @@ class TimetableSerializer:
         self.can_manage_event = self.event.can_manage(self.user)
         self.api = api
 
+    @property
+    def _tzinfo(self):
+        return self.event.tzinfo if self.management else self.event.display_tzinfo
+
+    def _get_visibility_class(self):
+        """Get the name of the group of users who see the same timetable.
+
+        Event managers can see everything, and anonymous users only see
+        what is public (unless they entered an access key or may have
+        IP-based access).  For everyone else the timetable depends on
+        the user and is not cached.
+        """
+        if self.api or not has_request_context() or self.user != session.user:
+            return None
+        elif self.can_manage_event:
+            return 'manager'
+        elif self.user is not None or self.management:
+            return None
+        elif self.event._access_key_session_key in session.get('access_keys', {}):
+            return None
+        elif (ip := request.remote_addr) and any(group.contains_ip(str(ip)) for group in IPNetworkGroup.query):
+            return None
+        return 'anonymous'
+
+    def _get_cache_key(self, days=None, hide_weekends=False, strip_empty_days=False):
+        if (visibility := self._get_visibility_class()) is None:
+            return None
+        return (visibility, self.management, str(self._tzinfo), tuple(sorted(days)) if days else None,
+                hide_weekends, strip_empty_days)
+
     def serialize_timetable(self, days=None, hide_weekends=False, strip_empty_days=False):
-        tzinfo = self.event.tzinfo if self.management else self.event.display_tzinfo
+        """Serialize the timetable of the event.
+
+        The timetable is cached for managers and anonymous users until
+        something in it changes (see :mod:`~indico.modules.events.timetable.cache`).
+        """
+        cache_key = self._get_cache_key(days, hide_weekends, strip_empty_days)
+        if cache_key and (timetable := get_cached_timetable(self.event, cache_key)) is not None:
+            return timetable
+        timetable = self._serialize_timetable(days, hide_weekends, strip_empty_days)
+        if cache_key:
+            set_cached_timetable(self.event, cache_key, timetable)
+        return timetable
+
+    def serialize_timetable_days(self, days):
+        """Serialize only some days of the timetable.
+
+        This is meant for the updates sent to the client after a change.
+        Any other days changed in the current transaction are serialized
+        as well, so they can be merged into the cached timetable once the
+        transaction has been committed instead of rebuilding all of it.
+
+        :param days: A collection of dates in the event's timezone
+        """
+        days = set(days)
+        cache_key = self._get_cache_key() if self.management else None
+        dirty_days = get_dirty_timetable_days(self.event) if cache_key else None
+        if dirty_days is not None:
+            days |= dirty_days
+        timetable = self._serialize_timetable(days)
+        if dirty_days is not None:
+            add_timetable_patch(self.event, cache_key, timetable)
+        return timetable
+
+    def _serialize_timetable(self, days=None, hide_weekends=False, strip_empty_days=False):
+        tzinfo = self._tzinfo
         self.event.preload_all_acl_entries()
         timetable = {}
         for day in iterdays(self.event.start_dt.astimezone(tzinfo), self.event.end_dt.astimezone(tzinfo),
@@ -43,10 +111,16 @@ class TimetableSerializer:
         query = (TimetableEntry.query.with_parent(self.event)
                  .options(*query_options)
                  .order_by(TimetableEntry.type != TimetableEntryType.SESSION_BLOCK))
+        if days:
+            query = query.filter(TimetableEntry.start_dt <= get_day_end(max(days), tzinfo),
+                                 TimetableEntry.end_dt >= get_day_start(min(days), tzinfo))
         for entry in query:
-            day = entry.start_dt.astimezone(tzinfo).date()
-            date_str = day.strftime('%Y%m%d')
-            if date_str not in timetable:
+            date_str = entry.start_dt.astimezone(tzinfo).date().strftime('%Y%m%d')
+            end_date_str = entry.end_dt.astimezone(tzinfo).date().strftime('%Y%m%d')
+            # If a session block lasts into another day we need to add it to that day, too
+            spans_days = (not entry.parent and entry.type == TimetableEntryType.SESSION_BLOCK and
+                          end_date_str != date_str and end_date_str in timetable)
+            if date_str not in timetable and not spans_days:
                 continue
             if not entry.can_view(self.user):
                 continue
@@ -56,11 +130,10 @@ class TimetableSerializer:
                 parent_code = f's{entry.parent_id}'
                 timetable[date_str][parent_code]['entries'][key] = data
             else:
-                if (entry.type == TimetableEntryType.SESSION_BLOCK and
-                        entry.start_dt.astimezone(tzinfo).date() != entry.end_dt.astimezone(tzinfo).date()):
-                    # If a session block lasts into another day we need to add it to that day, too
-                    timetable[entry.end_dt.astimezone(tzinfo).date().strftime('%Y%m%d')][key] = data
-                timetable[date_str][key] = data
+                if spans_days:
+                    timetable[end_date_str][key] = data
+                if date_str in timetable:
+                    timetable[date_str][key] = data
         if strip_empty_days:
             timetable = self._strip_empty_days(timetable)
         return timetable
@@ -304,7 +377,10 @@ def serialize_contribution(contribution):
 
 def serialize_day_update(event, day, block=None, session_=None):
     serializer = TimetableSerializer(event, management=True)
-    timetable = serializer.serialize_session_timetable(session_) if session_ else serializer.serialize_timetable()
+    if session_:
+        timetable = serializer.serialize_session_timetable(session_)
+    else:
+        timetable = serializer.serialize_timetable_days({day.date() if isinstance(day, datetime) else day})
     block_id = serializer._get_entry_key(block) if block else None
     day = day.strftime('%Y%m%d')
     return {'day': day,
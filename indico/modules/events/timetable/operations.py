@@ -16,6 +16,7 @@ from indico.core.errors import UserValueError
 from indico.modules.events import EventLogRealm
 from indico.modules.events.sessions.operations import update_session_block
 from indico.modules.events.timetable import logger
+from indico.modules.events.timetable.cache import get_entry_days, mark_timetable_dirty
 from indico.modules.events.timetable.models.breaks import Break
 from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
 from indico.modules.events.timetable.util import find_latest_entry_end_dt
@@ -55,6 +56,7 @@ def update_break_entry(break_, data):
     if start_dt is not None:
         update_timetable_entry(break_.timetable_entry, {'start_dt': start_dt})
     break_.populate_from_dict(data)
+    mark_timetable_dirty(break_.event, get_entry_days(break_.timetable_entry))
     db.session.flush()
 
 
@@ -181,6 +183,7 @@ def update_timetable_entry_object(entry, data):
         update_session_block(obj, data)
     elif entry.type == TimetableEntryType.BREAK:
         obj.populate_from_dict(data)
+        mark_timetable_dirty(entry.event, get_entry_days(entry))
     db.session.flush()
 
 
@@ -5,8 +5,10 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import hashlib
 from collections import defaultdict
 from dataclasses import dataclass
+from datetime import datetime, time, timedelta
 from io import BytesIO
 from itertools import groupby
 from operator import attrgetter
@@ -15,9 +17,10 @@ from flask import render_template, session
 from pytz import utc
 from sqlalchemy import Date, cast
 from sqlalchemy.orm import contains_eager, joinedload, subqueryload, undefer
-from weasyprint import CSS, HTML
 
+from indico.core.cache import make_scoped_cache
 from indico.core.db import db
+from indico.core.db.sqlalchemy.protection import ProtectionMode
 from indico.modules.events.contributions.models.contributions import Contribution
 from indico.modules.events.models.events import Event
 from indico.modules.events.models.persons import EventPersonLink
@@ -26,7 +29,7 @@ from indico.modules.events.sessions.models.sessions import Session
 from indico.modules.events.timetable.legacy import TimetableSerializer, serialize_event_info
 from indico.modules.events.timetable.models.breaks import Break
 from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
-from indico.modules.receipts.util import sandboxed_url_fetcher
+from indico.modules.receipts.util import get_stylesheet, render_pdf
 from indico.util.caching import memoize_request
 from indico.util.date_time import format_time, get_day_end, get_day_start, iterdays
 from indico.util.i18n import _
@@ -34,6 +37,9 @@ from indico.web.flask.templating import get_template_module
 from indico.web.forms.colors import get_colors
 
 
+_pdf_timetable_cache = make_scoped_cache('pdf-timetable')
+
+
 def _query_events(categ_ids, day_start, day_end):
     event = db.aliased(Event)
     dates_overlap = lambda t: (t.start_dt >= day_start) & (t.start_dt <= day_end)
@@ -258,6 +264,109 @@ def get_category_timetable(categ_ids, start_dt, end_dt, detail_level='event', tz
     return result
 
 
+def _get_overview_detail_events(category, events, user):
+    """Get the IDs of the events whose timetable details may be shown in the overview."""
+    cte = category.get_protection_parent_cte()
+    # categories inheriting their protection from the category being viewed are accessible
+    accessible_categories = {category.id} | {cat_id for cat_id, prot_parent_id in db.session.query(cte)
+                                             if prot_parent_id == category.id}
+    visible = set()
+    unknown = []
+    for event in events:
+        if ((not event.is_self_protected and event.category_id in accessible_categories) or
+                event.effective_protection_mode == ProtectionMode.public):
+            visible.add(event.id)
+        else:
+            unknown.append(event)
+    visible.update(e.id for e in Event.filter_accessible(unknown, user))
+    return visible
+
+
+def _query_overview_entries(event_ids, start_dt, end_dt, detail_level):
+    types = ({TimetableEntryType.SESSION_BLOCK} if detail_level == 'session'
+             else {TimetableEntryType.SESSION_BLOCK, TimetableEntryType.CONTRIBUTION, TimetableEntryType.BREAK})
+    block_strategy = joinedload(TimetableEntry.session_block)
+    block_strategy.joinedload(SessionBlock.session).selectinload(Session.blocks).selectinload(SessionBlock.person_links)
+    contrib_strategy = joinedload(TimetableEntry.contribution)
+    contrib_strategy.selectinload(Contribution.person_links)
+    return (TimetableEntry.query
+            .filter(TimetableEntry.event_id.in_(event_ids),
+                    TimetableEntry.type.in_(types),
+                    TimetableEntry.start_dt >= start_dt,
+                    TimetableEntry.start_dt < end_dt,
+                    ~TimetableEntry.contribution.has(Contribution.is_deleted),
+                    ~TimetableEntry.session_block.has(SessionBlock.session.has(Session.is_deleted)))
+            .options(block_strategy, contrib_strategy, joinedload(TimetableEntry.break_))
+            .order_by(TimetableEntry.start_dt, TimetableEntry.type, TimetableEntry.id))
+
+
+def _iter_event_days(event, start_dt, end_dt, tz):
+    # the days of the event in the (open-ended) interval; an event ending at midnight is not shown on the next day
+    current_dt = max(start_dt, event.start_dt.astimezone(tz))
+    end_dt = min(end_dt, event.end_dt.astimezone(tz))
+    day = current_dt.date()
+    while current_dt < end_dt:
+        yield day
+        day += timedelta(days=1)
+        current_dt = tz.localize(datetime.combine(day, time()))
+
+
+def iter_category_timetable_days(category, start_dt, end_dt, detail_level='event', tz=utc, user=None):
+    """Get the events and timetable entries shown in the category overview.
+
+    Unlike :func:`get_category_timetable`, this loads all the visible
+    events of the category subtree in one query and, depending on the
+    detail level, all their timetable entries in the interval in a
+    second one.  Timetable details are only loaded for events whose
+    timetable the user can see.
+
+    :param category: The :class:`.Category` whose events are shown
+    :param start_dt: The start of the interval (``datetime`` in `tz`)
+    :param end_dt: The end of the interval, exclusive (``datetime`` in `tz`)
+    :param detail_level: the level of detail of information
+                         (``event|session|contribution``)
+    :param tz: the ``timezone`` used to split the interval into days
+    :param user: The user viewing the overview
+    :return: An iterator yielding a ``(date, events)`` tuple for each
+             day in the interval, where ``events`` is a list of
+             ``(event, timetable_objects)`` tuples, containing all
+             events happening on that day and the blocks, contributions
+             and breaks (ordered by their start time) of the event on that
+             day.  Events spanning multiple days are listed on each day.
+    """
+    utc_start_dt = start_dt.astimezone(utc)
+    utc_end_dt = end_dt.astimezone(utc)
+    events = (Event.query
+              .filter(Event.category_chain_overlaps(category.id),
+                      Event.is_visible_in(category.id),
+                      ~Event.is_deleted,
+                      Event.start_dt < utc_end_dt,
+                      Event.end_dt > utc_start_dt)
+              .options(subqueryload(Event.person_links).joinedload(EventPersonLink.person),
+                       joinedload(Event.own_room).noload('owner'),
+                       joinedload(Event.own_venue),
+                       joinedload(Event.label),
+                       joinedload(Event.category).undefer('effective_icon_data'),
+                       undefer('effective_protection_mode'))
+              .order_by(Event.start_dt, Event.id)
+              .all())
+
+    objects = defaultdict(list)
+    if detail_level != 'event' and events and (event_ids := _get_overview_detail_events(category, events, user)):
+        for entry in _query_overview_entries(event_ids, utc_start_dt, utc_end_dt, detail_level):
+            objects[(entry.event_id, entry.start_dt.astimezone(tz).date())].append(entry.object)
+
+    events_by_day = defaultdict(list)
+    for event in events:
+        for day in _iter_event_days(event, start_dt, end_dt, tz):
+            events_by_day[day].append((event, objects.get((event.id, day), [])))
+
+    day = start_dt.date()
+    while tz.localize(datetime.combine(day, time())) < end_dt:
+        yield day, events_by_day.pop(day, [])
+        day += timedelta(days=1)
+
+
 def render_entry_info_balloon(entry, editable=False, sess=None, is_session_timetable=False):
     if entry.break_:
         return render_template('events/timetable/balloons/break.html', break_=entry.break_, editable=editable,
@@ -457,19 +566,13 @@ class TimetableExportProgramConfig:
 
 
 def create_pdf(html, css, event) -> BytesIO:
-    css_url_fetcher = sandboxed_url_fetcher(event)
-    html_url_fetcher = sandboxed_url_fetcher(event, allow_event_images=True)
-    css = CSS(string=css, url_fetcher=css_url_fetcher)
-    documents = [
-        HTML(string=html, url_fetcher=html_url_fetcher).render(stylesheets=(css,))
-    ]
-    all_pages = [p for doc in documents for p in doc.pages]
+    return render_pdf(event, [html], *get_stylesheet(event, css))
 
-    f = BytesIO()
-    documents[0].copy(all_pages).write_pdf(f)
-    f.seek(0)
 
-    return f
+def _get_pdf_timetable_cache_key(event, html, css):
+    # the rendered HTML covers the timetable data and export config, but not the images it includes
+    logo_hash = event.logo_metadata['hash'] if event.has_logo else None
+    return hashlib.sha256(f'{html}\0{css}\0{logo_hash}'.encode()).hexdigest()
 
 
 def generate_pdf_timetable(
@@ -495,7 +598,12 @@ def generate_pdf_timetable(
 
     html = render_template('events/timetable/pdf/timetable.html', event=event, days=days, config=config,
                            program_config=program_config, only_session=only_session)
-    return create_pdf(html, css, event)
+    cache_key = _get_pdf_timetable_cache_key(event, html, css)
+    if (pdf := _pdf_timetable_cache.get(cache_key)) is not None:
+        return BytesIO(pdf)
+    pdf = create_pdf(html, css, event)
+    _pdf_timetable_cache.set(cache_key, pdf.getvalue(), timeout=86400)
+    return pdf
 
 
 @memoize_request
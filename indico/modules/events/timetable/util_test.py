@@ -10,7 +10,8 @@ from datetime import date, datetime
 import pytest
 from pytz import utc
 
-from indico.modules.events.timetable.util import find_latest_entry_end_dt
+from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.modules.events.timetable.util import find_latest_entry_end_dt, iter_category_timetable_days
 
 
 @pytest.mark.parametrize(('event_start_dt', 'event_end_dt', 'day', 'valid'), (
@@ -27,3 +28,33 @@ def test_find_latest_entry_end_dt_valid_day(dummy_event, event_start_dt, event_e
     if not valid:
         with pytest.raises(ValueError):
             find_latest_entry_end_dt(obj=dummy_event, day=day)
+
+
+def test_iter_category_timetable_days(dummy_category, dummy_user, create_event, create_contribution,
+                                      create_timetable_entry):
+    multiday = create_event(1, start_dt=datetime(2025, 1, 6, 10, tzinfo=utc),
+                            end_dt=datetime(2025, 1, 8, 12, tzinfo=utc))
+    public_contrib = create_contribution(multiday, 'Public')
+    create_timetable_entry(multiday, public_contrib, datetime(2025, 1, 7, 9, tzinfo=utc))
+    protected = create_event(2, start_dt=datetime(2025, 1, 7, 14, tzinfo=utc),
+                             end_dt=datetime(2025, 1, 7, 15, tzinfo=utc), protection_mode=ProtectionMode.protected,
+                             creator_has_privileges=True)
+    protected_contrib = create_contribution(protected, 'Protected')
+    create_timetable_entry(protected, protected_contrib, datetime(2025, 1, 7, 14, tzinfo=utc))
+    create_event(3, start_dt=datetime(2025, 1, 20, 10, tzinfo=utc), end_dt=datetime(2025, 1, 20, 12, tzinfo=utc))
+
+    start_dt = datetime(2025, 1, 6, tzinfo=utc)
+    end_dt = datetime(2025, 1, 13, tzinfo=utc)
+    days = dict(iter_category_timetable_days(dummy_category, start_dt, end_dt, detail_level='contribution', tz=utc))
+    assert list(days) == [date(2025, 1, day) for day in range(6, 13)]
+    assert days[date(2025, 1, 6)] == [(multiday, [])]
+    # details of protected events are only loaded for users who can access them
+    assert days[date(2025, 1, 7)] == [(multiday, [public_contrib]), (protected, [])]
+    assert days[date(2025, 1, 8)] == [(multiday, [])]
+    assert not any(days[date(2025, 1, day)] for day in range(9, 13))
+
+    days = dict(iter_category_timetable_days(dummy_category, start_dt, end_dt, detail_level='contribution', tz=utc,
+                                             user=dummy_user))
+    assert days[date(2025, 1, 7)] == [(multiday, [public_contrib]), (protected, [protected_contrib])]
+    days = dict(iter_category_timetable_days(dummy_category, start_dt, end_dt, tz=utc, user=dummy_user))
+    assert days[date(2025, 1, 7)] == [(multiday, []), (protected, [])]
@@ -15,6 +15,7 @@ from contextlib import contextmanager
 from copy import deepcopy
 from io import BytesIO
 from mimetypes import guess_extension
+from pathlib import Path
 from tempfile import NamedTemporaryFile
 from urllib.parse import urlsplit
 from zipfile import ZipFile
@@ -362,14 +363,20 @@ def create_event_logo_tmp_file(event, tmpdir=None):
     """Create a temporary file with the event's logo.
 
     If `tmpdir` is specified, the logo file is created in there and
-    a path relative to that directory is returned.
+    a path relative to that directory is returned.  In this case the
+    file name is derived from the logo's hash so it does not change
+    as long as the logo stays the same.
     """
     logo_meta = event.logo_metadata
     logo_extension = guess_extension(logo_meta['content_type']) or os.path.splitext(logo_meta['filename'])[1]
-    with NamedTemporaryFile(delete=False, dir=(tmpdir or config.TEMP_DIR), suffix=logo_extension) as temp_file:
+    if tmpdir:
+        filename = f'logo-{logo_meta["hash"]}{logo_extension}'
+        Path(tmpdir, filename).write_bytes(event.logo)
+        return filename
+    with NamedTemporaryFile(delete=False, dir=config.TEMP_DIR, suffix=logo_extension) as temp_file:
         temp_file.write(event.logo)
         temp_file.flush()
-    return os.path.relpath(temp_file.name, tmpdir) if tmpdir else temp_file.name
+    return temp_file.name
 
 
 @contextmanager
@@ -9,6 +9,7 @@ import posixpath
 from uuid import uuid4
 
 from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.declarative import declared_attr
 from werkzeug.exceptions import UnprocessableEntity
 
 from indico.core.config import config
@@ -23,7 +24,12 @@ from indico.web.flask.util import url_for
 
 class File(StoredFileMixin, db.Model):
     __tablename__ = 'files'
-    __table_args__ = {'schema': 'indico'}
+
+    @declared_attr
+    def __table_args__(cls):
+        return (db.Index('ix_files_latex_hash', cls.meta['latex_hash'].astext,
+                         postgresql_where=cls.meta.op('?')('latex_hash')),
+                {'schema': 'indico'})
 
     id = db.Column(
         db.Integer,
@@ -19,6 +19,11 @@ from indico.modules.files.models.files import File
 from indico.util.date_time import now_utc
 
 
+#: How often deleting an old LaTeX PDF from the storage may fail before
+#: it is only removed from the database
+LATEX_PDF_DELETION_ATTEMPTS = 3
+
+
 @celery.periodic_task(name='delete_unclaimed_files', run_every=crontab(minute='0', hour='6'))
 def delete_unclaimed_files():
     unclaimed_files = (File.query
@@ -46,3 +51,46 @@ def delete_unclaimed_files():
         else:
             logger.info('Removed unclaimed file %s', file_repr)
         db.session.commit()
+
+
+@celery.periodic_task(name='delete_old_latex_pdfs', run_every=crontab(minute='30', hour='6'))
+def delete_old_latex_pdfs():
+    from indico.modules.events.abstracts.settings import boa_settings
+    from indico.modules.events.models.settings import EventSetting
+
+    # PDFs compiled from LaTeX are kept to avoid compiling the same document
+    # more than once, but there's no point in keeping them forever. the books
+    # of abstracts are kept as long as they are used by an event though
+    boa_file_ids = (db.session.query(db.cast(EventSetting.value, db.Integer))
+                    .filter(EventSetting.module == boa_settings.module,
+                            EventSetting.name == 'cache_file_id',
+                            db.func.jsonb_typeof(EventSetting.value) == 'number'))
+    old_files = (File.query
+                 .filter(File.meta.op('?')('latex_hash'),
+                         File.created_dt <= (now_utc() - timedelta(days=30)),
+                         File.id.notin_(boa_file_ids.subquery()))
+                 .all())
+
+    for file in old_files:
+        file_repr = repr(file)
+        if config.DEBUG:
+            logger.info('Would have removed old LaTeX PDF %s (skipped due to debug mode)', file_repr)
+            continue
+        try:
+            file.delete(delete_from_db=True)
+        except StorageError as exc:
+            db.session.rollback()  # undo deletion from db
+            attempts = file.meta.get('deletion_attempts', 0) + 1
+            if isinstance(exc, StorageReadOnlyError) or attempts >= LATEX_PDF_DELETION_ATTEMPTS:
+                # we keep the file in the storage but stop using it instead of
+                # trying to delete it every day
+                db.session.delete(file)
+                logger.warning('Could not delete old LaTeX PDF %s: %s; removing it only from the database',
+                               file_repr, exc)
+            else:
+                file.meta['deletion_attempts'] = attempts
+                flag_modified(file, 'meta')
+                logger.error('Could not delete old LaTeX PDF %s: %s', file_repr, exc)
+        else:
+            logger.info('Removed old LaTeX PDF %s', file_repr)
+        db.session.commit()
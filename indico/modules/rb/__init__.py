@@ -19,6 +19,7 @@ from indico.core.settings.converters import EnumConverter, ModelListConverter
 from indico.modules.categories.models.categories import Category
 from indico.modules.rb.models.locations import Location
 from indico.modules.rb.models.rooms import Room
+from indico.modules.rb.occupancy import flush_dirty, mark_dirty, mark_reservation_dirty
 from indico.modules.rb.util import rb_check_if_visible
 from indico.util.enum import RichIntEnum
 from indico.util.i18n import _, pgettext
@@ -125,6 +126,24 @@ def _event_deleted(event, user, **kwargs):
             link.reservation_occurrence.cancel(user or session.user, 'Associated event was deleted')
 
 
+@signals.rb.booking_created.connect
+@signals.rb.booking_modified.connect
+@signals.rb.booking_state_changed.connect
+@signals.rb.booking_deleted.connect
+def _booking_changed(reservation, **kwargs):
+    mark_reservation_dirty(reservation)
+
+
+@signals.rb.booking_occurrence_state_changed.connect
+def _booking_occurrence_state_changed(occurrence, **kwargs):
+    mark_dirty(occurrence.reservation.room_id, {occurrence.date})
+
+
+@signals.core.after_commit.connect
+def _after_commit(sender, **kwargs):
+    flush_dirty()
+
+
 class BookPermission(ManagementPermission):
     name = 'book'
     friendly_name = pgettext('Room booking permission name', 'Book')
@@ -481,26 +481,41 @@ class RHBookingExport(RHRoomBookingBase):
         'format': fields.Str(validate=validate.OneOf({'csv', 'xlsx'}), required=True),
     })
     def _process(self, room_ids, start_date, end_date, format):
-        occurrences = (ReservationOccurrence.query
-                       .join(ReservationOccurrence.reservation)
-                       .filter(Reservation.room_id.in_(room_ids),
-                               ReservationOccurrence.is_valid,
-                               db_dates_overlap(ReservationOccurrence,
-                                                'start_dt', datetime.combine(start_date, time()),
-                                                'end_dt', datetime.combine(end_date, time.max)))).all()
-
+        # only the export parameters are stored; the occurrences are loaded
+        # while the file is being generated
         token = str(uuid.uuid4())
-        headers, rows = generate_spreadsheet_from_occurrences(occurrences)
-        _export_cache.set(token, {'headers': headers, 'rows': rows}, timeout=1800)
+        _export_cache.set(token, {'room_ids': room_ids, 'start_date': start_date, 'end_date': end_date},
+                          timeout=1800)
         download_url = url_for('rb.export_bookings_file', format=format, token=token)
         return jsonify(url=download_url)
 
 
 class RHBookingExportFile(RHRoomBookingBase):
+    def _process_args(self):
+        self.export_params = _export_cache.get(request.args['token'])
+        if self.export_params is None:
+            raise NotFound
+
+    def _iter_occurrences(self):
+        start_date = self.export_params['start_date']
+        end_date = self.export_params['end_date']
+        query = (ReservationOccurrence.query
+                 .join(ReservationOccurrence.reservation)
+                 .filter(Reservation.room_id.in_(self.export_params['room_ids']),
+                         ReservationOccurrence.is_valid,
+                         db_dates_overlap(ReservationOccurrence,
+                                          'start_dt', datetime.combine(start_date, time()),
+                                          'end_dt', datetime.combine(end_date, time.max)))
+                 .options(ReservationOccurrence.NO_RESERVATION_USER_STRATEGY,
+                          joinedload('reservation').joinedload('room')))
+        # the occurrences are loaded in batches while the file is generated so the
+        # memory usage does not depend on the number of occurrences being exported
+        yield from query.yield_per(1000)
+
     def _process(self):
-        data = _export_cache.get(request.args['token'])
+        headers, rows = generate_spreadsheet_from_occurrences(self._iter_occurrences())
         file_format = request.view_args['format']
         if file_format == 'csv':
-            return send_csv('bookings.csv', **data)
+            return send_csv('bookings.csv', headers, rows)
         elif file_format == 'xlsx':
-            return send_xlsx('bookings.xlsx', **data)
+            return send_xlsx('bookings.xlsx', headers, rows)
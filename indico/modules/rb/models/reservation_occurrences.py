@@ -24,7 +24,7 @@ from indico.core.db.sqlalchemy.util.queries import db_dates_overlap
 from indico.core.errors import IndicoError
 from indico.modules.rb.models.reservation_edit_logs import ReservationEditLog
 from indico.modules.rb.models.util import proxy_to_reservation_if_last_valid_occurrence
-from indico.modules.rb.util import rb_is_admin
+from indico.modules.rb.util import TempReservationOccurrence, rb_is_admin
 from indico.util import date_time
 from indico.util.date_time import format_date
 from indico.util.enum import IndicoIntEnum
@@ -174,9 +174,33 @@ class ReservationOccurrence(db.Model):
 
     @classmethod
     def iter_create_occurrences(cls, start, end, repetition):
+        for occ_start, occ_end in cls.iter_ranges(start, end, repetition):
+            yield ReservationOccurrence(start_dt=occ_start, end_dt=occ_end)
+
+    @classmethod
+    def iter_ranges(cls, start, end, repetition):
+        """Iterate over the start/end times of a series of occurrences.
+
+        Unlike :meth:`create_series` this does not create any occurrence
+        objects, so it should be used whenever the occurrences are only
+        needed to check for conflicts or to get their dates.
+
+        :return: An iterator yielding ``(start_dt, end_dt)`` tuples
+        """
+        end_time = end.time()
         for occ_start in cls.iter_start_time(start, end, repetition):
-            end = datetime.combine(occ_start.date(), end.time())
-            yield ReservationOccurrence(start_dt=occ_start, end_dt=end)
+            yield occ_start, datetime.combine(occ_start.date(), end_time)
+
+    @classmethod
+    def create_candidates(cls, start, end, repetition):
+        """Create lightweight placeholders for a series of occurrences.
+
+        The returned objects have the `start_dt` and `end_dt` attributes
+        of an occurrence (and `reservation` which is always `None`), but
+        they are plain tuples instead of transient ORM objects.
+        """
+        return [TempReservationOccurrence(start_dt, end_dt, None)
+                for start_dt, end_dt in cls.iter_ranges(start, end, repetition)]
 
     @staticmethod
     def map_recurrence_weekdays_to_rrule(weekdays):
@@ -92,6 +92,19 @@ def test_iter_create_occurrences(creation_params):
         assert occ.end_dt.time() == time(17)
 
 
+def test_iter_ranges(creation_params):
+    ranges = ReservationOccurrence.iter_ranges(**creation_params)
+    assert not isinstance(ranges, list)
+    assert list(ranges) == [(occ.start_dt, occ.end_dt)
+                            for occ in ReservationOccurrence.iter_create_occurrences(**creation_params)]
+
+
+def test_create_candidates(creation_params):
+    candidates = ReservationOccurrence.create_candidates(**creation_params)
+    assert [(c.start_dt, c.end_dt) for c in candidates] == list(ReservationOccurrence.iter_ranges(**creation_params))
+    assert all(c.reservation is None for c in candidates)
+
+
 @pytest.mark.parametrize(('start_dt', 'end_dt', 'recurrence_weekdays'), (
     (date(2023, 10, 2), date(2023, 10, 7), ['mon', 'tue']),
     (date(2023, 10, 2), date(2023, 10, 7), ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']),
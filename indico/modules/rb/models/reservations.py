@@ -586,6 +586,7 @@ class Reservation(db.Model):
         :param extra_fields: A dict containing the extra fields data from the schema
         """
         from indico.modules.rb import rb_settings
+        from indico.modules.rb.occupancy import mark_dirty as mark_occupancy_dirty
 
         populate_fields = {'start_dt', 'end_dt', 'repeat_frequency', 'repeat_interval', 'recurrence_weekdays',
                            'booked_for_user', 'booking_reason'}
@@ -678,6 +679,8 @@ class Reservation(db.Model):
                     if not col.primary_key and col.name not in {'start_dt', 'end_dt'}]
 
             old_occurrences = {occ.date: occ for occ in self.occurrences}
+            # the occupancy of days which no longer have an occurrence changes as well
+            mark_occupancy_dirty(self.room_id, old_occurrences)
             self.occurrences.delete(synchronize_session='fetch')
             self.create_occurrences(True, user)
             db.session.flush()
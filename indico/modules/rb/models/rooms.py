@@ -415,7 +415,7 @@ class Room(ProtectionManagersMixin, db.Model):
                          include_pre_bookings=True, include_pending_blockings=False):
         """Return a SQLAlchemy filter criterion ensuring that the room is available during the given time."""
         # Check availability against reservation occurrences
-        dummy_occurrences = ReservationOccurrence.create_series(start_dt, end_dt, repetition)
+        dummy_occurrences = ReservationOccurrence.create_candidates(start_dt, end_dt, repetition)
         overlap_criteria = ReservationOccurrence.filter_overlap(dummy_occurrences)
         reservation_criteria = [Reservation.room_id == Room.id,
                                 ReservationOccurrence.is_valid,
@@ -0,0 +1,175 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+"""Per-room, per-day occupancy bitmaps.
+
+For each room and day we keep a bitmap with one bit per minute of the
+day, separately for accepted bookings and pre-bookings.  The bitmaps are
+cached in redis and only recalculated for the days which had changes to
+one of their occurrences, so e.g. statistics over long periods do not
+have to go through all the individual occurrences every time.
+
+Every room also has a version token which is replaced whenever some of
+its bitmaps are invalidated.  Calculated bitmaps are only stored if the
+version did not change while they were being calculated, so bitmaps
+calculated from data that was outdated in the meantime are not cached.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from math import ceil
+from uuid import uuid4
+
+from flask import g, has_app_context
+
+from indico.core.cache import make_scoped_cache
+from indico.core.db import db
+from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
+from indico.modules.rb.models.reservations import Reservation, ReservationState
+from indico.util.date_time import iterdays
+
+
+MINUTES_PER_DAY = 24 * 60
+OCCUPANCY_CACHE_TTL = timedelta(days=7)
+
+_cache = make_scoped_cache('rb-occupancy')
+_versions = make_scoped_cache('rb-occupancy-version')
+
+
+def _cache_key(room_id, day):
+    return f'{room_id}:{day.isoformat()}'
+
+
+def time_to_slot(value, *, round_up=False):
+    """Get the index of the slot (minute of the day) of a time."""
+    minutes = value.hour * 60 + value.minute + value.second / 60
+    return min(ceil(minutes) if round_up else int(minutes), MINUTES_PER_DAY)
+
+
+def make_bitmap(start_time, end_time):
+    """Create a bitmap with all slots between two times set."""
+    start = time_to_slot(start_time)
+    end = time_to_slot(end_time, round_up=True)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def _get_dirty():
+    try:
+        return g.rb_occupancy_dirty
+    except AttributeError:
+        g.rb_occupancy_dirty = dirty = set()
+        return dirty
+
+
+def mark_dirty(room_id, days):
+    """Mark the occupancy of a room on some days as changed.
+
+    The cached bitmaps are deleted after the transaction has been
+    committed.  Until then, the bitmaps are always recalculated
+    during the current request.
+    """
+    _get_dirty().update((room_id, day) for day in days)
+
+
+def mark_reservation_dirty(reservation):
+    """Mark the occupancy of all days of a reservation as changed."""
+    days = {day for day, in (db.session.query(db.cast(ReservationOccurrence.start_dt, db.Date))
+                             .filter(ReservationOccurrence.reservation_id == reservation.id)
+                             .distinct())}
+    mark_dirty(reservation.room_id, days)
+
+
+def flush_dirty():
+    """Delete the cached bitmaps of all the days marked as changed."""
+    if not has_app_context():
+        return
+    dirty = g.pop('rb_occupancy_dirty', None)
+    if dirty:
+        # bump the versions first so bitmaps which are being calculated right now are not stored
+        _versions.set_many({room_id: uuid4().hex for room_id in {room_id for room_id, __ in dirty}},
+                           timeout=OCCUPANCY_CACHE_TTL)
+        _cache.delete_many(*(_cache_key(room_id, day) for room_id, day in dirty))
+
+
+def _get_room_versions(room_ids):
+    room_ids = list(room_ids)
+    versions = dict(zip(room_ids, _versions.get_many(*room_ids), strict=True))
+    if missing := [room_id for room_id, version in versions.items() if version is None]:
+        for room_id in missing:
+            _versions.add(room_id, uuid4().hex, timeout=OCCUPANCY_CACHE_TTL)
+        versions.update(zip(missing, _versions.get_many(*missing), strict=True))
+    return versions
+
+
+def _calculate_bitmaps(room_ids, start_date, end_date):
+    bitmaps = defaultdict(lambda: [0, 0])
+    query = (db.session.query(Reservation.room_id, Reservation.state, ReservationOccurrence.start_dt,
+                              ReservationOccurrence.end_dt)
+             .join(ReservationOccurrence.reservation)
+             .filter(Reservation.room_id.in_(room_ids),
+                     ReservationOccurrence.is_valid,
+                     ReservationOccurrence.start_dt >= datetime.combine(start_date, time()),
+                     ReservationOccurrence.start_dt < datetime.combine(end_date + timedelta(days=1), time())))
+    for room_id, state, start_dt, end_dt in query:
+        end_time = end_dt.time() if end_dt.date() == start_dt.date() else time.max
+        bitmap = make_bitmap(start_dt.time(), end_time)
+        # accepted bookings go into the first bitmap, pre-bookings into the second one
+        bitmaps[(room_id, start_dt.date())][state != ReservationState.accepted] |= bitmap
+    return bitmaps
+
+
+def get_occupancy(room_ids, start_date, end_date):
+    """Get the occupancy bitmaps for some rooms and days.
+
+    :param room_ids: The ids of the rooms
+    :param start_date: The first day to get the occupancy for
+    :param end_date: The last day to get the occupancy for
+    :return: A dict mapping ``(room_id, date)`` tuples to a
+             ``(booked, prebooked)`` tuple of bitmaps, in which each
+             bit represents one minute of the day.
+    """
+    room_ids = set(room_ids)
+    keys = [(room_id, day.date()) for room_id in room_ids for day in iterdays(start_date, end_date)]
+    if not keys:
+        return {}
+    dirty = getattr(g, 'rb_occupancy_dirty', set())
+    cached = _cache.get_many(*(_cache_key(*key) for key in keys))
+    occupancy = {key: tuple(value) for key, value in zip(keys, cached, strict=True)
+                 if value is not None and key not in dirty}
+    if missing := [key for key in keys if key not in occupancy]:
+        missing_room_ids = {room_id for room_id, __ in missing}
+        missing_days = [day for __, day in missing]
+        versions = _get_room_versions(missing_room_ids)
+        bitmaps = _calculate_bitmaps(missing_room_ids, min(missing_days), max(missing_days))
+        calculated = {key: tuple(bitmaps.get(key, (0, 0))) for key in missing}
+        # if the bitmaps of a room were invalidated in the meantime, the ones we calculated may be outdated
+        current_versions = _get_room_versions(missing_room_ids)
+        _cache.set_many({_cache_key(*key): value for key, value in calculated.items()
+                         if key not in dirty and versions[key[0]] is not None
+                         and versions[key[0]] == current_versions[key[0]]},
+                        timeout=OCCUPANCY_CACHE_TTL)
+        occupancy.update(calculated)
+    return occupancy
+
+
+def get_booked_minutes(room_ids, start_date, end_date, mask=(1 << MINUTES_PER_DAY) - 1, *, weekdays_only=False,
+                       include_prebookings=True):
+    """Get the number of booked minutes in some rooms.
+
+    :param mask: A bitmap restricting which minutes of each day to count
+    :param weekdays_only: Whether to only count minutes from monday to friday
+    :param include_prebookings: Whether to count pre-booked minutes as well
+    """
+    total = 0
+    for (__, day), (booked, prebooked) in get_occupancy(room_ids, start_date, end_date).items():
+        if weekdays_only and day.weekday() > 4:
+            continue
+        bits = (booked | prebooked) if include_prebookings else booked
+        total += (bits & mask).bit_count()
+    return total
@@ -0,0 +1,104 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from indico.core import signals
+from indico.core.cache import ScopedCache
+from indico.modules.rb import occupancy
+from indico.modules.rb.models.reservations import RepeatFrequency, ReservationState
+from indico.modules.rb.occupancy import get_booked_minutes, get_occupancy, make_bitmap
+
+
+@pytest.fixture
+def occupancy_cache(monkeypatch, memory_cache):
+    monkeypatch.setattr(occupancy, '_cache', ScopedCache(memory_cache, 'rb-occupancy'))
+    monkeypatch.setattr(occupancy, '_versions', ScopedCache(memory_cache, 'rb-occupancy-version'))
+    return memory_cache
+
+
+@pytest.mark.parametrize(('start_time', 'end_time', 'expected'), (
+    (time(0, 0), time(0, 3), 0b111),
+    (time(0, 2), time(0, 3), 0b100),
+    (time(0, 2), time(0, 2, 30), 0b100),
+    (time(10, 0), time(9, 0), 0),
+    (time(0, 0), time.max, (1 << 1440) - 1),
+))
+def test_make_bitmap(start_time, end_time, expected):
+    assert make_bitmap(start_time, end_time) == expected
+
+
+@pytest.mark.usefixtures('app_context')
+def test_get_occupancy(create_reservation, dummy_room):
+    start_dt = datetime.combine(date.today() + timedelta(days=1), time(10))
+    create_reservation(start_dt=start_dt, end_dt=start_dt.replace(hour=12) + timedelta(days=1),
+                       repeat_frequency=RepeatFrequency.DAY)
+    create_reservation(start_dt=start_dt.replace(hour=11), end_dt=start_dt.replace(hour=13),
+                       state=ReservationState.pending)
+    day = start_dt.date()
+    occupancy = get_occupancy([dummy_room.id], day - timedelta(days=1), day + timedelta(days=1))
+    assert occupancy[(dummy_room.id, day - timedelta(days=1))] == (0, 0)
+    assert occupancy[(dummy_room.id, day)] == (make_bitmap(time(10), time(12)), make_bitmap(time(11), time(13)))
+    assert occupancy[(dummy_room.id, day + timedelta(days=1))] == (make_bitmap(time(10), time(12)), 0)
+    assert get_booked_minutes([dummy_room.id], day, day) == 180
+    assert get_booked_minutes([dummy_room.id], day, day, include_prebookings=False) == 120
+    assert get_booked_minutes([dummy_room.id], day, day + timedelta(days=1)) == 300
+    assert get_booked_minutes([dummy_room.id], day, day, make_bitmap(time(11, 30), time(23))) == 90
+
+
+@pytest.mark.usefixtures('app_context')
+def test_get_occupancy_dirty(db, create_reservation, dummy_room):
+    start_dt = datetime.combine(date.today() + timedelta(days=1), time(10))
+    day = start_dt.date()
+    reservation = create_reservation(start_dt=start_dt, end_dt=start_dt.replace(hour=12))
+    assert get_booked_minutes([dummy_room.id], day, day) == 120
+    reservation.occurrences.one().cancel(reservation.created_by_user, silent=True)
+    db.session.flush()
+    assert get_booked_minutes([dummy_room.id], day, day) == 0
+
+
+@pytest.mark.usefixtures('app_context', 'occupancy_cache')
+def test_get_occupancy_modified(mocker, create_reservation, dummy_room, dummy_user):
+    mocker.patch('indico.modules.rb.models.reservations.notify_modification')
+    start_dt = datetime.combine(date.today() + timedelta(days=1), time(10))
+    day = start_dt.date()
+    new_day = day + timedelta(days=2)
+    reservation = create_reservation(start_dt=start_dt, end_dt=start_dt.replace(hour=12))
+    assert get_booked_minutes([dummy_room.id], day, new_day) == 120
+    new_start_dt = start_dt + timedelta(days=2)
+    reservation.modify({'start_dt': new_start_dt, 'end_dt': new_start_dt.replace(hour=12)}, dummy_user, None)
+    signals.core.after_commit.send()
+    # the cached bitmap of the day which no longer has the booking is not used anymore
+    assert get_occupancy([dummy_room.id], day, new_day) == {
+        (dummy_room.id, day): (0, 0),
+        (dummy_room.id, day + timedelta(days=1)): (0, 0),
+        (dummy_room.id, new_day): (make_bitmap(time(10), time(12)), 0),
+    }
+
+
+@pytest.mark.usefixtures('app_context')
+def test_get_occupancy_invalidated_while_calculating(mocker, occupancy_cache, create_reservation, dummy_room):
+    start_dt = datetime.combine(date.today() + timedelta(days=1), time(10))
+    day = start_dt.date()
+    create_reservation(start_dt=start_dt, end_dt=start_dt.replace(hour=12))
+    calculate_bitmaps = occupancy._calculate_bitmaps
+
+    def _calculate_bitmaps(*args):
+        rv = calculate_bitmaps(*args)
+        # someone else changes a booking in the room and commits while we are calculating
+        occupancy.mark_dirty(dummy_room.id, {day})
+        occupancy.flush_dirty()
+        return rv
+
+    mocker.patch.object(occupancy, '_calculate_bitmaps', side_effect=_calculate_bitmaps)
+    assert get_booked_minutes([dummy_room.id], day, day) == 120
+    assert occupancy._cache.get(occupancy._cache_key(dummy_room.id, day)) is None
+    mocker.stopall()
+    assert get_booked_minutes([dummy_room.id], day, day) == 120
+    assert occupancy._cache.get(occupancy._cache_key(dummy_room.id, day)) is not None
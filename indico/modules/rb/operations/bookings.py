@@ -28,7 +28,7 @@ from indico.modules.rb.models.reservations import RepeatFrequency, Reservation
 from indico.modules.rb.models.room_nonbookable_periods import NonBookablePeriod
 from indico.modules.rb.models.rooms import Room
 from indico.modules.rb.operations.blockings import filter_blocked_rooms, get_rooms_blockings, group_blocked_rooms
-from indico.modules.rb.operations.conflicts import get_concurrent_pre_bookings, get_rooms_conflicts
+from indico.modules.rb.operations.conflicts import get_concurrent_pre_bookings, get_rooms_conflicts, iter_overlaps
 from indico.modules.rb.operations.misc import get_rooms_nonbookable_periods, get_rooms_unbookable_hours
 from indico.modules.rb.util import (WEEKDAYS, group_by_occurrence_date, serialize_availability, serialize_blockings,
                                     serialize_booking_details, serialize_nonbookable_periods, serialize_occurrences,
@@ -89,9 +89,9 @@ def get_existing_rooms_occurrences(rooms, start_dt, end_dt, repeat_frequency, re
     if only_accepted:
         query = query.filter(Reservation.is_accepted)
     if repeat_frequency != RepeatFrequency.NEVER:
-        candidates = ReservationOccurrence.create_series(start_dt, end_dt,
-                                                         (repeat_frequency, repeat_interval, recurrence_weekdays))
-        dates = [candidate.start_dt for candidate in candidates]
+        dates = [dt.date() for dt in ReservationOccurrence.iter_start_time(
+            start_dt, end_dt, (repeat_frequency, repeat_interval, recurrence_weekdays)
+        )]
         query = query.filter(db.cast(ReservationOccurrence.start_dt, db.Date).in_(dates))
     if skip_booking_id is not None:
         query = query.filter(ReservationOccurrence.reservation_id != skip_booking_id)
@@ -103,7 +103,7 @@ def get_existing_rooms_occurrences(rooms, start_dt, end_dt, repeat_frequency, re
 def get_rooms_availability(rooms, start_dt, end_dt, repeat_frequency, repeat_interval, recurrence_weekdays,
                            skip_conflicts_with=None, admin_override_enabled=False, skip_past_conflicts=False):
     availability = {}
-    candidates = ReservationOccurrence.create_series(start_dt, end_dt,
+    candidates = ReservationOccurrence.create_series(start_dt.replace(tzinfo=None), end_dt.replace(tzinfo=None),
                                                      (repeat_frequency, repeat_interval, recurrence_weekdays))
     date_range = sorted({cand.start_dt.date() for cand in candidates})
     occurrences = get_existing_rooms_occurrences(rooms, start_dt.replace(hour=0, minute=0),
@@ -123,7 +123,8 @@ def get_rooms_availability(rooms, start_dt, end_dt, repeat_frequency, repeat_int
         repeat_frequency, repeat_interval, recurrence_weekdays,
         nonoverridable_blocked_rooms,
         nonbookable_periods, unbookable_hours, skip_conflicts_with,
-        allow_admin=admin_override_enabled, skip_past_conflicts=skip_past_conflicts
+        allow_admin=admin_override_enabled, skip_past_conflicts=skip_past_conflicts,
+        candidates=candidates, occurrences=occurrences
     )
     dates = [candidate.start_dt.date() for candidate in candidates]
     for room in rooms:
@@ -156,8 +157,8 @@ def get_rooms_availability(rooms, start_dt, end_dt, repeat_frequency, repeat_int
 
 
 def get_room_candidates(candidates, conflicts):
-    return [candidate for candidate in candidates
-            if not (any(candidate.overlaps(conflict) for conflict in conflicts))]
+    conflicting = {id(candidate) for candidate, __ in iter_overlaps(candidates, conflicts)}
+    return [candidate for candidate in candidates if id(candidate) not in conflicting]
 
 
 def _bookings_query(filters, *, noload_room=False, load_room_acl=False):
@@ -473,15 +474,15 @@ def get_matching_events(start_dt, end_dt, repeat_frequency, repeat_interval, rec
     This finds events that overlap with an occurrence of a booking
     with the given dates where the user is a manager.
     """
-    occurrences = ReservationOccurrence.create_series(start_dt, end_dt,
-                                                      (repeat_frequency, repeat_interval, recurrence_weekdays))
+    occurrences = ReservationOccurrence.iter_ranges(start_dt, end_dt,
+                                                    (repeat_frequency, repeat_interval, recurrence_weekdays))
     excluded_categories = rb_settings.get('excluded_categories')
     return (Event.query
             .filter(~Event.is_deleted,
                     Event.room_reservation_occurrence_links.any(
                         ReservationOccurrenceLink.reservation_occurrence.has(ReservationOccurrence.is_valid)),
-                    db.or_(Event.happens_between(server_to_utc(occ.start_dt), server_to_utc(occ.end_dt))
-                           for occ in occurrences),
+                    db.or_(Event.happens_between(server_to_utc(occ_start_dt), server_to_utc(occ_end_dt))
+                           for occ_start_dt, occ_end_dt in occurrences),
                     Event.timezone == config.DEFAULT_TIMEZONE,
                     db.and_(Event.category_id != cat.id for cat in excluded_categories),
                     Event.acl_entries.any(db.and_(EventPrincipal.type == PrincipalType.user,
@@ -70,3 +70,21 @@ def past_booking_occurrences_are_cancelled(dummy_user, create_reservation):
     number_of_cancelled_occurrences = [occ for occ in reservation.occurrences if occ.is_cancelled]
     assert number_of_cancelled_occurrences == 2
     assert len(new_reservation.occurrences) == 4
+
+
+@pytest.mark.usefixtures('request_context')
+def test_rooms_availability_conflicts(create_reservation, create_room, dummy_room):
+    from indico.modules.rb.operations.bookings import get_rooms_availability
+
+    other_room = create_room()
+    start_dt = datetime.today().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    create_reservation(start_dt=start_dt, end_dt=start_dt.replace(hour=12) + timedelta(days=2),
+                       repeat_frequency=RepeatFrequency.DAY)
+    date_range, availability = get_rooms_availability([dummy_room, other_room], start_dt.replace(hour=11),
+                                                      start_dt.replace(hour=13) + timedelta(days=4),
+                                                      RepeatFrequency.DAY, 1, None)
+    assert len(date_range) == 5
+    assert len(availability[dummy_room.id]['conflicts']) == 3
+    assert len(availability[dummy_room.id]['candidates']) == 2
+    assert not availability[other_room.id]['conflicts']
+    assert len(availability[other_room.id]['candidates']) == 5
@@ -6,8 +6,9 @@
 # LICENSE file for more details.
 
 from collections import defaultdict
-from datetime import datetime
-from itertools import combinations
+from datetime import datetime, time, timedelta
+from heapq import heappop, heappush
+from operator import itemgetter
 
 from flask import session
 from sqlalchemy.orm import contains_eager
@@ -15,6 +16,7 @@ from sqlalchemy.orm import contains_eager
 from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
 from indico.modules.rb.models.reservations import Reservation
 from indico.modules.rb.models.rooms import Room
+from indico.modules.rb.operations.misc import get_overridable_room_ids
 from indico.modules.rb.util import (WEEKDAYS, TempReservationConcurrentOccurrence, TempReservationOccurrence,
                                     check_empty_candidates, rb_is_admin)
 from indico.util.date_time import get_overlap
@@ -23,16 +25,69 @@ from indico.util.iterables import group_list
 
 def get_rooms_conflicts(rooms, start_dt, end_dt, repeat_frequency, repeat_interval, recurrence_weekdays, blocked_rooms,
                         nonbookable_periods, unbookable_hours, skip_conflicts_with=None, allow_admin=False,
-                        skip_past_conflicts=False):
+                        skip_past_conflicts=False, candidates=None, occurrences=None):
+    """Get the conflicts of a new booking in a list of rooms.
+
+    All conflicts are calculated at once for the whole list of rooms,
+    without any per-room queries.
+
+    :param candidates: The occurrences of the new booking, in case they
+                       were already created by the caller; otherwise
+                       lightweight candidates are created using
+                       :meth:`ReservationOccurrence.create_candidates`
+    :param occurrences: A dict mapping room ids to all valid occurrences
+                        on the days of the candidates, in case they were
+                        already loaded by the caller; otherwise they are
+                        queried from the database
+    """
     rooms_conflicts = defaultdict(set)
     rooms_pre_conflicts = defaultdict(set)
     rooms_conflicting_candidates = defaultdict(set)
     skip_conflicts_with = skip_conflicts_with or []
 
-    candidates = ReservationOccurrence.create_series(start_dt, end_dt,
-                                                     (repeat_frequency, repeat_interval, recurrence_weekdays))
+    if candidates is None:
+        candidates = ReservationOccurrence.create_candidates(start_dt, end_dt,
+                                                             (repeat_frequency, repeat_interval, recurrence_weekdays))
     check_empty_candidates(candidates)
 
+    if occurrences is None:
+        overlapping_occurrences = _get_overlapping_occurrences(rooms, candidates, skip_conflicts_with,
+                                                               skip_past_conflicts)
+    else:
+        now = datetime.now()
+        overlapping_occurrences = {room_id: [occ for occ in room_occurrences
+                                             if (occ.reservation_id not in skip_conflicts_with and
+                                                 (not skip_past_conflicts or occ.start_dt > now))]
+                                   for room_id, room_occurrences in occurrences.items()}
+    for room_id, room_occurrences in overlapping_occurrences.items():
+        conflicts = get_room_bookings_conflicts(candidates, room_occurrences, skip_conflicts_with)
+        rooms_conflicts[room_id], rooms_pre_conflicts[room_id], rooms_conflicting_candidates[room_id] = conflicts
+    for room_id, blocked_room_occurrences in blocked_rooms.items():
+        conflicts, conflicting_candidates = get_room_blockings_conflicts(room_id, candidates, blocked_room_occurrences,
+                                                                         allow_admin=allow_admin)
+        rooms_conflicts[room_id] |= conflicts
+        rooms_conflicting_candidates[room_id] |= conflicting_candidates
+
+    if not (allow_admin and rb_is_admin(session.user)):
+        restricted_room_ids = nonbookable_periods.keys() | unbookable_hours.keys()
+        overridable_room_ids = get_overridable_room_ids([room for room in rooms if room.id in restricted_room_ids],
+                                                        session.user, allow_admin=allow_admin)
+        for room_id, periods in nonbookable_periods.items():
+            if room_id not in overridable_room_ids:
+                conflicts, conflicting_candidates = get_room_nonbookable_periods_conflicts(candidates, periods)
+                rooms_conflicts[room_id] |= conflicts
+                rooms_conflicting_candidates[room_id] |= conflicting_candidates
+
+        for room_id, hours in unbookable_hours.items():
+            if room_id not in overridable_room_ids:
+                conflicts, conflicting_candidates = get_room_unbookable_hours_conflicts(candidates, hours)
+                rooms_conflicts[room_id] |= conflicts
+                rooms_conflicting_candidates[room_id] |= conflicting_candidates
+    rooms_conflicting_candidates = defaultdict(list, ((k, list(v)) for k, v in rooms_conflicting_candidates.items()))
+    return rooms_conflicts, rooms_pre_conflicts, rooms_conflicting_candidates
+
+
+def _get_overlapping_occurrences(rooms, candidates, skip_conflicts_with, skip_past_conflicts):
     room_ids = [room.id for room in rooms]
     query = (ReservationOccurrence.query
              .filter(Reservation.room_id.in_(room_ids),
@@ -47,106 +102,153 @@ def get_rooms_conflicts(rooms, start_dt, end_dt, repeat_frequency, repeat_interv
     if skip_past_conflicts:
         query = query.filter(ReservationOccurrence.start_dt > datetime.now())
 
-    overlapping_occurrences = group_list(query, key=lambda obj: obj.reservation.room.id,
-                                         sort_by=lambda obj: obj.reservation.room.id)
-    for room_id, occurrences in overlapping_occurrences.items():
-        conflicts = get_room_bookings_conflicts(candidates, occurrences, skip_conflicts_with)
-        rooms_conflicts[room_id], rooms_pre_conflicts[room_id], rooms_conflicting_candidates[room_id] = conflicts
-    for room_id, occurrences in blocked_rooms.items():
-        conflicts, conflicting_candidates = get_room_blockings_conflicts(room_id, candidates, occurrences,
-                                                                         allow_admin=allow_admin)
-        rooms_conflicts[room_id] |= conflicts
-        rooms_conflicting_candidates[room_id] |= conflicting_candidates
+    return group_list(query, key=lambda obj: obj.reservation.room_id, sort_by=lambda obj: obj.reservation.room_id)
 
-    if not (allow_admin and rb_is_admin(session.user)):
-        for room_id, occurrences in nonbookable_periods.items():
-            room = Room.get_or_404(room_id)
-            if not room.can_override(session.user, allow_admin=allow_admin):
-                conflicts, conflicting_candidates = get_room_nonbookable_periods_conflicts(candidates, occurrences)
-                rooms_conflicts[room_id] |= conflicts
-                rooms_conflicting_candidates[room_id] |= conflicting_candidates
 
-        for room_id, occurrences in unbookable_hours.items():
-            room = Room.get_or_404(room_id)
-            if not room.can_override(session.user, allow_admin=allow_admin):
-                conflicts, conflicting_candidates = get_room_unbookable_hours_conflicts(candidates, occurrences)
-                rooms_conflicts[room_id] |= conflicts
-                rooms_conflicting_candidates[room_id] |= conflicting_candidates
-    rooms_conflicting_candidates = defaultdict(list, ((k, list(v)) for k, v in rooms_conflicting_candidates.items()))
-    return rooms_conflicts, rooms_pre_conflicts, rooms_conflicting_candidates
+def _interval_key(obj):
+    return obj.start_dt, obj.end_dt
+
+
+def _sweep(tagged, cross=True):
+    """Run a sweep line over a list of ``(start, end, side, obj)`` tuples.
+
+    Yields ``(obj, side, other, other_side)`` for every pair of overlapping
+    intervals.  If `cross` is set, only pairs coming from different sides are
+    considered, otherwise all pairs are.  Intervals are only compared with the
+    ones that are still "open" when another one starts, so the cost is
+    ``O(n log n)`` plus the number of actual overlaps instead of comparing
+    everything with everything.
+    """
+    tagged.sort(key=itemgetter(0))
+    active = {side: [] for side in {x[2] for x in tagged}}
+    for seq, (start, end, side, obj) in enumerate(tagged):
+        for heap in active.values():
+            while heap and heap[0][0] <= start:
+                heappop(heap)
+        for other_side, heap in active.items():
+            if cross and other_side == side:
+                continue
+            for other_end, __, other_start, other in heap:
+                # the other interval started earlier (or at the same time) and
+                # is still open; we only need to exclude empty intervals here
+                if start < other_end and other_start < end:
+                    yield obj, side, other, other_side
+        heappush(active[side], (end, seq, start, obj))
+
+
+def iter_overlaps(intervals, others, key=_interval_key, other_key=None):
+    """Yield all ``(interval, other)`` pairs with overlapping time ranges.
+
+    This is equivalent to checking every element of `intervals` against
+    every element of `others` using :func:`~indico.util.date_time.overlaps`,
+    but uses a sweep line over the sorted start/end times instead.
+
+    :param intervals: An iterable of objects with a time range
+    :param others: An iterable of objects with a time range
+    :param key: A function returning the ``(start, end)`` tuple for an
+                object; by default the `start_dt` and `end_dt` attributes
+                are used
+    :param other_key: Like `key` but used for `others`; defaults to `key`
+    """
+    other_key = other_key or key
+    tagged = [(*key(obj), 0, obj) for obj in intervals]
+    if not tagged:
+        return
+    tagged += [(*other_key(obj), 1, obj) for obj in others]
+    for obj, side, other, __ in _sweep(tagged):
+        yield (obj, other) if side == 0 else (other, obj)
+
+
+def iter_self_overlaps(intervals, key=_interval_key):
+    """Yield all pairs of overlapping intervals from a single iterable.
+
+    Each pair is yielded once, with the elements in the same order as in
+    `intervals` (like :func:`itertools.combinations` would).
+    """
+    tagged = [(*key(obj), 0, (i, obj)) for i, obj in enumerate(intervals)]
+    for (i, x), __, (j, y), __ in _sweep(tagged, cross=False):
+        yield ((x, y), (i, j)) if i < j else ((y, x), (j, i))
 
 
 def get_room_bookings_conflicts(candidates, occurrences, skip_conflicts_with=frozenset()):
     conflicts = set()
     pre_conflicts = set()
     conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences:
-            if occurrence.reservation.id in skip_conflicts_with:
-                continue
-            if candidate.overlaps(occurrence):
-                overlap = candidate.get_overlap(occurrence)
-                obj = TempReservationOccurrence(*overlap, reservation=occurrence.reservation)
-                if occurrence.reservation.is_accepted:
-                    conflicting_candidates.add(candidate)
-                    conflicts.add(obj)
-                else:
-                    pre_conflicts.add(obj)
+    occurrences = [occ for occ in occurrences if occ.reservation.id not in skip_conflicts_with]
+    for candidate, occurrence in iter_overlaps(candidates, occurrences):
+        overlap = get_overlap((candidate.start_dt, candidate.end_dt), (occurrence.start_dt, occurrence.end_dt))
+        obj = TempReservationOccurrence(*overlap, reservation=occurrence.reservation)
+        if occurrence.reservation.is_accepted:
+            conflicting_candidates.add(candidate)
+            conflicts.add(obj)
+        else:
+            pre_conflicts.add(obj)
     return conflicts, pre_conflicts, conflicting_candidates
 
 
+def _day_range(start_date, end_date):
+    return datetime.combine(start_date, time()), datetime.combine(end_date + timedelta(days=1), time())
+
+
 def get_room_blockings_conflicts(room_id, candidates, occurrences, allow_admin):
     conflicts = set()
     conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences:
-            blocking = occurrence.blocking
-            if blocking.start_date <= candidate.start_dt.date() <= blocking.end_date:
-                if blocking.can_override(session.user, room=Room.get(room_id), allow_admin=allow_admin):
-                    continue
-                conflicting_candidates.add(candidate)
-                obj = TempReservationOccurrence(candidate.start_dt, candidate.end_dt, None)
-                conflicts.add(obj)
+    can_override = {}
+    room = Room.get(room_id)
+    # a blocking applies to a candidate if it starts on one of the blocked days
+    pairs = iter_overlaps(candidates, occurrences,
+                          key=lambda cand: _day_range(cand.start_dt.date(), cand.start_dt.date()),
+                          other_key=lambda occ: _day_range(occ.blocking.start_date, occ.blocking.end_date))
+    for candidate, occurrence in pairs:
+        blocking = occurrence.blocking
+        if blocking not in can_override:
+            can_override[blocking] = blocking.can_override(session.user, room=room, allow_admin=allow_admin)
+        if can_override[blocking]:
+            continue
+        conflicting_candidates.add(candidate)
+        obj = TempReservationOccurrence(candidate.start_dt, candidate.end_dt, None)
+        conflicts.add(obj)
     return conflicts, conflicting_candidates
 
 
 def get_room_nonbookable_periods_conflicts(candidates, occurrences):
     conflicts = set()
     conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences:
-            overlap = get_overlap((candidate.start_dt, candidate.end_dt), (occurrence.start_dt, occurrence.end_dt))
-            if overlap.count(None) != len(overlap):
-                conflicting_candidates.add(candidate)
-                obj = TempReservationOccurrence(overlap[0], overlap[1], None)
-                conflicts.add(obj)
+    for candidate, occurrence in iter_overlaps(candidates, occurrences):
+        overlap = get_overlap((candidate.start_dt, candidate.end_dt), (occurrence.start_dt, occurrence.end_dt))
+        conflicting_candidates.add(candidate)
+        obj = TempReservationOccurrence(overlap[0], overlap[1], None)
+        conflicts.add(obj)
     return conflicts, conflicting_candidates
 
 
+def _iter_unbookable_hours(candidates, occurrences):
+    for day in {candidate.start_dt.date() for candidate in candidates}:
+        for occurrence in occurrences[WEEKDAYS[day.weekday()]]:
+            yield (datetime.combine(day, occurrence.start_time.replace(second=0, microsecond=0)),
+                   datetime.combine(day, occurrence.end_time.replace(second=0, microsecond=0)))
+
+
 def get_room_unbookable_hours_conflicts(candidates, occurrences):
     conflicts = set()
     conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences[WEEKDAYS[candidate.start_dt.weekday()]]:
-            hours_start_dt = candidate.start_dt.replace(hour=occurrence.start_time.hour,
-                                                        minute=occurrence.start_time.minute)
-            hours_end_dt = candidate.end_dt.replace(hour=occurrence.end_time.hour,
-                                                    minute=occurrence.end_time.minute)
-            overlap = get_overlap((candidate.start_dt, candidate.end_dt), (hours_start_dt, hours_end_dt))
-            if overlap.count(None) != len(overlap):
-                conflicting_candidates.add(candidate)
-                obj = TempReservationOccurrence(overlap[0], overlap[1], None)
-                conflicts.add(obj)
+    hours = _iter_unbookable_hours(candidates, occurrences)
+    for candidate, (hours_start_dt, hours_end_dt) in iter_overlaps(candidates, hours, other_key=tuple):
+        overlap = get_overlap((candidate.start_dt, candidate.end_dt), (hours_start_dt, hours_end_dt))
+        conflicting_candidates.add(candidate)
+        obj = TempReservationOccurrence(overlap[0], overlap[1], None)
+        conflicts.add(obj)
     return conflicts, conflicting_candidates
 
 
 def get_concurrent_pre_bookings(pre_bookings, skip_conflicts_with=frozenset()):
+    pre_bookings = [pre_booking for pre_booking in pre_bookings
+                    if pre_booking.reservation.id not in skip_conflicts_with]
+    # keep the order we would get when checking all combinations of pre-bookings
+    pairs = sorted(iter_self_overlaps(pre_bookings), key=itemgetter(1))
     concurrent_pre_bookings = []
-    for (x, y) in combinations(pre_bookings, 2):
-        if any(pre_booking.reservation.id in skip_conflicts_with for pre_booking in [x, y]):
-            continue
-        if x.overlaps(y):
-            overlap = x.get_overlap(y)
-            obj = TempReservationConcurrentOccurrence(*overlap, reservations=[x.reservation, y.reservation])
-            concurrent_pre_bookings.append(obj)
+    for (x, y), __ in pairs:
+        overlap = x.get_overlap(y)
+        obj = TempReservationConcurrentOccurrence(*overlap, reservations=[x.reservation, y.reservation])
+        concurrent_pre_bookings.append(obj)
     return concurrent_pre_bookings
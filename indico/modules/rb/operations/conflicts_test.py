@@ -0,0 +1,62 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import random
+from datetime import datetime, timedelta
+from itertools import combinations
+from operator import itemgetter
+
+import pytest
+
+from indico.modules.rb.operations.conflicts import iter_overlaps, iter_self_overlaps
+from indico.modules.rb.util import TempReservationOccurrence
+from indico.util.date_time import overlaps
+
+
+def _make_intervals(rnd, count):
+    base = datetime(2025, 1, 1)
+    intervals = []
+    for __ in range(count):
+        start = base + timedelta(minutes=15 * rnd.randrange(200))
+        end = start + timedelta(minutes=15 * rnd.randrange(12))
+        intervals.append(TempReservationOccurrence(start, end, None))
+    return intervals
+
+
+def _overlaps(a, b):
+    return overlaps((a.start_dt, a.end_dt), (b.start_dt, b.end_dt))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_iter_overlaps(seed):
+    rnd = random.Random(seed)
+    intervals = _make_intervals(rnd, 50)
+    others = _make_intervals(rnd, 80)
+    expected = sorted((id(a), id(b)) for a in intervals for b in others if _overlaps(a, b))
+    assert sorted((id(a), id(b)) for a, b in iter_overlaps(intervals, others)) == expected
+
+
+def test_iter_overlaps_empty():
+    intervals = _make_intervals(random.Random(42), 10)
+    assert not list(iter_overlaps(intervals, []))
+    assert not list(iter_overlaps([], intervals))
+
+
+def test_iter_overlaps_key():
+    candidates = [TempReservationOccurrence(datetime(2025, 1, 1, 10), datetime(2025, 1, 1, 12), None),
+                  TempReservationOccurrence(datetime(2025, 1, 2, 10), datetime(2025, 1, 2, 12), None)]
+    hours = [(datetime(2025, 1, 1, 11), datetime(2025, 1, 1, 13)),
+             (datetime(2025, 1, 2, 12), datetime(2025, 1, 2, 13))]
+    assert list(iter_overlaps(candidates, hours, other_key=tuple)) == [(candidates[0], hours[0])]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_iter_self_overlaps(seed):
+    intervals = _make_intervals(random.Random(seed), 60)
+    expected = [(a, b) for a, b in combinations(intervals, 2) if _overlaps(a, b)]
+    pairs = sorted(iter_self_overlaps(intervals), key=itemgetter(1))
+    assert [pair for pair, __ in pairs] == expected
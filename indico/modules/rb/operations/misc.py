@@ -8,6 +8,8 @@
 from datetime import time
 from operator import attrgetter
 
+from sqlalchemy.orm import joinedload, selectinload
+
 from indico.modules.rb.models.room_bookable_hours import BookableHours
 from indico.modules.rb.models.room_nonbookable_periods import NonBookablePeriod
 from indico.modules.rb.util import WEEKDAYS
@@ -57,3 +59,21 @@ def get_rooms_nonbookable_periods(rooms, start_dt, end_dt):
                      NonBookablePeriod.start_dt <= end_dt.replace(hour=23, minute=59),
                      NonBookablePeriod.end_dt >= start_dt.replace(hour=0, minute=0)))
     return group_list(query, key=attrgetter('room_id'), sort_by=attrgetter('room_id'))
+
+
+def get_overridable_room_ids(rooms, user, allow_admin=True):
+    """Get the ids of the rooms where a user can override restrictions.
+
+    The ACLs of the rooms and their locations are loaded in bulk, so
+    this does not send any queries for each individual room.
+    """
+    from indico.modules.rb.models.rooms import Room
+    if not user or not rooms:
+        return set()
+    room_ids = {room.id for room in rooms}
+    query = (Room.query
+             .filter(Room.id.in_(room_ids))
+             .options(joinedload('owner'),
+                      selectinload('acl_entries'),
+                      selectinload('location').selectinload('acl_entries')))
+    return {room.id for room in query if room.can_override(user, allow_admin=allow_admin)}
@@ -86,13 +86,13 @@ def get_recurring_booking_suggestions(rooms, start_dt, end_dt, repeat_frequency,
     data = []
     booking_days = end_dt - start_dt
     booking_length = booking_days.days + 1
-    candidates = ReservationOccurrence.create_series(start_dt, end_dt,
-                                                     (repeat_frequency, repeat_interval, recurrence_weekdays))
+    candidates = ReservationOccurrence.create_candidates(start_dt, end_dt,
+                                                         (repeat_frequency, repeat_interval, recurrence_weekdays))
     blocked_rooms = group_blocked_rooms(get_rooms_blockings(rooms, start_dt.date(), end_dt.date()))
     unbookable_hours = get_rooms_unbookable_hours(rooms)
     nonbookable_periods = get_rooms_nonbookable_periods(rooms, start_dt, end_dt)
     conflicts = get_rooms_conflicts(rooms, start_dt, end_dt, repeat_frequency, repeat_interval, recurrence_weekdays,
-                                    blocked_rooms, nonbookable_periods, unbookable_hours)[0]
+                                    blocked_rooms, nonbookable_periods, unbookable_hours, candidates=candidates)[0]
     for room in rooms:
         if limit and len(data) == limit:
             break
@@ -6,12 +6,12 @@
 # LICENSE file for more details.
 
 from datetime import date, datetime, time
+from functools import reduce
+from operator import or_
 
 from dateutil.relativedelta import relativedelta
 
-from indico.core.db import db
-from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
-from indico.modules.rb.models.reservations import Reservation
+from indico.modules.rb.occupancy import get_booked_minutes, make_bitmap
 from indico.util.date_time import iterdays
 
 
@@ -30,32 +30,20 @@ def calculate_rooms_bookable_time(rooms, start_date=None, end_date=None):
 
 
 def calculate_rooms_booked_time(rooms, start_date=None, end_date=None):
+    """Get the number of seconds the rooms are booked during working hours.
+
+    Bookings and pre-bookings are both counted, but time during which a
+    room has overlapping (pre-)bookings is only counted once.
+    """
     if end_date is None:
         end_date = date.today() - relativedelta(days=1)
     if start_date is None:
         start_date = end_date - relativedelta(days=29)
-    # Reservations on working days
-    reservations_query = (Reservation.query
-                          .filter(Reservation.room_id.in_(r.id for r in rooms),
-                                  db.extract('dow', ReservationOccurrence.start_dt).between(1, 5),
-                                  db.cast(ReservationOccurrence.start_dt, db.Date) >= start_date,
-                                  db.cast(ReservationOccurrence.end_dt, db.Date) <= end_date,
-                                  ReservationOccurrence.is_valid)
-                          .join(Reservation.occurrences))
-
-    rsv_start = db.cast(ReservationOccurrence.start_dt, db.TIME)
-    rsv_end = db.cast(ReservationOccurrence.end_dt, db.TIME)
-    slots = ((db.cast(start, db.TIME), db.cast(end, db.TIME)) for start, end in WORKING_TIME_PERIODS)
-
-    # this basically handles all possible ways an occurrence overlaps with each one of the working time slots
-    overlaps = sum(db.case([
-        ((rsv_start < start) & (rsv_end > end), db.extract('epoch', end - start)),
-        ((rsv_start < start) & (rsv_end > start) & (rsv_end <= end), db.extract('epoch', rsv_end - start)),
-        ((rsv_start >= start) & (rsv_start < end) & (rsv_end > end), db.extract('epoch', end - rsv_start)),
-        ((rsv_start >= start) & (rsv_end <= end), db.extract('epoch', rsv_end - rsv_start))
-    ], else_=0) for start, end in slots)
-
-    return reservations_query.with_entities(db.func.sum(overlaps)).scalar() or 0
+    # only count the time booked during working hours on working days
+    working_time = reduce(or_, (make_bitmap(start, end) for start, end in WORKING_TIME_PERIODS))
+    booked_minutes = get_booked_minutes([r.id for r in rooms], start_date, end_date, working_time,
+                                        weekdays_only=True)
+    return booked_minutes * 60
 
 
 def calculate_rooms_occupancy(rooms, start=None, end=None):
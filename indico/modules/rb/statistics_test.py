@@ -0,0 +1,31 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from indico.modules.rb.models.reservations import ReservationState
+from indico.modules.rb.statistics import calculate_rooms_booked_time
+
+
+@pytest.mark.usefixtures('app_context')
+def test_calculate_rooms_booked_time(create_reservation, dummy_room):
+    # a monday in the past
+    day = date.today() - timedelta(days=date.today().weekday() + 7)
+    # only the time within the working hours (08:30-12:30 and 13:30-17:30) is counted
+    create_reservation(start_dt=datetime.combine(day, time(9)), end_dt=datetime.combine(day, time(14)),
+                       state=ReservationState.pending, allow_admin=True)
+    # time during which overlapping pre-bookings exist only counts once
+    create_reservation(start_dt=datetime.combine(day, time(13)), end_dt=datetime.combine(day, time(15)),
+                       state=ReservationState.pending, allow_admin=True)
+    # weekends are not counted
+    saturday = day + timedelta(days=5)
+    create_reservation(start_dt=datetime.combine(saturday, time(9)), end_dt=datetime.combine(saturday, time(12)),
+                       allow_admin=True)
+    assert calculate_rooms_booked_time([dummy_room], day, saturday) == (3.5 + 1.5) * 3600
+    assert calculate_rooms_booked_time([dummy_room], day + timedelta(days=1), saturday) == 0
@@ -30,7 +30,7 @@ from indico.modules.receipts.models.files import ReceiptFile
 from indico.modules.receipts.models.templates import ReceiptTemplate
 from indico.modules.receipts.schemas import ReceiptTemplateDBSchema
 from indico.modules.receipts.settings import receipt_defaults
-from indico.modules.receipts.util import (TemplateStackEntry, compile_jinja_code, create_pdf,
+from indico.modules.receipts.util import (TemplateStackEntry, compile_jinja_code, create_pdf, create_pdfs,
                                           get_event_attachment_images, get_inherited_templates,
                                           get_safe_template_context)
 from indico.util.caching import memoize_redis
@@ -231,8 +231,9 @@ class RHGenerateReceipts(RenderReceiptsBase):
             return jsonify(receipt_ids=[], errors=errors)
 
         receipt_ids = []
-        for registration in self.registrations:
-            pdf_content = create_pdf(self.event, [html_sources[registration]], self.template.css)
+        pdfs = create_pdfs(self.event, [html_sources[registration] for registration in self.registrations],
+                           self.template.css)
+        for registration, pdf_content in zip(self.registrations, pdfs, strict=True):
             timestamp = datetime.now().strftime('%Y%m%d-%H%M')
             full_filename = slugify(filename, timestamp)
             n = (ReceiptFile.query
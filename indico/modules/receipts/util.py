@@ -6,6 +6,7 @@
 # LICENSE file for more details.
 
 import dataclasses
+import threading
 import typing as t
 from datetime import datetime
 from io import BytesIO
@@ -27,6 +28,7 @@ from pygments.lexers.python import PythonLexer
 from sqlalchemy.orm import joinedload
 from sqlalchemy.sql import or_
 from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
 from webargs.flaskparser import abort
 from werkzeug.exceptions import UnprocessableEntity
 
@@ -48,6 +50,11 @@ from indico.util.iterables import materialize_iterable
 
 logger = Logger.get('receipts')
 
+#: Parsed stylesheets (along with the fonts they use), see :func:`get_stylesheet`.
+#: WeasyPrint's font configurations are not thread-safe, so each thread has its own cache.
+_stylesheet_cache = threading.local()
+_stylesheet_cache_size = 32
+
 DEFAULT_CSS = '''
 .error {
     border: 1px solid red;
@@ -229,24 +236,57 @@ def sandboxed_url_fetcher(event: Event, allow_event_images: bool = False) -> t.C
     return _fetcher
 
 
-def create_pdf(event: Event, html_sources: list[str], css: str) -> BytesIO:
-    """Create a PDF based on the given HTML sources.
+def get_stylesheet(event: Event, css: str) -> tuple[CSS, FontConfiguration]:
+    """Get a parsed stylesheet for rendering PDFs with WeasyPrint.
 
-    :param event: The `Event` the PDF relates to
-    :param html_sources: list of HTML pages (source) which will be rendered into the final document
-    :param css: CSS stylesheet to include
-    :return: a the rendered PDF blob
+    Parsing the stylesheet and loading the fonts it uses is only done
+    once per thread for the same CSS, so rendering many documents with
+    the same stylesheet (e.g. receipts or the timetable) does not have
+    to repeat it.
+
+    Since event-local URLs are not allowed in stylesheets, the parsed
+    stylesheet does not depend on the event.
+
+    :return: A ``(stylesheet, font_config)`` tuple; the font config needs
+             to be passed when rendering the document.
     """
-    css_url_fetcher = sandboxed_url_fetcher(event)
-    html_url_fetcher = sandboxed_url_fetcher(event, allow_event_images=True)
     try:
-        css = CSS(string=f'{css}{DEFAULT_CSS}', url_fetcher=css_url_fetcher)
+        cache = _stylesheet_cache.stylesheets
+    except AttributeError:
+        cache = _stylesheet_cache.stylesheets = {}
+    key = (css, receipts_settings.get('allow_external_urls'))
+    if (cached := cache.get(key)) is not None:
+        return cached
+    font_config = FontConfiguration()
+    stylesheet = CSS(string=css, url_fetcher=sandboxed_url_fetcher(event), font_config=font_config)
+    while len(cache) >= _stylesheet_cache_size:
+        # discard the oldest stylesheet
+        del cache[next(iter(cache))]
+    cache[key] = stylesheet, font_config
+    return stylesheet, font_config
+
+
+def _get_receipt_stylesheet(event: Event, css: str) -> tuple[CSS, FontConfiguration]:
+    try:
+        return get_stylesheet(event, f'{css}{DEFAULT_CSS}')
     except IndexError:
         # error happens when parsing `flex: ;` in the stylesheet
         # https://github.com/Kozea/WeasyPrint/issues/2012
         abort(422, messages={'css': [_('Could not parse stylesheet')]})
+
+
+def render_pdf(event: Event, html_sources: list[str], stylesheet: CSS, font_config: FontConfiguration) -> BytesIO:
+    """Render HTML sources into a single PDF using an already parsed stylesheet.
+
+    :param event: The `Event` the PDF relates to
+    :param html_sources: list of HTML pages (source) which will be rendered into the final document
+    :param stylesheet: The stylesheet as returned by :func:`get_stylesheet`
+    :param font_config: The font config belonging to the stylesheet
+    :return: the rendered PDF blob
+    """
+    html_url_fetcher = sandboxed_url_fetcher(event, allow_event_images=True)
     documents = [
-        HTML(string=source, url_fetcher=html_url_fetcher).render(stylesheets=(css,))
+        HTML(string=source, url_fetcher=html_url_fetcher).render(stylesheets=(stylesheet,), font_config=font_config)
         for source in html_sources
     ]
     all_pages = [p for doc in documents for p in doc.pages]
@@ -256,6 +296,33 @@ def create_pdf(event: Event, html_sources: list[str], css: str) -> BytesIO:
     return f
 
 
+def create_pdf(event: Event, html_sources: list[str], css: str) -> BytesIO:
+    """Create a PDF based on the given HTML sources.
+
+    :param event: The `Event` the PDF relates to
+    :param html_sources: list of HTML pages (source) which will be rendered into the final document
+    :param css: CSS stylesheet to include
+    :return: a the rendered PDF blob
+    """
+    return render_pdf(event, html_sources, *_get_receipt_stylesheet(event, css))
+
+
+def create_pdfs(event: Event, html_sources: list[str], css: str) -> t.Iterator[BytesIO]:
+    """Create a separate PDF for each of the given HTML sources.
+
+    This is faster than calling :func:`create_pdf` for each document
+    since the stylesheet is only prepared once.
+
+    :param event: The `Event` the PDFs relate to
+    :param html_sources: list of HTML pages (source), one per document
+    :param css: CSS stylesheet to include
+    :return: an iterator yielding the rendered PDF blobs
+    """
+    stylesheet, font_config = _get_receipt_stylesheet(event, css)
+    for source in html_sources:
+        yield render_pdf(event, [source], stylesheet, font_config)
+
+
 def get_safe_template_context(event: Event, registration: Registration, custom_fields: dict) -> dict:
     """Get a safe version of the data needed to render a document template.
 
@@ -7,12 +7,13 @@
 
 import itertools
 
+from flask import has_request_context, request, session
 from sqlalchemy.orm import contains_eager, joinedload, load_only, raiseload, selectinload, subqueryload, undefer
 from werkzeug.exceptions import BadRequest
 
 from indico.core.db import db
 from indico.core.db.sqlalchemy.links import LinkType
-from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.core.db.sqlalchemy.protection import ProtectionMode, apply_acl_entry_strategy
 from indico.core.db.sqlalchemy.util.queries import get_n_matching
 from indico.modules.attachments.models.attachments import Attachment
 from indico.modules.attachments.models.folders import AttachmentFolder
@@ -28,6 +29,7 @@ from indico.modules.events.notes.models.notes import EventNote, EventNoteRevisio
 from indico.modules.events.sessions.models.blocks import SessionBlock
 from indico.modules.events.sessions.models.principals import SessionPrincipal
 from indico.modules.events.sessions.models.sessions import Session
+from indico.modules.networks.models.networks import IPNetworkGroup
 from indico.modules.search.base import IndicoSearchProvider, SearchTarget
 from indico.modules.search.result_schemas import (AttachmentResultSchema, CategoryResultSchema,
                                                   ContributionResultSchema, EventNoteResultSchema, EventResultSchema)
@@ -35,22 +37,6 @@ from indico.modules.search.schemas import (AttachmentSchema, DetailedCategorySch
                                            HTMLStrippingEventNoteSchema, HTMLStrippingEventSchema)
 
 
-def _apply_acl_entry_strategy(rel, principal):
-    user_strategy = rel.joinedload('user')
-    user_strategy.lazyload('*')
-    user_strategy.load_only('id')
-    rel.joinedload('local_group').load_only('id')
-    if principal.allow_networks:
-        rel.joinedload('ip_network_group').load_only('id')
-    if principal.allow_category_roles:
-        rel.joinedload('category_role').load_only('id')
-    if principal.allow_event_roles:
-        rel.joinedload('event_role').load_only('id')
-    if principal.allow_registration_forms:
-        rel.joinedload('registration_form').load_only('id')
-    return rel
-
-
 def _apply_event_access_strategy(rel):
     rel.load_only('id', 'category_id', 'access_key', 'protection_mode')
     return rel
@@ -120,8 +106,8 @@ class InternalSearch(IndicoSearchProvider):
             .options(load_only('id', 'parent_id', 'protection_mode'))
         )
         Category.preload_relationships(query, 'acl_entries',
-                                       strategy=lambda rel: _apply_acl_entry_strategy(subqueryload(rel),
-                                                                                      CategoryPrincipal))
+                                       strategy=lambda rel: apply_acl_entry_strategy(subqueryload(rel),
+                                                                                     CategoryPrincipal))
         preloaded_categories |= set(query)
 
     def _can_access(self, user, obj, allow_effective_protection_mode=True, admin_override_enabled=False):
@@ -130,11 +116,15 @@ class InternalSearch(IndicoSearchProvider):
             protection_mode = (obj.effective_protection_mode if allow_effective_protection_mode
                                else obj.protection_mode)
         elif isinstance(obj, Attachment):
-            # attachments don't have it so we can only skip access checks if they
-            # are public themselves
-            protection_mode = obj.protection_mode
+            # the effective protection mode of attachments also takes their folder
+            # and the object it's linked to into account
+            protection_mode = obj.effective_protection_mode
         elif isinstance(obj, EventNote):
-            # notes inherit from their parent
+            # notes inherit from their parent, so if that one is public (even if only
+            # through inheritance) we can skip climbing up the chain - except for
+            # events, since we need to check whether they are displayed at all
+            if obj.link_type != LinkType.event and obj.effective_protection_mode == ProtectionMode.public:
+                return True
             return self._can_access(user, obj.object, allow_effective_protection_mode=False,
                                     admin_override_enabled=admin_override_enabled)
         elif isinstance(obj, SubContribution):
@@ -150,7 +140,31 @@ class InternalSearch(IndicoSearchProvider):
         return (protection_mode == ProtectionMode.public or
                 obj.can_access(user, allow_admin=admin_override_enabled))
 
-    def _paginate(self, query, page, column, user, admin_override_enabled):
+    def _get_anonymous_access_filter(self, user, protection_mode_column, event_id_column):
+        """Get an SQL filter matching the objects an anonymous user may access.
+
+        Without being logged in, only public objects and objects inside
+        events for which the user entered an access key can be accessed.
+        Objects matching the filter still need to go through the regular
+        access checks.
+
+        :return: An SQL criterion, or ``None`` if the user is logged in or
+                 may be granted access based on their IP address.
+        """
+        if user is not None:
+            return None
+        criteria = [protection_mode_column == ProtectionMode.public]
+        if has_request_context():
+            ip = request.remote_addr
+            if ip and any(group.contains_ip(str(ip)) for group in IPNetworkGroup.query):
+                return None
+            event_ids = {int(key.removeprefix('Event-')) for key in session.get('access_keys', {})
+                         if key.startswith('Event-')}
+            if event_ids:
+                criteria.append(event_id_column.in_(event_ids))
+        return db.or_(*criteria)
+
+    def _paginate(self, query, page, column, user, admin_override_enabled, *, access_filter=None):
         reverse = False
         pagenav = {'prev': None, 'next': None}
         if not page:
@@ -165,11 +179,18 @@ class InternalSearch(IndicoSearchProvider):
             pagenav['next'] = -(page - 1)
             reverse = True
 
+        prefetch_factor = 20
+        if access_filter is not None:
+            # almost everything matching the filter is accessible, so we can get
+            # a full page with a single query instead of over-fetching
+            query = query.filter(access_filter)
+            prefetch_factor = 1
+
         preloaded_categories = set()
         res = get_n_matching(
             query, self.RESULTS_PER_PAGE + 1,
             lambda obj: self._can_access(user, obj, admin_override_enabled=admin_override_enabled),
-            prefetch_factor=20,
+            prefetch_factor=prefetch_factor,
             preload_bulk=lambda objs: self._preload_categories(objs, preloaded_categories)
         )
 
@@ -222,7 +243,7 @@ class InternalSearch(IndicoSearchProvider):
             .options(
                 load_only('id', 'category_id', 'access_key', 'protection_mode'),
                 undefer(Event.effective_protection_mode),
-                _apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
+                apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
             )
         )
         objs, pagenav = self._paginate(query, page, Event.id, user, admin_override_enabled)
@@ -266,13 +287,13 @@ class InternalSearch(IndicoSearchProvider):
             .options(
                 load_only('id', 'session_id', 'event_id', 'protection_mode'),
                 undefer(Contribution.effective_protection_mode),
-                _apply_acl_entry_strategy(selectinload(Contribution.acl_entries), ContributionPrincipal),
+                apply_acl_entry_strategy(selectinload(Contribution.acl_entries), ContributionPrincipal),
                 joinedload(Contribution.session).options(
                     load_only('id', 'protection_mode', 'event_id'),
                     selectinload(Session.acl_entries)
                 ),
                 contains_eager('event').options(
-                    _apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
+                    apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
                 )
             )
         )
@@ -323,25 +344,25 @@ class InternalSearch(IndicoSearchProvider):
         subcontrib_event = db.aliased(Event)
         session_event = db.aliased(Event)
 
-        attachment_strategy = _apply_acl_entry_strategy(selectinload(Attachment.acl_entries), AttachmentPrincipal)
+        attachment_strategy = apply_acl_entry_strategy(selectinload(Attachment.acl_entries), AttachmentPrincipal)
         folder_strategy = contains_eager(Attachment.folder)
         folder_strategy.load_only('id', 'protection_mode', 'link_type', 'category_id', 'event_id', 'linked_event_id',
                                   'contribution_id', 'subcontribution_id', 'session_id')
-        _apply_acl_entry_strategy(folder_strategy.selectinload(AttachmentFolder.acl_entries), AttachmentFolderPrincipal)
+        apply_acl_entry_strategy(folder_strategy.selectinload(AttachmentFolder.acl_entries), AttachmentFolderPrincipal)
         # event
         event_strategy = folder_strategy.contains_eager(AttachmentFolder.linked_event)
         _apply_event_access_strategy(event_strategy)
-        _apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
         # contribution
         contrib_strategy = folder_strategy.contains_eager(AttachmentFolder.contribution)
         _apply_contrib_access_strategy(contrib_strategy)
-        _apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
+        apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
         contrib_event_strategy = contrib_strategy.contains_eager(Contribution.event.of_type(contrib_event))
         _apply_event_access_strategy(contrib_event_strategy)
-        _apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
         contrib_session_strategy = contrib_strategy.contains_eager(Contribution.session.of_type(contrib_session))
         contrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
         # subcontribution
         subcontrib_strategy = folder_strategy.contains_eager(AttachmentFolder.subcontribution)
         subcontrib_strategy.load_only('id', 'contribution_id', 'title')
@@ -349,26 +370,26 @@ class InternalSearch(IndicoSearchProvider):
             SubContribution.contribution.of_type(subcontrib_contrib)
         )
         _apply_contrib_access_strategy(subcontrib_contrib_strategy)
-        _apply_acl_entry_strategy(subcontrib_contrib_strategy
-                                  .selectinload(subcontrib_contrib.acl_entries), ContributionPrincipal)
+        apply_acl_entry_strategy(subcontrib_contrib_strategy
+                                 .selectinload(subcontrib_contrib.acl_entries), ContributionPrincipal)
         subcontrib_event_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.event.of_type(subcontrib_event)
         )
         _apply_event_access_strategy(subcontrib_event_strategy)
-        _apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
         subcontrib_session_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.session.of_type(subcontrib_session)
         )
         subcontrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
-                                  SessionPrincipal)
+        apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
+                                 SessionPrincipal)
         # session
         session_strategy = folder_strategy.contains_eager(AttachmentFolder.session)
         session_strategy.load_only('id', 'event_id', 'protection_mode')
         session_event_strategy = session_strategy.contains_eager(Session.event.of_type(session_event))
         _apply_event_access_strategy(session_event_strategy)
         session_event_strategy.selectinload(session_event.acl_entries)
-        _apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
 
         attachment_filters = [
             Attachment.title_matches(q),
@@ -407,7 +428,8 @@ class InternalSearch(IndicoSearchProvider):
             Attachment.query
             .join(Attachment.folder)
             .filter(*attachment_filters)
-            .options(folder_strategy, attachment_strategy, joinedload(Attachment.user))
+            .options(folder_strategy, attachment_strategy, joinedload(Attachment.user),
+                     undefer(Attachment.effective_protection_mode))
             .outerjoin(AttachmentFolder.linked_event)
             .outerjoin(AttachmentFolder.contribution)
             .outerjoin(Contribution.event.of_type(contrib_event))
@@ -420,7 +442,10 @@ class InternalSearch(IndicoSearchProvider):
             .outerjoin(Session.event.of_type(session_event))
         )
 
-        objs, pagenav = self._paginate(query, page, Attachment.id, user, admin_override_enabled)
+        access_filter = self._get_anonymous_access_filter(user, Attachment.effective_protection_mode,
+                                                          AttachmentFolder.event_id)
+        objs, pagenav = self._paginate(query, page, Attachment.id, user, admin_override_enabled,
+                                       access_filter=access_filter)
 
         query = (
             Attachment.query
@@ -450,47 +475,48 @@ class InternalSearch(IndicoSearchProvider):
 
         note_strategy = load_only('id', 'link_type', 'event_id', 'linked_event_id', 'contribution_id',
                                   'subcontribution_id', 'session_id', 'html')
+        note_strategy.undefer(EventNote.effective_protection_mode)
         # event
         event_strategy = note_strategy.contains_eager(EventNote.linked_event)
         event_strategy.undefer(Event.effective_protection_mode)
         _apply_event_access_strategy(event_strategy)
-        _apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
         # contribution
         contrib_strategy = note_strategy.contains_eager(EventNote.contribution)
         _apply_contrib_access_strategy(contrib_strategy)
-        _apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
+        apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
         contrib_event_strategy = contrib_strategy.contains_eager(Contribution.event.of_type(contrib_event))
         _apply_event_access_strategy(contrib_event_strategy)
-        _apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
         contrib_session_strategy = contrib_strategy.contains_eager(Contribution.session.of_type(contrib_session))
         contrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
         # subcontribution
         subcontrib_strategy = note_strategy.contains_eager(EventNote.subcontribution)
         subcontrib_contrib_strategy = subcontrib_strategy.contains_eager(
             SubContribution.contribution.of_type(subcontrib_contrib)
         )
         _apply_contrib_access_strategy(subcontrib_contrib_strategy)
-        _apply_acl_entry_strategy(subcontrib_contrib_strategy
-                                  .selectinload(subcontrib_contrib.acl_entries), ContributionPrincipal)
+        apply_acl_entry_strategy(subcontrib_contrib_strategy
+                                 .selectinload(subcontrib_contrib.acl_entries), ContributionPrincipal)
         subcontrib_event_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.event.of_type(subcontrib_event)
         )
         _apply_event_access_strategy(subcontrib_event_strategy)
-        _apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
         subcontrib_session_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.session.of_type(subcontrib_session)
         )
         subcontrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
-                                  SessionPrincipal)
+        apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
+                                 SessionPrincipal)
         # session
         session_strategy = note_strategy.contains_eager(EventNote.session)
         session_strategy.load_only('id', 'event_id', 'protection_mode')
         session_event_strategy = session_strategy.contains_eager(Session.event.of_type(session_event))
         _apply_event_access_strategy(session_event_strategy)
         session_event_strategy.selectinload(session_event.acl_entries)
-        _apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
 
         note_filters = [
             EventNote.html_matches(q),
@@ -539,7 +565,9 @@ class InternalSearch(IndicoSearchProvider):
             .outerjoin(Session.event.of_type(session_event))
         )
 
-        objs, pagenav = self._paginate(query, page, EventNote.id, user, admin_override_enabled)
+        access_filter = self._get_anonymous_access_filter(user, EventNote.effective_protection_mode, EventNote.event_id)
+        objs, pagenav = self._paginate(query, page, EventNote.id, user, admin_override_enabled,
+                                       access_filter=access_filter)
 
         query = (
             EventNote.query
@@ -51,11 +51,11 @@ from indico.modules.users.models.users import ProfilePictureSource, UserTitle
 from indico.modules.users.operations import create_user, delete_or_anonymize_user
 from indico.modules.users.schemas import (AffiliationSchema, BasicCategorySchema, FavoriteEventSchema,
                                           UserPersonalDataSchema)
-from indico.modules.users.util import (get_avatar_url_from_name, get_gravatar_for_user, get_linked_events,
-                                       get_mastodon_server_name, get_related_categories, get_suggested_categories,
-                                       get_unlisted_events, get_user_by_email, get_user_titles, log_user_update,
-                                       merge_users, search_affiliations, search_users, send_avatar, serialize_user,
-                                       set_user_avatar)
+from indico.modules.users.util import (count_users, get_avatar_url_from_name, get_gravatar_for_user,
+                                       get_linked_events, get_mastodon_server_name, get_related_categories,
+                                       get_suggested_categories, get_unlisted_events, get_user_by_email,
+                                       get_user_titles, log_user_update, merge_users, search_affiliations,
+                                       search_users, send_avatar, serialize_user, set_user_avatar)
 from indico.modules.users.views import (WPUser, WPUserDashboard, WPUserDataExport, WPUserFavorites, WPUserPersonalData,
                                         WPUserProfilePic, WPUsersAdmin)
 from indico.util.date_time import now_utc
@@ -919,6 +919,9 @@ search_result_schema = UserSearchResultSchema()
 class RHUserSearch(RHProtected):
     """Search for users based on given criteria."""
 
+    #: the maximum number of users returned
+    MAX_RESULTS = 10
+
     def _serialize_pending_user(self, entry):
         first_name = entry.data.get('first_name') or ''
         last_name = entry.data.get('last_name') or ''
@@ -981,7 +984,8 @@ class RHUserSearch(RHProtected):
         'No criteria provided'
     ), location='query')
     def _process(self, exact, external, favorites_first, **criteria):
-        matches = search_users(exact=exact, include_pending=True, external=external, **criteria)
+        matches = search_users(exact=exact, include_pending=True, external=external, favorites_first=favorites_first,
+                               limit=self.MAX_RESULTS, **criteria)
         self.externals = {}
 
         def _sort_key(entry):
@@ -999,7 +1003,10 @@ class RHUserSearch(RHProtected):
             favorites = {u.id for u in session.user.favorite_users}
             results.sort(key=lambda x: x['id'] not in favorites)
         total = len(results)
-        results = results[:10]
+        if sum(isinstance(entry, User) for entry in matches) == self.MAX_RESULTS:
+            # there may be more matching users than the ones we loaded
+            total += count_users(exact=exact, include_pending=True, **criteria) - self.MAX_RESULTS
+        results = results[:self.MAX_RESULTS]
         self._process_pending_users(results)
         return jsonify(users=results, total=total)
 
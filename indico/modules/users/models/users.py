@@ -17,7 +17,7 @@ from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import object_session
+from sqlalchemy.orm import column_property, object_session
 from sqlalchemy.sql import select
 from werkzeug.utils import cached_property
 
@@ -349,6 +349,11 @@ class User(PersonMixin, db.Model):
     #: all emails of the user. read-only; use it only for searching by email! also, do not use it between
     #: modifying `email` or `secondary_emails` and a session expire/commit!
     all_emails = association_proxy('_all_emails', 'email')  # read-only!
+    #: the user's name in both "first last" and "last first" order. these expressions are
+    #: only meant for searching, as they have trigram indexes which allow fast substring
+    #: and prefix matches on the full name
+    search_name = column_property(first_name + ' ' + last_name, deferred=True)
+    search_name_reversed = column_property(last_name + ' ' + first_name, deferred=True)
 
     #: the user this user has been merged into
     merged_into_user = db.relationship(
@@ -872,3 +877,5 @@ define_unaccented_lowercase_index(User.last_name)
 define_unaccented_lowercase_index(User.affiliation)
 define_unaccented_lowercase_index(User.phone)
 define_unaccented_lowercase_index(User.address)
+define_unaccented_lowercase_index(User.search_name, User.__table__, 'ix_users_search_name_unaccent')
+define_unaccented_lowercase_index(User.search_name_reversed, User.__table__, 'ix_users_search_name_reversed_unaccent')
@@ -7,20 +7,26 @@
 
 import hashlib
 import os
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import cache
 from io import BytesIO
 from operator import attrgetter, itemgetter
 
 import requests
-from flask import render_template, session
+from flask import current_app, render_template, session
+from flask_multipass import IdentityInfo
 from PIL import Image
-from sqlalchemy.orm import contains_eager, joinedload, load_only, undefer
+from sqlalchemy.orm import contains_eager, joinedload, load_only, selectinload, undefer
 from sqlalchemy.sql.expression import nullslast
 from werkzeug.http import http_date, parse_date
 
 from indico.core import signals
 from indico.core.auth import multipass
+from indico.core.cache import make_scoped_cache
+from indico.core.config import config
 from indico.core.db import db
 from indico.core.db.sqlalchemy.custom.unaccent import unaccent_match
 from indico.core.db.sqlalchemy.principals import PrincipalMixin, PrincipalPermissionsMixin, PrincipalType
@@ -49,6 +55,11 @@ from indico.web.flask.util import send_file, url_for
 from indico.web.util import strip_path_from_url
 
 
+EXTERNAL_SEARCH_CACHE = make_scoped_cache('external-user-search')
+EXTERNAL_SEARCH_CACHE_TTL = 300
+#: The maximum number of concurrent searches per identity provider
+EXTERNAL_SEARCH_MAX_WORKERS = 4
+
 # colors for user-specific avatar bubbles
 user_colors = ['#e06055', '#ff8a65', '#e91e63', '#f06292', '#673ab7', '#ba68c8', '#7986cb', '#3f51b5', '#5e97f6',
                '#00a4e4', '#4dd0e1', '#0097a7', '#d4e157', '#aed581', '#57bb8a', '#4db6ac', '#607d8b', '#795548',
@@ -114,6 +125,128 @@ def get_suggested_categories(user):
     return res
 
 
+def _build_user_event_role_queries(user, dt=None):
+    """Build the queries finding the events in which a user has a role.
+
+    :param user: A `User`
+    :param dt: Only include events taking place on/after that date
+    :return: A list of ``(role, query)`` tuples.  Each query returns
+             ``(event_id, role)`` rows for the events where the user
+             has that role.
+    """
+    from indico.modules.events.abstracts.models.abstracts import Abstract, AbstractState
+    from indico.modules.events.abstracts.models.persons import AbstractPersonLink
+    from indico.modules.events.contributions.models.contributions import Contribution
+    from indico.modules.events.contributions.models.persons import ContributionPersonLink, SubContributionPersonLink
+    from indico.modules.events.contributions.models.principals import ContributionPrincipal
+    from indico.modules.events.contributions.models.subcontributions import SubContribution
+    from indico.modules.events.models.events import EventType
+    from indico.modules.events.models.persons import EventPerson
+    from indico.modules.events.models.principals import EventPrincipal
+    from indico.modules.events.registration.models.forms import RegistrationForm
+    from indico.modules.events.registration.models.registrations import Registration
+    from indico.modules.events.sessions.models.principals import SessionPrincipal
+    from indico.modules.events.sessions.models.sessions import Session
+    from indico.modules.events.surveys.models.submissions import SurveySubmission
+    from indico.modules.events.surveys.models.surveys import Survey
+    from indico.modules.events.tracks.models.principals import TrackPrincipal
+    from indico.modules.events.tracks.models.tracks import Track
+    from indico.modules.users.models.favorites import favorite_event_table
+
+    def _make_query(role, event_id_column, *criteria, joins=(), event_criteria=None):
+        if event_criteria is None:
+            event_criteria = [~Event.is_deleted, Event.ends_after(dt)]
+        query = db.select([event_id_column.label('event_id'), db.literal(role).label('role')])
+        for target, onclause in joins:
+            query = query.join(target, onclause)
+        if event_id_column is not Event.id:
+            query = query.join(Event, Event.id == event_id_column)
+        return role, query.where(db.and_(*criteria, *event_criteria))
+
+    def _make_acl_query(role, criterion):
+        return _make_query(role, EventPrincipal.event_id, EventPrincipal.user_id == user.id, criterion)
+
+    def _make_session_acl_query(role, criterion):
+        return _make_query(role, Session.event_id, SessionPrincipal.user_id == user.id, ~Session.is_deleted,
+                           criterion, joins=[(SessionPrincipal, SessionPrincipal.session_id == Session.id)])
+
+    def _make_contribution_acl_query(role, criterion):
+        return _make_query(role, Contribution.event_id, ContributionPrincipal.user_id == user.id,
+                           ~Contribution.is_deleted, criterion,
+                           joins=[(ContributionPrincipal, ContributionPrincipal.contribution_id == Contribution.id)])
+
+    def _make_track_acl_query(role, permission):
+        return _make_query(role, Track.event_id, TrackPrincipal.user_id == user.id,
+                           TrackPrincipal.permissions.any(permission),
+                           joins=[(TrackPrincipal, TrackPrincipal.track_id == Track.id)])
+
+    def _make_event_person_query(role, *criteria):
+        return _make_query(role, EventPerson.event_id, EventPerson.user_id == user.id, *criteria)
+
+    bad_abstract_states = {AbstractState.withdrawn, AbstractState.rejected}
+    has_abstract = EventPerson.abstract_links.any(AbstractPersonLink.abstract.has(
+        db.and_(~Abstract.state.in_(bad_abstract_states), ~Abstract.is_deleted)))
+    has_contrib = EventPerson.contribution_links.any(
+        ContributionPersonLink.contribution.has(~Contribution.is_deleted))
+    has_subcontrib = EventPerson.subcontribution_links.any(
+        SubContributionPersonLink.subcontribution.has(db.and_(
+            ~SubContribution.is_deleted,
+            SubContribution.contribution.has(~Contribution.is_deleted))))
+    paper_permissions = ('paper_manager', 'paper_judge', 'paper_content_reviewer', 'paper_layout_reviewer')
+
+    return [
+        _make_query('registration_registrant', Registration.event_id, Registration.user_id == user.id,
+                    Registration.is_active, ~RegistrationForm.is_deleted,
+                    joins=[(RegistrationForm, RegistrationForm.id == Registration.registration_form_id)]),
+        _make_query('survey_submitter', Survey.event_id, SurveySubmission.user_id == user.id, ~Survey.is_deleted,
+                    joins=[(SurveySubmission, SurveySubmission.survey_id == Survey.id)]),
+        _make_acl_query('conference_manager', EventPrincipal.has_management_permission('ANY')),
+        _make_query('conference_creator', Event.id, Event.creator_id == user.id),
+        _make_session_acl_query('session_coordinator', SessionPrincipal.permissions.any('coordinate')),
+        _make_session_acl_query('session_submission', SessionPrincipal.permissions.any('submit')),
+        _make_session_acl_query('session_manager', SessionPrincipal.full_access),
+        _make_session_acl_query('session_access', SessionPrincipal.read_access),
+        _make_contribution_acl_query('contribution_submission', ContributionPrincipal.permissions.any('submit')),
+        _make_contribution_acl_query('contribution_manager', ContributionPrincipal.full_access),
+        _make_contribution_acl_query('contribution_access', ContributionPrincipal.read_access),
+        _make_event_person_query('contributor', has_contrib | has_subcontrib),
+        _make_event_person_query('lecture_speaker', EventPerson.event_links.any(), Event._type == EventType.lecture),
+        _make_event_person_query('conference_chair', EventPerson.event_links.any(), Event._type != EventType.lecture),
+        _make_acl_query('abstract_reviewer', EventPrincipal.permissions.any('review_all_abstracts')),
+        _make_track_acl_query('abstract_reviewer', 'review'),
+        _make_acl_query('track_convener', EventPrincipal.permissions.any('convene_all_abstracts')),
+        _make_track_acl_query('track_convener', 'convene'),
+        _make_query('abstract_submitter', Abstract.event_id, Abstract.submitter_id == user.id, ~Abstract.is_deleted,
+                    ~Abstract.state.in_(bad_abstract_states)),
+        _make_event_person_query('abstract_person', has_abstract),
+        *(_make_acl_query(permission, EventPrincipal.has_management_permission(permission, explicit=True))
+          for permission in paper_permissions),
+        # favorites are shown even if they already ended, as long as they started after `dt`
+        _make_query('favorited', favorite_event_table.c.target_id, favorite_event_table.c.user_id == user.id,
+                    event_criteria=([Event.start_dt >= dt] if dt is not None else [])),
+    ]
+
+
+def get_user_event_roles(user, dt=None, roles=None):
+    """Get the events a user is linked to and the user's roles in them.
+
+    The roles in all events are retrieved using a single query.
+
+    :param user: A `User`
+    :param dt: Only include events taking place on/after that date
+    :param roles: Only include these roles instead of all of them
+    :return: A dict mapping event ids to a set of roles
+    """
+    queries = [query for role, query in _build_user_event_role_queries(user, dt)
+               if roles is None or role in roles]
+    links = defaultdict(set)
+    if not queries:
+        return links
+    for event_id, role in db.session.execute(db.union_all(*queries)):
+        links[event_id].add(role)
+    return links
+
+
 def get_linked_events(user, dt=None, limit=None, load_also=(), extra_options=()):
     """Get the linked events and the user's roles in them.
 
@@ -121,41 +254,7 @@ def get_linked_events(user, dt=None, limit=None, load_also=(), extra_options=())
     :param dt: Only include events taking place on/after that date
     :param limit: Max number of events
     """
-    from indico.modules.events.abstracts.util import (get_events_with_abstract_persons,
-                                                      get_events_with_abstract_reviewer_convener)
-    from indico.modules.events.contributions.util import get_events_with_linked_contributions
-    from indico.modules.events.papers.util import get_events_with_paper_roles
-    from indico.modules.events.registration.util import get_events_registered
-    from indico.modules.events.sessions.util import get_events_with_linked_sessions
-    from indico.modules.events.surveys.util import get_events_with_submitted_surveys
-    from indico.modules.events.util import (get_events_created_by, get_events_managed_by,
-                                            get_events_with_linked_event_persons)
-
-    links = {}
-    for event_id in get_events_registered(user, dt):
-        links.setdefault(event_id, set()).add('registration_registrant')
-    for event_id in get_events_with_submitted_surveys(user, dt):
-        links.setdefault(event_id, set()).add('survey_submitter')
-    for event_id in get_events_managed_by(user, dt):
-        links.setdefault(event_id, set()).add('conference_manager')
-    for event_id in get_events_created_by(user, dt):
-        links.setdefault(event_id, set()).add('conference_creator')
-    for event_id, principal_roles in get_events_with_linked_sessions(user, dt).items():
-        links.setdefault(event_id, set()).update(principal_roles)
-    for event_id, principal_roles in get_events_with_linked_contributions(user, dt).items():
-        links.setdefault(event_id, set()).update(principal_roles)
-    for event_id, role in get_events_with_linked_event_persons(user, dt).items():
-        links.setdefault(event_id, set()).add(role)
-    for event_id, roles in get_events_with_abstract_reviewer_convener(user, dt).items():
-        links.setdefault(event_id, set()).update(roles)
-    for event_id, roles in get_events_with_abstract_persons(user, dt).items():
-        links.setdefault(event_id, set()).update(roles)
-    for event_id, roles in get_events_with_paper_roles(user, dt).items():
-        links.setdefault(event_id, set()).update(roles)
-    for event in user.favorite_events:
-        if dt is None or event.start_dt >= dt:
-            links.setdefault(event.id, set()).add('favorited')
-
+    links = get_user_event_roles(user, dt)
     if not links:
         return {}
 
@@ -212,15 +311,49 @@ def serialize_user(user):
 
 
 def _build_name_search(name_list):
-    text = remove_accents('%{}%'.format('%'.join(escape_like(name) for name in name_list)))
-    return db.or_(db.func.indico.indico_unaccent(db.func.concat(User.first_name, ' ', User.last_name)).ilike(text),
-                  db.func.indico.indico_unaccent(db.func.concat(User.last_name, ' ', User.first_name)).ilike(text))
+    text = remove_accents('%{}%'.format('%'.join(escape_like(name) for name in name_list)).lower())
+    return db.or_(db.func.indico.indico_unaccent(db.func.lower(User.search_name)).ilike(text),
+                  db.func.indico.indico_unaccent(db.func.lower(User.search_name_reversed)).ilike(text))
+
+
+def _build_match_rank(column, value):
+    """Build an expression ranking how well a column matches a search string.
+
+    Exact matches come first (0), followed by prefix matches (1) and any
+    other matches (2).
+    """
+    column = db.func.indico.indico_unaccent(db.func.lower(column))
+    value = escape_like(value).lower()
+    return db.case([(column.ilike(db.func.indico.indico_unaccent(value)), 0),
+                    (column.ilike(db.func.indico.indico_unaccent(f'{value}%')), 1)],
+                   else_=2)
+
+
+def _build_name_rank(name_list):
+    text = ' '.join(name_list)
+    return db.func.least(_build_match_rank(User.search_name, text),
+                         _build_match_rank(User.search_name_reversed, text))
+
+
+def _build_email_rank(email):
+    email = email.lower()
+    return db.case([(User._all_emails.any(UserEmail.email == email), 0),
+                    (User._all_emails.any(UserEmail.email.like(f'{escape_like(email)}%')), 1)],
+                   else_=2)
 
 
 def build_user_search_query(criteria, exact=False, include_deleted=False, include_pending=False,
                             include_blocked=False, favorites_first=False):
+    """Build a query searching for users.
+
+    Users matching all criteria are returned, ordered by relevance:
+    when doing a non-exact search, users whose values are exact matches
+    come first, followed by prefix matches and then any other matches.
+    All filters can use the trigram indexes on the searched columns.
+    """
     unspecified = object()
-    query = User.query.distinct(User.id).options(db.joinedload(User._all_emails))
+    query = User.query.options(db.joinedload(User._all_emails))
+    ranks = []
 
     if not include_pending:
         query = query.filter(~User.is_pending)
@@ -231,7 +364,8 @@ def build_user_search_query(criteria, exact=False, include_deleted=False, includ
 
     email = criteria.pop('email', unspecified)
     if email is not unspecified:
-        query = query.join(UserEmail).filter(unaccent_match(UserEmail.email, email, exact))
+        query = query.filter(User._all_emails.any(unaccent_match(UserEmail.email, email, exact)))
+        ranks.append(_build_email_rank(email))
 
     # search on any of the name fields (first_name OR last_name)
     name = criteria.pop('name', unspecified)
@@ -240,23 +374,35 @@ def build_user_search_query(criteria, exact=False, include_deleted=False, includ
             raise ValueError("'name' is not compatible with 'exact'")
         if 'first_name' in criteria or 'last_name' in criteria:
             raise ValueError("'name' is not compatible with (first|last)_name")
-        query = query.filter(_build_name_search(name.replace(',', '').split()))
+        name_list = name.replace(',', '').split()
+        query = query.filter(_build_name_search(name_list))
+        ranks.append(_build_name_rank(name_list))
 
     for k, v in criteria.items():
         query = query.filter(unaccent_match(getattr(User, k), v, exact))
-
-    # wrap as subquery so we can apply order regardless of distinct-by-id
-    query = query.from_self()
+        ranks.append(_build_match_rank(getattr(User, k), v))
 
     if favorites_first:
         query = (query.outerjoin(favorite_user_table, db.and_(favorite_user_table.c.user_id == session.user.id,
                                                               favorite_user_table.c.target_id == User.id))
                  .order_by(nullslast(favorite_user_table.c.user_id)))
+    if ranks and not exact:
+        query = query.order_by(sum(ranks[1:], ranks[0]))
     return query.order_by(db.func.lower(db.func.indico.indico_unaccent(User.first_name)),
                           db.func.lower(db.func.indico.indico_unaccent(User.last_name)),
                           User.id)
 
 
+def _get_existing_emails(emails, include_deleted=False):
+    """Get the given emails which already belong to a user."""
+    if not emails:
+        return set()
+    query = db.session.query(UserEmail.email).filter(UserEmail.email.in_(emails))
+    if not include_deleted:
+        query = query.filter(~UserEmail.is_user_deleted)
+    return {email for email, in query}
+
+
 def _deduplicate_identities(identities):
     by_email = defaultdict(list)
     for ident in identities:
@@ -274,8 +420,91 @@ def _deduplicate_identities(identities):
         yield mail_identities[0]
 
 
+@cache
+def _get_external_search_executor(provider_name):
+    # each provider gets its own pool so a provider which does not respond
+    # anymore cannot use up the threads needed to search the other ones
+    return ThreadPoolExecutor(max_workers=EXTERNAL_SEARCH_MAX_WORKERS,
+                              thread_name_prefix=f'indico-identity-search-{provider_name}')
+
+
+def _get_external_search_cache_key(provider, exact, criteria):
+    criteria = sorted((key, ' '.join(value.lower().split())) for key, value in criteria.items())
+    query_hash = hashlib.sha1(repr((exact, criteria)).encode()).hexdigest()
+    return f'{provider.name}-{query_hash}'
+
+
+def _search_provider_identities(app, provider, exact, criteria):
+    with app.app_context():
+        return list(multipass.search_identities(providers={provider.name}, exact=exact, **criteria))
+
+
+def _restore_identity(provider, identifier, multipass_data, data):
+    # the cached data has already been mapped to our keys, so we need to pass it
+    # in the format used by the provider in order to get the same data again
+    mapping = provider.settings.get('mapping') or {}
+    provider_data = {key: value for key, value in data.items() if key not in mapping}
+    provider_data.update((provider_key, data[key]) for key, provider_key in mapping.items() if key in data)
+    return IdentityInfo(provider, identifier, multipass_data, **provider_data)
+
+
+def search_external_identities(exact=False, **criteria):
+    """Search all identity providers for users matching the given criteria.
+
+    The identity providers are searched concurrently in the background,
+    so the caller can do other work (such as searching the local users)
+    while waiting for them.  The results of each provider are cached
+    for a few minutes.
+
+    Providers which do not respond within their ``search_timeout`` (or
+    :data:`EXTERNAL_USER_SEARCH_TIMEOUT` if they do not specify one)
+    are skipped, so the results may be incomplete.
+
+    :param exact: Indicates if only exact matches should be returned.
+    :param criteria: The search criteria passed to the providers.
+    :return: A function which waits for the search to finish and then
+             returns the list of matching identities.
+    """
+    app = current_app._get_current_object()
+    start = time.monotonic()
+    searches = []
+    for provider in multipass.identity_providers.values():
+        if not provider.supports_search:
+            continue
+        cache_key = _get_external_search_cache_key(provider, exact, criteria)
+        cached = EXTERNAL_SEARCH_CACHE.get(cache_key)
+        if cached is not None:
+            searches.append((provider, cache_key, cached, None))
+        else:
+            future = _get_external_search_executor(provider.name).submit(_search_provider_identities, app,
+                                                                         provider, exact, criteria)
+            searches.append((provider, cache_key, None, future))
+
+    def _get_results():
+        identities = []
+        for provider, cache_key, cached, future in searches:
+            if future is None:
+                identities += [_restore_identity(provider, *entry) for entry in cached]
+                continue
+            timeout = provider.settings.get('search_timeout', config.EXTERNAL_USER_SEARCH_TIMEOUT)
+            try:
+                result = future.result(timeout=(max(0, start + timeout - time.monotonic())
+                                                if timeout is not None else None))
+            except TimeoutError:
+                future.cancel()
+                logger.warning('Searching identity provider %s timed out after %ss', provider.name, timeout)
+                continue
+            EXTERNAL_SEARCH_CACHE.set(cache_key, [(ident.identifier, ident.multipass_data, ident.data)
+                                                  for ident in result],
+                                      timeout=EXTERNAL_SEARCH_CACHE_TTL)
+            identities += result
+        return identities
+
+    return _get_results
+
+
 def search_users(exact=False, include_deleted=False, include_pending=False, include_blocked=False,
-                 external=False, allow_system_user=False, **criteria):
+                 external=False, allow_system_user=False, favorites_first=False, limit=None, **criteria):
     """Search for users.
 
     :param exact: Indicates if only exact matches should be returned.
@@ -288,9 +517,18 @@ def search_users(exact=False, include_deleted=False, include_pending=False, incl
     :param include_blocked: Indicates if also users marked as blocked
                             should be returned.
     :param external: Indicates if identity providers should be searched
-                     for matching users.
+                     for matching users.  They are searched concurrently
+                     with the local users, and providers which are too
+                     slow to respond are skipped.
     :param allow_system_user: Whether the system user may be returned
                               in the search results.
+    :param favorites_first: Whether the favorite users of the current
+                            user should be preferred when applying the
+                            `limit`.
+    :param limit: The maximum number of Indico users to return.  The
+                  most relevant matches are returned, i.e. exact and
+                  prefix matches are preferred.  External users are
+                  not affected by this limit.
     :param criteria: A dict containing any of the following keys:
                      name, first_name, last_name, email, affiliation, phone,
                      address
@@ -304,10 +542,15 @@ def search_users(exact=False, include_deleted=False, include_pending=False, incl
     if not criteria:
         return set()
 
+    # search identity providers in the background while querying the local users
+    get_external_identities = search_external_identities(exact=exact, **criteria) if external else None
+
     query = (build_user_search_query(dict(criteria), exact=exact, include_deleted=include_deleted,
-                                     include_pending=include_pending, include_blocked=include_blocked)
+                                     include_pending=include_pending, include_blocked=include_blocked,
+                                     favorites_first=favorites_first)
              .options(db.joinedload(User.identities),
-                      db.joinedload(User.merged_into_user)))
+                      db.joinedload(User.merged_into_user))
+             .limit(limit))
 
     found_emails = {}
     found_identities = {}
@@ -322,17 +565,41 @@ def search_users(exact=False, include_deleted=False, include_pending=False, incl
 
     # external user providers
     if external:
-        identities = multipass.search_identities(exact=exact, **criteria)
-
-        for ident in _deduplicate_identities(identities):
+        identities = list(_deduplicate_identities(get_external_identities()))
+        # with a limit, some matching Indico users may not have been loaded, but their
+        # external identities must not show up as separate users either
+        existing_emails = set()
+        if limit is not None:
+            existing_emails = _get_existing_emails({ident.data['email'].lower() for ident in identities},
+                                                   include_deleted=include_deleted)
+
+        for ident in identities:
+            email = ident.data['email'].lower()
             if ((ident.provider.name, ident.identifier) not in found_identities and
-                    ident.data['email'].lower() not in found_emails):
-                found_emails[ident.data['email'].lower()] = ident
+                    email not in found_emails and email not in existing_emails):
+                found_emails[email] = ident
                 found_identities[(ident.provider, ident.identifier)] = ident
 
     return set(found_emails.values()) | system_user
 
 
+def count_users(exact=False, include_deleted=False, include_pending=False, include_blocked=False,
+                allow_system_user=False, **criteria):
+    """Count the Indico users matching the given criteria.
+
+    This accepts the same arguments as :func:`search_users`, but never
+    searches any external identity providers.
+    """
+    criteria = {key: value.strip() for key, value in criteria.items() if value.strip()}
+    if not criteria:
+        return 0
+    query = build_user_search_query(criteria, exact=exact, include_deleted=include_deleted,
+                                    include_pending=include_pending, include_blocked=include_blocked)
+    if not allow_system_user:
+        query = query.filter(~User.is_system)
+    return query.order_by(None).count()
+
+
 def get_user_by_email(email, create_pending=False):
     """Find a user based on his email address.
 
@@ -367,6 +634,28 @@ def get_user_by_email(email, create_pending=False):
     return user
 
 
+def get_users_by_email(emails):
+    """Find the users for many email addresses at once.
+
+    This is equivalent to calling :func:`get_user_by_email` for each
+    email address (without `create_pending`), but only uses a single
+    query.
+
+    :param emails: The email addresses to look up.
+    :return: A dict mapping the (lowercased) email addresses to
+             :class:`.User` instances; emails for which no user was
+             found are not included.
+    """
+    emails = {email.lower().strip() for email in emails} - {''}
+    if not emails:
+        return {}
+    query = (db.session.query(UserEmail.email, User)
+             .join(User, User.id == UserEmail.user_id)
+             .filter(~User.is_deleted, UserEmail.email.in_(emails))
+             .options(selectinload(User._all_emails)))
+    return dict(query)
+
+
 def merge_users(source, target, force=False):
     """Merge two users together, unifying all related data.
 
@@ -0,0 +1,156 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import time
+from datetime import timedelta
+
+import pytest
+from flask_multipass import IdentityInfo, IdentityProvider
+
+from indico.core.auth import multipass
+from indico.core.cache import ScopedCache
+from indico.modules.users import User, util
+from indico.modules.users.util import (build_user_search_query, count_users, get_user_event_roles,
+                                       get_users_by_email, search_external_identities, search_users)
+from indico.util.date_time import now_utc
+
+
+class FakeIdentityProvider(IdentityProvider):
+    supports_get = False
+    supports_search = True
+
+    def __init__(self, *args, delay=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+        self.searches = 0
+
+    def search_identities(self, criteria, exact=False):
+        self.searches += 1
+        time.sleep(self.delay)
+        yield IdentityInfo(self, f'{self.name}-1', email=f'{self.name}@example.test', given_name='Jane')
+
+
+@pytest.fixture
+def search_test_users(create_user):
+    return {
+        'substring': create_user(1, first_name='Anna', last_name='Goldsmith', email='anna@example.test'),
+        'prefix': create_user(2, first_name='Bob', last_name='Smithers', email='bob@example.test'),
+        'exact': create_user(3, first_name='Zoë', last_name='Smith', email='zoe@example.test'),
+        'other': create_user(4, first_name='Carl', last_name='Jones', email='smith@example.test'),
+    }
+
+
+@pytest.mark.usefixtures('search_test_users')
+@pytest.mark.parametrize(('criteria', 'expected'), (
+    ({'last_name': 'smith'}, [3, 2, 1]),
+    ({'last_name': 'smith', 'first_name': 'zoe'}, [3]),
+    ({'name': 'zoe smith'}, [3]),
+    ({'name': 'smith'}, [2, 3, 1]),
+    ({'email': 'smith'}, [4]),
+))
+def test_build_user_search_query(criteria, expected):
+    assert [u.id for u in build_user_search_query(criteria)] == expected
+
+
+def test_build_user_search_query_email_special_chars(create_user):
+    create_user(1, first_name='Anna', email='jo_e@example.test.org')
+    create_user(2, first_name='Bob', email='jo_e@example.test')
+    create_user(3, first_name='Carl', email='joe@example.test')
+    assert [u.id for u in build_user_search_query({'email': 'jo_e@example.test'})] == [2, 1]
+    assert [u.id for u in build_user_search_query({'email': 'JO_E@example.test'})] == [2, 1]
+
+
+def test_search_users_limit(search_test_users):
+    assert search_users(last_name='smith', limit=2) == {search_test_users['exact'], search_test_users['prefix']}
+    assert search_users(last_name='smith', exact=True) == {search_test_users['exact']}
+    assert count_users(last_name='smith') == 3
+    assert count_users(last_name=' ') == 0
+
+
+def test_count_users_system_user(db):
+    system_user = User.get_system_user()
+    assert search_users(last_name=system_user.last_name) == set()
+    assert count_users(last_name=system_user.last_name) == 0
+    assert search_users(last_name=system_user.last_name, allow_system_user=True) == {system_user}
+    assert count_users(last_name=system_user.last_name, allow_system_user=True) == 1
+
+
+def test_search_external_identities(monkeypatch, memory_cache):
+    monkeypatch.setattr(util, 'EXTERNAL_SEARCH_CACHE', ScopedCache(memory_cache, 'external-user-search'))
+    fast = FakeIdentityProvider(multipass, 'fast', {'mapping': {'first_name': 'given_name'}})
+    slow = FakeIdentityProvider(multipass, 'slow', {'search_timeout': 0.1}, delay=0.5)
+    providers = {'fast': fast, 'slow': slow}
+    monkeypatch.setattr(type(multipass), 'identity_providers', property(lambda self: providers))
+    # the slow provider is skipped
+    identities = search_external_identities(first_name='jane')()
+    assert [(ident.identifier, ident.data['email'], ident.data['first_name']) for ident in identities] == [
+        ('fast-1', 'fast@example.test', 'Jane')
+    ]
+    # the results of the fast provider are cached for the same (normalized) query
+    identities = search_external_identities(first_name=' Jane ')()
+    assert [(ident.provider, ident.identifier, ident.data['email'], ident.data['first_name'])
+            for ident in identities] == [(fast, 'fast-1', 'fast@example.test', 'Jane')]
+    assert fast.searches == 1
+    assert slow.searches == 2
+
+
+def test_search_external_identities_hanging_provider(monkeypatch):
+    monkeypatch.setattr(util, 'EXTERNAL_SEARCH_MAX_WORKERS', 1)
+    util._get_external_search_executor.cache_clear()
+    fast = FakeIdentityProvider(multipass, 'fast', {})
+    hanging = FakeIdentityProvider(multipass, 'hanging', {'search_timeout': 0.1}, delay=0.5)
+    providers = {'fast': fast, 'hanging': hanging}
+    monkeypatch.setattr(type(multipass), 'identity_providers', property(lambda self: providers))
+    # searches waiting for the hanging provider do not delay the other providers
+    searches = [search_external_identities(first_name=f'jane{i}') for i in range(5)]
+    start = time.monotonic()
+    for search in searches:
+        assert [ident.identifier for ident in search()] == ['fast-1']
+    assert time.monotonic() - start < 0.5
+    assert fast.searches == 5
+    util._get_external_search_executor.cache_clear()
+
+
+def test_get_user_event_roles(db, dummy_user, create_user, create_event):
+    other_user = create_user(123)
+    now = now_utc()
+    created = create_event(1, creator=dummy_user, creator_has_privileges=True)
+    managed = create_event(2, creator=other_user)
+    managed.update_principal(dummy_user, permissions={'paper_manager'})
+    past = create_event(3, creator=other_user, start_dt=now - timedelta(days=2), end_dt=now - timedelta(days=1))
+    past.update_principal(dummy_user, read_access=True, full_access=True)
+    dummy_user.favorite_events.add(past)
+    create_event(4, creator=other_user)
+    db.session.flush()
+
+    assert get_user_event_roles(dummy_user) == {
+        created.id: {'conference_creator', 'conference_manager'},
+        managed.id: {'conference_manager', 'paper_manager'},
+        past.id: {'conference_manager', 'favorited'},
+    }
+    assert get_user_event_roles(dummy_user, now - timedelta(hours=1)) == {
+        created.id: {'conference_creator', 'conference_manager'},
+        managed.id: {'conference_manager', 'paper_manager'},
+    }
+    assert get_user_event_roles(dummy_user, roles={'paper_manager', 'favorited'}) == {
+        managed.id: {'paper_manager'},
+        past.id: {'favorited'},
+    }
+
+
+def test_get_users_by_email(create_user):
+    user = create_user(1, email='foo@example.test')
+    user.secondary_emails.add('bar@example.test')
+    other = create_user(2, email='other@example.test')
+    create_user(3, email='deleted@example.test').is_deleted = True
+    assert get_users_by_email(['FOO@example.test ', 'bar@example.test', 'other@example.test', 'deleted@example.test',
+                               'nobody@example.test', '']) == {
+        'foo@example.test': user,
+        'bar@example.test': user,
+        'other@example.test': other,
+    }
+    assert get_users_by_email([]) == {}
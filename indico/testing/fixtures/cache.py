@@ -6,6 +6,7 @@
 # LICENSE file for more details.
 
 import pytest
+from cachelib import SimpleCache
 
 from indico.core.cache import cache
 
@@ -14,3 +15,28 @@ from indico.core.cache import cache
 def clear_cache():
     """Clear the cache."""
     cache.clear()
+
+
+class _MemoryCache(SimpleCache):
+    def get(self, key, default=None):
+        rv = super().get(key)
+        return default if rv is None else rv
+
+    def get_many(self, *keys, default=None):
+        return [self.get(key, default) for key in keys]
+
+    def compare_and_set(self, key, expected, value, timeout=None):
+        if super().get(key) != expected:
+            return False
+        return self.set(key, value, timeout=timeout)
+
+
+@pytest.fixture
+def memory_cache():
+    """Provide an in-memory cache backend.
+
+    Unlike the cache used by default in tests, which does not store
+    anything, this one actually keeps the data, so it can be used with
+    a `ScopedCache` for code that relies on cached data.
+    """
+    return _MemoryCache()
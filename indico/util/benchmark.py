@@ -5,12 +5,16 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import statistics
 import time
 from math import isinf
 
 import click
 
 
+PERCENTILES = (50, 90, 95, 99)
+
+
 class Benchmark:
     """Simple benchmark class.
 
@@ -28,11 +32,11 @@ class Benchmark:
             self.start()
 
     def start(self):
-        self._start_time = time.time()
+        self._start_time = time.perf_counter()
         return self
 
     def stop(self):
-        self._end_time = time.time()
+        self._end_time = time.perf_counter()
 
     def __enter__(self):
         return self.start()
@@ -67,3 +71,60 @@ class Benchmark:
             click.secho(str(self), fg='yellow', bold=True)
         else:
             click.secho(str(self), fg='green', bold=True)
+
+
+def percentile(values, pct):
+    """Calculate a percentile using linear interpolation.
+
+    :param values: A sorted list of values
+    :param pct: The percentile to calculate (0-100)
+    """
+    if not values:
+        raise ValueError('cannot calculate the percentile of an empty list')
+    pos = (len(values) - 1) * pct / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (pos - lower)
+
+
+def summarize_timings(timings):
+    """Get statistics for a list of durations.
+
+    :return: A JSON-serializable dict containing the number of runs,
+             min/max/mean/stdev and the percentiles from ``PERCENTILES``.
+    """
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'min': timings[0],
+        'max': timings[-1],
+        'mean': statistics.fmean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0,
+        'percentiles': {f'p{pct}': percentile(timings, pct) for pct in PERCENTILES},
+    }
+
+
+def run_benchmark(func, runs=10, warmup=1, wrapper=None):
+    """Run a function repeatedly and measure how long it takes.
+
+    :param func: The function to benchmark
+    :param runs: How many times to run the function
+    :param warmup: How many times to run the function before measuring
+    :param wrapper: A callable returning a context manager which is
+                    entered around each run of the function (but not
+                    included in the measured time), e.g. to provide
+                    a fresh request context.
+    :return: The statistics from :func:`summarize_timings`, and the
+             raw durations in ``timings``.
+    """
+    timings = []
+    for i in range(warmup + runs):
+        if wrapper is not None:
+            with wrapper(), Benchmark() as b:
+                func()
+        else:
+            with Benchmark() as b:
+                func()
+        if i >= warmup:
+            timings.append(float(b))
+    return {**summarize_timings(timings), 'timings': timings}
@@ -0,0 +1,58 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from contextlib import contextmanager
+
+import pytest
+
+from indico.util.benchmark import percentile, run_benchmark, summarize_timings
+
+
+@pytest.mark.parametrize(('values', 'pct', 'expected'), (
+    ([1], 50, 1),
+    ([1], 99, 1),
+    ([1, 2, 3, 4, 5], 0, 1),
+    ([1, 2, 3, 4, 5], 50, 3),
+    ([1, 2, 3, 4, 5], 100, 5),
+    ([1, 2, 3, 4], 50, 2.5),
+    ([0, 10], 90, 9),
+))
+def test_percentile(values, pct, expected):
+    assert percentile(values, pct) == pytest.approx(expected)
+
+
+def test_percentile_empty():
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_summarize_timings():
+    summary = summarize_timings([3, 1, 2])
+    assert summary['runs'] == 3
+    assert summary['min'] == 1
+    assert summary['max'] == 3
+    assert summary['mean'] == 2
+    assert summary['stdev'] == 1
+    assert summary['percentiles']['p50'] == 2
+    assert summarize_timings([5])['stdev'] == 0
+
+
+def test_run_benchmark():
+    calls = []
+    wrapped = []
+
+    @contextmanager
+    def _wrapper():
+        wrapped.append(len(calls))
+        yield
+
+    result = run_benchmark(lambda: calls.append(1), runs=3, warmup=2, wrapper=_wrapper)
+    assert len(calls) == 5
+    assert wrapped == [0, 1, 2, 3, 4]
+    assert result['runs'] == 3
+    assert len(result['timings']) == 3
+    assert set(result['percentiles']) == {'p50', 'p90', 'p95', 'p99'}
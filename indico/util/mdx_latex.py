@@ -71,13 +71,15 @@ Version 2.1: (August 2013)
 """
 
 
+import hashlib
 import os
 import re
+import tempfile
 import textwrap
 import uuid
 from io import BytesIO
 from mimetypes import guess_extension
-from tempfile import NamedTemporaryFile
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from xml.etree import ElementTree as etree  # noqa: N813
 
@@ -242,7 +244,8 @@ def latex_render_image(src, alt, tmpdir, strict=False):
     This involves fetching the image from a web server and figuring out its
     MIME type. A temporary file will be created, which is not immediately
     deleted since it has to be included in the LaTeX code. It should be handled
-    by the enclosing code.
+    by the enclosing code.  The file is named after the hash of its content so
+    the generated LaTeX code is the same every time for the same image.
 
     :param src: source URL of the image
     :param alt: text to use as ``alt="..."``
@@ -286,8 +289,9 @@ def latex_render_image(src, alt, tmpdir, strict=False):
                     extension = IMAGE_FORMAT_EXTENSIONS.get(image.format, '.png')
                 except OSError:
                     raise ImageURLException('Cannot read image data. Maybe not an image file?')
-            with NamedTemporaryFile(prefix='indico-latex-', suffix=extension, dir=tmpdir, delete=False) as tempfile:
-                tempfile.write(resp.content)
+            content_hash = hashlib.sha256(resp.content).hexdigest()[:32]
+            image_path = os.path.join(tmpdir or tempfile.gettempdir(), f'indico-latex-{content_hash}{extension}')
+            Path(image_path).write_bytes(resp.content)
     except ImageURLException as exc:
         if strict:
             raise
@@ -301,7 +305,7 @@ def latex_render_image(src, alt, tmpdir, strict=False):
           \includegraphics[max width=\linewidth]{%s}
           \caption{%s}
         \end{figure}
-        ''' % (os.path.basename(tempfile.name), latex_escape(alt))), tempfile.name)
+        ''' % (os.path.basename(image_path), latex_escape(alt))), image_path)
 
 
 def makeExtension(configs=None):  # noqa: N802
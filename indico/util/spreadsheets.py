@@ -5,17 +5,21 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import codecs
 import csv
 import re
+import tempfile
 from contextlib import contextmanager
 from datetime import datetime
 from enum import auto
-from io import BytesIO, TextIOWrapper
+from io import BytesIO, RawIOBase, StringIO, TextIOWrapper
 
+from flask import has_app_context, stream_with_context
 from markupsafe import Markup
 from speaklater import is_lazy_string
 from xlsxwriter import Workbook
 
+from indico.core.config import config
 from indico.core.errors import UserValueError
 from indico.util.date_time import format_datetime
 from indico.util.enum import RichStrEnum
@@ -66,6 +70,46 @@ def _prepare_header(header):
     return header
 
 
+def _iter_row_values(headers, rows):
+    """Convert rows to sequences of values in the order of the headers.
+
+    Rows may be dicts mapping captions to values, or sequences which
+    already contain the values in the correct order.
+    """
+    for row in rows:
+        assert len(row) == len(headers)
+        if isinstance(row, dict):
+            row = [row[name] for name in headers]
+        yield row
+
+
+class _IterableStream(RawIOBase):
+    """A read-only file-like object returning the data of a bytes iterable."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        while not self._pending:
+            try:
+                self._pending = next(self._iterator)
+            except StopIteration:
+                return 0
+        size = min(len(buf), len(self._pending))
+        buf[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if hasattr(self._iterator, 'close'):
+            self._iterator.close()
+        super().close()
+
+
 def _prepare_csv_data(data, _linebreak_re=re.compile(r'(\r?\n)+'), _dangerous_chars_re=re.compile(r'^[=+@-]+')):
     if isinstance(data, (list, tuple)):
         data = '; '.join(data)
@@ -94,30 +138,47 @@ def csv_text_io_wrapper(buf):
         w.detach()
 
 
-def generate_csv(headers, rows, *, include_header=True):
-    """Generate a CSV file from a list of headers and rows.
+def iter_csv(headers, rows, *, include_header=True, chunk_size=1000):
+    """Generate a CSV file from a list of headers and rows in chunks.
 
     While CSV cells may contain multiline data, we replace linebreaks
     with spaces in case someone wants to use it in Excel which does
     *not* handle such cells properly...
 
     :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
+    :param rows: an iterable of dicts mapping captions to values or of
+                 sequences containing the values in the order of the
+                 captions; it is only consumed while iterating over
+                 the CSV data
+    :param include_header: whether to include a header in the data
+    :param chunk_size: the number of rows in each chunk
+    :return: an iterator yielding the UTF-8 encoded CSV data
+    """
+    buf = StringIO(newline='')
+    writer = csv.writer(buf)
+    yield codecs.BOM_UTF8
+    if include_header:
+        writer.writerow(map(_prepare_header, headers))
+    for i, row in enumerate(_iter_row_values(headers, rows), 1):
+        writer.writerow([_prepare_csv_data(v) for v in row])
+        if i % chunk_size == 0:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode()
+
+
+def generate_csv(headers, rows, *, include_header=True):
+    """Generate a CSV file from a list of headers and rows.
+
+    :param headers: a list of cell captions
+    :param rows: an iterable of dicts mapping captions to values or of
+                 sequences containing the values in the order of the
+                 captions
     :param include_header: whether to include a header in the data
     :return: an `io.BytesIO` containing the CSV data
     """
-    buf = BytesIO()
-    with csv_text_io_wrapper(buf) as csvbuf:
-        writer = csv.writer(csvbuf)
-        if include_header:
-            writer.writerow(map(_prepare_header, headers))
-        header_positions = {name: i for i, name in enumerate(headers)}
-        assert all(len(row) == len(headers) for row in rows)
-        for row in rows:
-            row = sorted(row.items(), key=lambda x: header_positions[x[0]])
-            writer.writerow([_prepare_csv_data(v) for k, v in row])
-    buf.seek(0)
-    return buf
+    return BytesIO(b''.join(iter_csv(headers, rows, include_header=include_header)))
 
 
 def _prepare_excel_data(data, tz=None):
@@ -132,52 +193,76 @@ def _prepare_excel_data(data, tz=None):
     return data
 
 
-def generate_xlsx(headers, rows, tz=None):
-    """Generate an XLSX file from a list of headers and rows.
-
-    :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
-    :return: an `io.BytesIO` containing the XLSX data
-    """
-    workbook_options = {'in_memory': True, 'strings_to_formulas': False, 'strings_to_numbers': False,
-                        'strings_to_urls': False}
-    buf = BytesIO()
-    header_positions = {name: i for i, name in enumerate(headers)}
-    # convert row dicts to lists
-    rows = [[x[1] for x in sorted(row.items(), key=lambda x: header_positions[x[0]])] for row in rows]
-    assert all(len(row) == len(headers) for row in rows)
-    with Workbook(buf, workbook_options) as workbook:
+def _write_xlsx(file, headers, rows, tz=None, tmpdir=None):
+    if tmpdir is None and has_app_context():
+        tmpdir = config.TEMP_DIR
+    # in constant memory mode each row is flushed to a temporary file once
+    # the next one is written, so the rows never need to be kept in memory
+    workbook_options = {'constant_memory': True, 'tmpdir': tmpdir, 'strings_to_formulas': False,
+                        'strings_to_numbers': False, 'strings_to_urls': False}
+    with Workbook(file, workbook_options) as workbook:
         bold = workbook.add_format({'bold': True})
         sheet = workbook.add_worksheet()
         for col, name in enumerate(map(_prepare_header, headers)):
             sheet.write(0, col, name, bold)
-        for row, values in enumerate(rows, 1):
+        for row, values in enumerate(_iter_row_values(headers, rows), 1):
             sheet.write_row(row, 0, [_prepare_excel_data(data, tz) for data in values])
-    buf.seek(0)
-    return buf
+    file.seek(0)
+    return file
+
+
+def generate_xlsx(headers, rows, tz=None, *, tmpdir=None):
+    """Generate an XLSX file from a list of headers and rows.
+
+    :param headers: a list of cell captions
+    :param rows: an iterable of dicts mapping captions to values or of
+                 sequences containing the values in the order of the
+                 captions
+    :param tz: the timezone for the values that are datetime objects
+    :param tmpdir: the directory for temporary files used while writing
+                   the file; defaults to Indico's temp dir (or the system
+                   one when used outside an app context)
+    :return: an `io.BytesIO` containing the XLSX data
+    """
+    return _write_xlsx(BytesIO(), headers, rows, tz=tz, tmpdir=tmpdir)
 
 
 def send_csv(filename, headers, rows, *, include_header=True):
     """Send a CSV file to the client.
 
+    The CSV data is streamed to the client while it is generated, so
+    `rows` may be a generator which lazily loads the data.  Keep in
+    mind that it is consumed after the request handler finished, i.e.
+    after the transaction has been committed and any objects loaded
+    during the request have been expired.
+
     :param filename: The name of the CSV file
     :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
+    :param rows: an iterable of dicts mapping captions to values or of
+                 sequences containing the values in the order of the
+                 captions
     :param include_header: whether to include a header in the data
     :return: a flask response containing the CSV data
     """
-    buf = generate_csv(headers, rows, include_header=include_header)
-    return send_file(filename, buf, 'text/csv', inline=False)
+    data = stream_with_context(iter_csv(headers, rows, include_header=include_header))
+    return send_file(filename, _IterableStream(data), 'text/csv', inline=False)
 
 
 def send_xlsx(filename, headers, rows, tz=None):
     """Send an XLSX file to the client.
 
-    :param filename: The name of the CSV file
+    The file is written to a temporary file instead of being kept in
+    memory.
+
+    :param filename: The name of the XLSX file
     :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
+    :param rows: an iterable of dicts mapping captions to values or of
+                 sequences containing the values in the order of the
+                 captions
     :param tz: the timezone for the values that are datetime objects
     :return: a flask response containing the XLSX data
     """
-    buf = generate_xlsx(headers, rows, tz=tz)
-    return send_file(filename, buf, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', inline=False)
+    # the file is closed (and thus deleted) once the response has been sent
+    file = tempfile.TemporaryFile(dir=config.TEMP_DIR)  # noqa: SIM115
+    _write_xlsx(file, headers, rows, tz=tz)
+    return send_file(filename, file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', inline=False)
@@ -6,10 +6,12 @@
 # LICENSE file for more details.
 
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import ZipFile
 
 import pytest
 
-from indico.util.spreadsheets import generate_csv
+from indico.util.spreadsheets import generate_csv, generate_xlsx, iter_csv
 
 
 def test_generate_csv():
@@ -51,3 +53,50 @@ def test_generate_csv_malicious(value, expected):
     rows = [{'foo': value, 'bar': ''}]
     csv = generate_csv(headers, rows).read().decode('utf-8-sig').strip().splitlines()
     assert csv == ['foo,bar', f'{expected},']
+
+
+def test_generate_csv_sequence_rows():
+    headers = ['foo', 'bar']
+    dict_rows = [{'bar': i, 'foo': f'row {i}'} for i in range(5)]
+    rows = ((f'row {i}', i) for i in range(5))
+    assert generate_csv(headers, rows).read() == generate_csv(headers, dict_rows).read()
+
+
+def test_iter_csv_chunks():
+    headers = ['foo', 'bar']
+    rows = [(f'row {i}', i) for i in range(5)]
+    chunks = list(iter_csv(headers, rows, chunk_size=2))
+    assert chunks[0] == b'\xef\xbb\xbf'
+    assert [chunk.count(b'\n') for chunk in chunks[1:]] == [3, 2, 1]
+    assert b''.join(chunks) == generate_csv(headers, rows).read()
+
+
+def test_iter_csv_lazy():
+    consumed = []
+
+    def _iter_rows():
+        for i in range(3):
+            consumed.append(i)
+            yield [i]
+
+    chunks = iter_csv(['foo'], _iter_rows(), include_header=False, chunk_size=1)
+    assert not consumed
+    next(chunks)
+    assert next(chunks) == b'0\r\n'
+    assert consumed == [0]
+
+
+def test_generate_xlsx():
+    rows = ({'foo': f'row {i}', 'bar': i} for i in range(5))
+    with ZipFile(generate_xlsx(['foo', 'bar'], rows)) as zf:
+        sheet = zf.read('xl/worksheets/sheet1.xml')
+    assert b'row 0' in sheet
+    assert b'row 4' in sheet
+
+
+def test_generate_xlsx_no_app_context():
+    # the app context is only available in the main thread
+    with ThreadPoolExecutor(1) as executor:
+        data = executor.submit(generate_xlsx, ['foo'], [['bar']]).result()
+    with ZipFile(data) as zf:
+        assert b'bar' in zf.read('xl/worksheets/sheet1.xml')
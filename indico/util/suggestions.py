@@ -5,25 +5,72 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
 
 from sqlalchemy.orm import joinedload, load_only
 
+from indico.core.db import db
 from indico.modules.events import Event
-from indico.modules.events.abstracts.util import get_events_with_abstract_persons
-from indico.modules.events.contributions.util import get_events_with_linked_contributions
-from indico.modules.events.registration.util import get_events_registered
-from indico.modules.events.surveys.util import get_events_with_submitted_surveys
+from indico.modules.users.util import get_user_event_roles
 from indico.util.date_time import now_utc, utc_to_server
 from indico.util.iterables import window
 
 
-def _get_blocks(events, attended):
+class _TimelineEvent(NamedTuple):
+    id: int
+    start_dt: datetime
+    end_dt: datetime
+
+
+class _CategoryTimeline:
+    """The events in a category, sorted by their start date.
+
+    :param events: A list of `_TimelineEvent` tuples sorted by their
+                   start date
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.start_dts = [e.start_dt for e in events]
+        self.max_duration = max((e.end_dt - e.start_dt for e in events), default=timedelta())
+
+    def happening_between(self, from_dt, to_dt=None):
+        """Get the events matching `Event.happens_between`."""
+        if to_dt is None:
+            return self.events[bisect_left(self.start_dts, from_dt):]
+        # no event can overlap with the range if it starts more than the
+        # duration of the longest event before the start of the range
+        lo = bisect_left(self.start_dts, from_dt - self.max_duration)
+        hi = bisect_right(self.start_dts, to_dt)
+        return [e for e in self.events[lo:hi] if e.end_dt >= from_dt]
+
+
+def _load_category_timelines(category_ids):
+    """Load the events of several categories at once.
+
+    :return: A dict mapping category ids to `_CategoryTimeline` objects
+    """
+    if not category_ids:
+        return {}
+    events = defaultdict(list)
+    # deleted events are excluded just like in `Category.events`, which was used to score
+    # each category separately before
+    query = (db.session.query(Event.category_id, Event.id, Event.start_dt, Event.end_dt)
+             .filter(Event.category_id.in_(category_ids), ~Event.is_deleted)
+             .order_by(Event.category_id, Event.start_dt, Event.id))
+    for category_id, *data in query:
+        events[category_id].append(_TimelineEvent(*data))
+    return {category_id: _CategoryTimeline(events[category_id]) for category_id in category_ids}
+
+
+def _get_blocks(events, attended_ids):
     blocks = []
     block = []
     for event in events:
-        if event not in attended:
+        if event.id not in attended_ids:
             if block:
                 blocks.append(block)
             block = []
@@ -34,47 +81,42 @@ def _get_blocks(events, attended):
     return blocks
 
 
-def _query_categ_events(categ, start_dt, end_dt):
-    return (Event.query
-            .with_parent(categ)
-            .filter(Event.happens_between(start_dt, end_dt))
-            .options(load_only('id', 'start_dt', 'end_dt')))
-
-
-def _get_category_score(user, categ, attended_events, debug=False):
+def _get_category_score(categ, attended_events, timeline, favorite_categ_ids, favorite_event_categ_ids,
+                        debug=False):
     if debug:
         print(repr(categ))
+    attended_ids = {e.id for e in attended_events}
     # We care about events in the whole timespan where the user attended some events.
     # However, this might result in some missed events e.g. if the user was not working for
     # a year and then returned. So we throw away old blocks (or rather adjust the start time
     # to the start time of the newest block)
     first_event_date = attended_events[0].start_dt.replace(hour=0, minute=0)
     last_event_date = attended_events[-1].start_dt.replace(hour=0, minute=0) + timedelta(days=1)
-    blocks = _get_blocks(_query_categ_events(categ, first_event_date, last_event_date), attended_events)
+    blocks = _get_blocks(timeline.happening_between(first_event_date, last_event_date), attended_ids)
     for a, b in window(blocks):
         # More than 3 months between blocks? Ignore the old block!
         if b[0].start_dt - a[-1].start_dt > timedelta(weeks=12):
             first_event_date = b[0].start_dt.replace(hour=0, minute=0)
 
     # Favorite categories get a higher base score
-    score = int(categ in user.favorite_categories)
+    score = int(categ.id in favorite_categ_ids)
     if debug:
         print(f'{score:+.3f} - initial')
     # if there is a favorite event in the category
-    if any(e.category == categ for e in user.favorite_events):
+    if categ.id in favorite_event_categ_ids:
         score += 0.1
     if debug:
         print(f'{score:+.3f} - favorite events')
     # Attendance percentage goes to the score directly. If the attendance is high chances are good that the user
     # is either very interested in whatever goes on in the category or it's something he has to attend regularily.
-    total = _query_categ_events(categ, first_event_date, last_event_date).count()
+    total = len(timeline.happening_between(first_event_date, last_event_date))
     if total:
         attended_block_event_count = sum(1 for e in attended_events if e.start_dt >= first_event_date)
         score += attended_block_event_count / total
     if debug:
         print(f'{score:+.3f} - attendance')
     # If there are lots/few unattended events after the last attended one we also update the score with that
-    total_after = _query_categ_events(categ, last_event_date + timedelta(days=1), None).count()
+    total_after = len(timeline.happening_between(last_event_date + timedelta(days=1)))
     if total_after < total * 0.05:
         score += 0.25
     elif total_after > total * 0.25:
@@ -91,9 +133,7 @@ def _get_category_score(user, categ, attended_events, debug=False):
         print(f'{score:+.3f} - days since last event')
     # For events in the future however we raise the score
     now_local = utc_to_server(now_utc())
-    attending_future = (_query_categ_events(categ, now_local, last_event_date)
-                        .filter(Event.id.in_(e.id for e in attended_events))
-                        .all())
+    attending_future = [e for e in timeline.happening_between(now_local, last_event_date) if e.id in attended_ids]
     if attending_future:
         score += 0.25 * len(attending_future)
         if debug:
@@ -105,25 +145,49 @@ def _get_category_score(user, categ, attended_events, debug=False):
     return score
 
 
-def get_category_scores(user, debug=False):
+def _get_attended_events(user):
+    """Get the events a user attended, grouped by category."""
     # XXX: check if we can add some more roles such as 'contributor' to assume attendance
-    event_ids = set()
-    event_ids.update(id_
-                     for id_, roles in get_events_with_abstract_persons(user).items()
-                     if 'abstract_submitter' in roles)
-    event_ids.update(id_
-                     for id_, roles in get_events_with_linked_contributions(user).items()
-                     if 'contribution_submission' in roles)
-    event_ids |= get_events_registered(user)
-    event_ids |= get_events_with_submitted_surveys(user)
+    event_ids = set(get_user_event_roles(user, roles={'abstract_submitter', 'contribution_submission',
+                                                      'registration_registrant', 'survey_submitter'}))
     if not event_ids:
         return {}
     attended = (Event.query
                 .filter(Event.id.in_(event_ids), ~Event.is_deleted, ~Event.is_unlisted)
-                .options(joinedload('category'))
+                .options(load_only('id', 'category_id', 'start_dt', 'end_dt'), joinedload('category'))
                 .order_by(Event.start_dt, Event.id)
                 .all())
     categ_events = defaultdict(list)
     for event in attended:
         categ_events[event.category].append(event)
-    return {categ: _get_category_score(user, categ, events, debug) for categ, events in categ_events.items()}
+    return categ_events
+
+
+def get_category_scores_for_users(users, debug=False):
+    """Get the category suggestion scores for several users.
+
+    The events of all the categories in which any of the users attended
+    events are loaded at once, so scoring many users only needs a few
+    queries for each user to get the events they attended.
+
+    :param users: The users to get the scores for
+    :return: A dict mapping each user to a dict mapping categories to
+             their score.
+    """
+    attended = {user: _get_attended_events(user) for user in users}
+    timelines = _load_category_timelines({categ.id for categ_events in attended.values() for categ in categ_events})
+    scores = {}
+    for user, categ_events in attended.items():
+        if not categ_events:
+            scores[user] = {}
+            continue
+        favorite_categ_ids = {c.id for c in user.favorite_categories}
+        favorite_event_categ_ids = {e.category_id for e in user.favorite_events}
+        scores[user] = {categ: _get_category_score(categ, events, timelines[categ.id], favorite_categ_ids,
+                                                   favorite_event_categ_ids, debug)
+                        for categ, events in categ_events.items()}
+    return scores
+
+
+def get_category_scores(user, debug=False):
+    return get_category_scores_for_users([user], debug=debug)[user]
@@ -0,0 +1,68 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from indico.modules.events import Event
+from indico.util.date_time import as_utc, overlaps
+from indico.util.suggestions import _CategoryTimeline, _load_category_timelines, _TimelineEvent
+
+
+def _dt(day, hour=0):
+    return datetime(2025, 1, day, hour)
+
+
+@pytest.mark.parametrize(('from_dt', 'to_dt'), (
+    (_dt(1), _dt(2)),
+    (_dt(3), _dt(3, 12)),
+    (_dt(5, 10), _dt(6)),
+    (_dt(10), _dt(20)),
+    (_dt(25), _dt(31)),
+    (_dt(3), None),
+    (_dt(12), None),
+))
+def test_category_timeline_happening_between(from_dt, to_dt):
+    events = [
+        _TimelineEvent(1, _dt(1, 9), _dt(1, 10)),
+        _TimelineEvent(2, _dt(2, 9), _dt(6, 17)),  # long event
+        _TimelineEvent(3, _dt(3, 9), _dt(3, 10)),
+        _TimelineEvent(4, _dt(3, 12), _dt(3, 13)),
+        _TimelineEvent(5, _dt(10, 9), _dt(10, 10)),
+        _TimelineEvent(6, _dt(20, 9), _dt(20, 10)),
+    ]
+    timeline = _CategoryTimeline(events)
+    assert timeline.max_duration == timedelta(days=4, hours=8)
+    if to_dt is None:
+        expected = [e for e in events if e.start_dt >= from_dt]
+    else:
+        expected = [e for e in events if overlaps((e.start_dt, e.end_dt), (from_dt, to_dt), inclusive=True)]
+    assert timeline.happening_between(from_dt, to_dt) == expected
+
+
+def test_category_timeline_empty():
+    timeline = _CategoryTimeline([])
+    assert timeline.happening_between(_dt(1), _dt(2)) == []
+    assert timeline.happening_between(_dt(1)) == []
+
+
+def test_load_category_timelines(db, create_category, create_event):
+    category = create_category(1)
+    other_category = create_category(2)
+    empty_category = create_category(3)
+    events = [create_event(category=category, start_dt=as_utc(_dt(day, 9)), end_dt=as_utc(_dt(day, 10)))
+              for day in (3, 1, 2)]
+    other_event = create_event(category=other_category, start_dt=as_utc(_dt(1, 9)), end_dt=as_utc(_dt(1, 10)))
+    events[2].is_deleted = True
+    db.session.flush()
+    timelines = _load_category_timelines({category.id, other_category.id, empty_category.id})
+    # deleted events do not count, like when the events were loaded through `Category.events`
+    assert [e.id for e in timelines[category.id].events] == [events[1].id, events[0].id]
+    assert {e.id for e in timelines[category.id].events} == {e.id for e in Event.query.with_parent(category)}
+    assert [e.id for e in timelines[other_category.id].events] == [other_event.id]
+    assert timelines[empty_category.id].events == []
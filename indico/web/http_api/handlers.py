@@ -12,12 +12,13 @@ import hmac
 import posixpath
 import re
 import time
+from datetime import UTC, datetime
 from urllib.parse import parse_qs, urlencode
 from uuid import UUID
 
 import sentry_sdk
 from authlib.oauth2 import OAuth2Error
-from flask import current_app, g, request, session
+from flask import current_app, g, request, session, stream_with_context
 from werkzeug.exceptions import BadRequest, NotFound
 
 from indico.core.cache import make_scoped_cache
@@ -29,7 +30,7 @@ from indico.modules.api.models.keys import APIKey
 from indico.util.signals import make_interceptable
 from indico.web.http_api import HTTPAPIHook
 from indico.web.http_api.metadata.serializer import Serializer
-from indico.web.http_api.responses import HTTPAPIError, HTTPAPIResult, HTTPAPIResultSchema
+from indico.web.http_api.responses import HTTPAPIError, HTTPAPIResult, HTTPAPIResultSchema, StreamedResults
 from indico.web.http_api.util import get_query_parameter
 
 
@@ -37,6 +38,15 @@ from indico.web.http_api.util import get_query_parameter
 RE_REMOVE_EXTENSION = re.compile(r'\.(\w+)(?:$|(?=\?))')
 
 API_CACHE = make_scoped_cache('legacy-http-api')
+API_CACHE_LOCKS = make_scoped_cache('legacy-http-api-lock')
+
+#: How long (in seconds) a request may take to generate a cached result
+#: before other requests stop waiting for it
+CACHE_LOCK_TIMEOUT = 60
+#: How long (in seconds) a request waits for another request generating
+#: the same result if there is no cached result yet
+CACHE_LOCK_WAIT = 10
+CACHE_POLL_INTERVAL = 0.1
 
 
 def normalizeQuery(path, query, remove=('signature',), separate=False):
@@ -99,6 +109,74 @@ def checkAK(apiKey, signature, timestamp, path, query):
     return ak, onlyPublic
 
 
+def _get_cached_result(cache_key, ttl):
+    """Get a cached API result while preventing cache stampedes.
+
+    Cached results are kept for twice the cache TTL.  Once they are older
+    than the TTL, one request regenerates them while concurrent requests
+    keep getting the stale result.  If there is no cached result at all,
+    concurrent requests wait for the one generating it.
+
+    :return: A ``(entry, locked)`` tuple.  If `entry` is ``None`` the
+             caller needs to generate the result; if `locked` is set, it
+             has to release the lock afterwards using `_release_cache_lock`.
+    """
+    entry = API_CACHE.get(cache_key)
+    if entry is not None and time.time() - entry[2] < ttl:
+        return entry, False
+    if API_CACHE_LOCKS.add(cache_key, True, timeout=CACHE_LOCK_TIMEOUT):
+        return None, True
+    elif entry is not None:
+        return entry, False
+    deadline = time.monotonic() + CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(CACHE_POLL_INTERVAL)
+        if (entry := API_CACHE.get(cache_key)) is not None:
+            return entry, False
+        elif not API_CACHE_LOCKS.get(cache_key):
+            # the other request failed or its result was not cacheable
+            break
+    return None, False
+
+
+def _release_cache_lock(cache_key):
+    API_CACHE_LOCKS.delete(cache_key)
+
+
+def _get_etag(cache_key, dformat, ts):
+    """Get the ETag for an API result.
+
+    A result is identified by its cache key and the time it was generated,
+    so the ETag does not depend on parts of the response which differ
+    between requests for the same result (such as the request URL).
+    """
+    return hashlib.sha1(f'{cache_key}:{dformat}:{ts}'.encode()).hexdigest()
+
+
+def _make_conditional(response, etag, ts):
+    """Add validators to a response and handle conditional requests.
+
+    The last modification time is the time when the (possibly cached)
+    result was generated, so clients polling an export only get the full
+    data if it changed.
+    """
+    response.last_modified = datetime.fromtimestamp(ts, UTC)
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def _make_streamed_response(serializer, envelope, results, path, query):
+    def _generate():
+        try:
+            yield from serializer.stream(envelope, results)
+        except Exception:
+            Logger.get('httpapi').exception('Serialization error in streamed request %s?%s', path, query)
+            raise
+
+    return current_app.response_class(stream_with_context(_generate()),
+                                      content_type=serializer.get_response_content_type())
+
+
 @make_interceptable
 def handler(prefix, path):
     path = posixpath.join('/', prefix, path)
@@ -212,27 +290,36 @@ def handler(prefix, path):
 
         addToCache = not hook.NO_CACHE
         cacheKey = RE_REMOVE_EXTENSION.sub('', cacheKey)
-        if not noCache:
-            obj = API_CACHE.get(cacheKey)
+        ttl = api_settings.get('cache_ttl')
+        locked = False
+        if ttl <= 0:
+            addToCache = False
+        elif not noCache:
+            obj, locked = _get_cached_result(cacheKey, ttl)
             if obj is not None:
                 result, extra, ts, complete, typeMap = obj
                 addToCache = False
-        if result is None:
-            g.current_api_user = user
-            # Perform the actual exporting
-            res = hook(user)
-            if isinstance(res, current_app.response_class):
-                addToCache = False
-                is_response = True
-                result, extra, complete, typeMap = res, {}, True, {}
-            elif isinstance(res, tuple) and len(res) == 4:
-                result, extra, complete, typeMap = res
-            else:
-                result, extra, complete, typeMap = res, {}, True, {}
-        if result is not None and addToCache:
-            ttl = api_settings.get('cache_ttl')
-            if ttl > 0:
-                API_CACHE.set(cacheKey, (result, extra, ts, complete, typeMap), ttl)
+        try:
+            if result is None:
+                g.current_api_user = user
+                # Perform the actual exporting
+                res = hook(user)
+                if isinstance(res, current_app.response_class):
+                    addToCache = False
+                    is_response = True
+                    result, extra, complete, typeMap = res, {}, True, {}
+                elif isinstance(res, tuple) and len(res) == 4:
+                    result, extra, complete, typeMap = res
+                else:
+                    result, extra, complete, typeMap = res, {}, True, {}
+                if isinstance(result, StreamedResults):
+                    addToCache = False
+            if result is not None and addToCache:
+                # stale results are kept a bit longer so they can be served while being refreshed
+                API_CACHE.set(cacheKey, (result, extra, ts, complete, typeMap), ttl * 2)
+        finally:
+            if locked:
+                _release_cache_lock(cacheKey)
     except HTTPAPIError as e:
         error = e
         if e.code:
@@ -257,8 +344,25 @@ def handler(prefix, path):
             logger.info('API request: %s?%s', path, query)
         if is_response:
             return result
+        etag = None
+        if not error and request.method == 'GET' and not isinstance(result, StreamedResults):
+            etag = _get_etag(cacheKey, dformat, ts)
+            # avoid serializing the result if the client already has it
+            response = _make_conditional(current_app.response_class(), etag, ts)
+            if response.status_code == 304:
+                return response
         serializer = Serializer.create(dformat, query_params=queryParams, pretty=pretty, typeMap=typeMap,
                                        **hook.serializer_args)
+        if isinstance(result, StreamedResults):
+            if serializer.streamable:
+                envelope = HTTPAPIResultSchema(exclude=('count', 'extra', 'results')).dump(
+                    HTTPAPIResult(None, path, query, ts)
+                )
+                return _make_streamed_response(serializer, envelope, result, path, query)
+            # serializers which cannot stream get all results at once
+            streamed_results = result
+            result = list(streamed_results)
+            extra = streamed_results.get_extra()
         if error:
             if not serializer.schemaless:
                 # if our serializer has a specific schema (HTML, ICAL, etc...)
@@ -277,6 +381,8 @@ def handler(prefix, path):
                 response.content_type = content_type
             if status_code:
                 response.status_code = status_code
+            elif etag:
+                response = _make_conditional(response, etag, ts)
             return response
         except Exception:
             logger.exception('Serialization error in request %s?%s', path, query)
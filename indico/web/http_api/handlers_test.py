@@ -0,0 +1,102 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import time
+
+import pytest
+
+from indico.core.cache import ScopedCache
+from indico.web.http_api import handlers
+
+
+@pytest.fixture
+def api_cache(monkeypatch, memory_cache):
+    monkeypatch.setattr(handlers, 'API_CACHE', ScopedCache(memory_cache, 'legacy-http-api'))
+    monkeypatch.setattr(handlers, 'API_CACHE_LOCKS', ScopedCache(memory_cache, 'legacy-http-api-lock'))
+    monkeypatch.setattr(handlers, 'CACHE_LOCK_WAIT', 0.3)
+    return handlers.API_CACHE
+
+
+def _make_entry(age):
+    return (['result'], {}, int(time.time()) - age, True, {})
+
+
+def test_get_cached_result_fresh(api_cache):
+    entry = _make_entry(0)
+    api_cache.set('key', entry)
+    assert handlers._get_cached_result('key', 600) == (entry, False)
+    assert not handlers.API_CACHE_LOCKS.get('key')
+
+
+def test_get_cached_result_stale(api_cache):
+    entry = _make_entry(700)
+    api_cache.set('key', entry)
+    # the first request regenerates the result
+    assert handlers._get_cached_result('key', 600) == (None, True)
+    # concurrent requests get the stale result
+    assert handlers._get_cached_result('key', 600) == (entry, False)
+    handlers._release_cache_lock('key')
+    assert handlers._get_cached_result('key', 600) == (None, True)
+
+
+def test_get_cached_result_missing(api_cache):
+    assert handlers._get_cached_result('key', 600) == (None, True)
+    # nobody stores a result, so the waiting request eventually generates it itself
+    start = time.monotonic()
+    assert handlers._get_cached_result('key', 600) == (None, False)
+    assert time.monotonic() - start >= 0.3
+    # once the lock has been released, a waiting request stops waiting
+    handlers._release_cache_lock('key')
+    assert handlers._get_cached_result('key', 600) == (None, True)
+
+
+def test_get_etag():
+    etag = handlers._get_etag('public_/export/event/1', 'json', 1234)
+    assert handlers._get_etag('public_/export/event/1', 'json', 1234) == etag
+    assert handlers._get_etag('public_/export/event/1', 'json', 1235) != etag
+    assert handlers._get_etag('public_/export/event/1', 'xml', 1234) != etag
+    assert handlers._get_etag('public_/export/event/2', 'json', 1234) != etag
+
+
+@pytest.mark.parametrize(('if_none_match', 'status_code'), (
+    (None, 200),
+    ('"abc"', 304),
+    ('"xyz"', 200),
+    ('*', 304),
+))
+def test_make_conditional(app, if_none_match, status_code):
+    headers = {'If-None-Match': if_none_match} if if_none_match else {}
+    with app.test_request_context(headers=headers):
+        response = handlers._make_conditional(app.response_class('data'), 'abc', 1234)
+    assert response.status_code == status_code
+    assert response.headers['ETag'] == '"abc"'
+    assert response.headers['Last-Modified'] == 'Thu, 01 Jan 1970 00:20:34 GMT'
+
+
+@pytest.mark.usefixtures('api_cache')
+def test_conditional_request(test_client, dummy_event):
+    url = f'/export/event/{dummy_event.id}.json'
+    resp = test_client.get(url)
+    assert resp.status_code == 200
+    etag = resp.headers['ETag']
+    assert etag
+    assert resp.headers['Last-Modified']
+    # the etag does not depend on the url, which is part of the response
+    resp = test_client.get(url, query_string={'_': '123'})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] == etag
+    # the cached result did not change, so there is no need to send it again
+    resp = test_client.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert not resp.data
+    resp = test_client.get(url, headers={'If-None-Match': '"something-else"'})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] == etag
+    # a different format is a different result
+    resp = test_client.get(f'/export/event/{dummy_event.id}.xml', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
@@ -27,7 +27,7 @@ from indico.web.http_api.metadata.atom import AtomSerializer
 from indico.web.http_api.metadata.html import HTML4Serializer
 from indico.web.http_api.metadata.ical import ICalSerializer
 from indico.web.http_api.metadata.jsonp import JSONPSerializer
-from indico.web.http_api.responses import HTTPAPIError
+from indico.web.http_api.responses import HTTPAPIError, StreamedResults
 from indico.web.http_api.util import get_query_parameter
 
 
@@ -51,6 +51,7 @@ class HTTPAPIHook:
     COMMIT = False  # commit database changes
     HTTP_POST = False  # require (and allow) HTTP POST
     NO_CACHE = False
+    STREAMING = False  # results may be streamed if the client requests it
 
     @classmethod
     def parseRequest(cls, path, queryParams):
@@ -104,6 +105,7 @@ class HTTPAPIHook:
         self._orderBy = get_query_parameter(self._queryParams, ['o', 'order'])
         self._descending = get_query_parameter(self._queryParams, ['c', 'descending'], 'no') == 'yes'
         self._detail = get_query_parameter(self._queryParams, ['d', 'detail'], self.DEFAULT_DETAIL)
+        self._stream = self.STREAMING and get_query_parameter(self._queryParams, ['stream'], 'no') == 'yes'
         tzName = get_query_parameter(self._queryParams, ['tz'], None)
 
         if tzName is None:
@@ -166,6 +168,9 @@ class HTTPAPIHook:
         resultList, complete = self._performCall(func, user)
         if isinstance(resultList, current_app.response_class):
             return True, resultList, None, None
+        elif isinstance(resultList, StreamedResults):
+            # the additional info is provided by the results once they have been generated
+            return False, resultList, complete, None
         extra = extra_func(user, resultList) if extra_func else None
         return False, resultList, complete, extra
 
@@ -287,6 +292,7 @@ class IteratedDataFetcher(DataFetcher):
         self._descending = hook._descending
         self._fromDT = hook._fromDT
         self._toDT = hook._toDT
+        self._stream = hook._stream
 
 
 Serializer.register('html', HTML4Serializer)
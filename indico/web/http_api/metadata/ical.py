@@ -111,6 +111,7 @@ def serialize_session(cal, fossil, now, fid=None):
 
 class ICalSerializer(Serializer):
     schemaless = False
+    streamable = True
     _mime = 'text/calendar'
 
     _mappers = {
@@ -126,21 +127,39 @@ class ICalSerializer(Serializer):
     def register_mapper(cls, fossil, func):
         cls._mappers[fossil] = func
 
+    def _create_calendar(self):
+        cal = ical.Calendar()
+        cal.add('version', '2.0')
+        cal.add('prodid', '-//CERN//INDICO//EN')
+        return cal
+
+    def _add_fossil(self, cal, fossil, now):
+        if '_fossil' in fossil:
+            mapper = ICalSerializer._mappers.get(fossil['_fossil'])
+        else:
+            mapper = self._extra_args.get('ical_serializer')
+        if mapper:
+            mapper(cal, fossil, now)
+
     def _execute(self, fossils):
         results = fossils['results']
         if not isinstance(results, list):
             results = [results]
 
-        cal = ical.Calendar()
-        cal.add('version', '2.0')
-        cal.add('prodid', '-//CERN//INDICO//EN')
+        cal = self._create_calendar()
         now = now_utc()
         for fossil in results:
-            if '_fossil' in fossil:
-                mapper = ICalSerializer._mappers.get(fossil['_fossil'])
-            else:
-                mapper = self._extra_args.get('ical_serializer')
-            if mapper:
-                mapper(cal, fossil, now)
+            self._add_fossil(cal, fossil, now)
 
         return cal.to_ical()
+
+    def stream(self, envelope, results):
+        end = b'END:VCALENDAR\r\n'
+        yield self._create_calendar().to_ical().removesuffix(end)
+        now = now_utc()
+        for fossil in results:
+            cal = ical.Calendar()
+            self._add_fossil(cal, fossil, now)
+            for component in cal.subcomponents:
+                yield component.to_ical()
+        yield end
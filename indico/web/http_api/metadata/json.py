@@ -15,10 +15,23 @@ class JSONSerializer(Serializer):
     """Basically direct translation from the fossil."""
 
     _mime = 'application/json'
+    streamable = True
 
-    def _execute(self, fossil):
+    def _dumps(self, data):
         indent = ' ' * 4 if self.pretty else None
-        return simplejson.dumps(fossil, cls=IndicoJSONEncoder, indent=indent).replace('/', '\\/')
+        return simplejson.dumps(data, cls=IndicoJSONEncoder, indent=indent).replace('/', '\\/')
+
+    def _execute(self, fossil):
+        return self._dumps(fossil)
+
+    def stream(self, envelope, results):
+        yield '{'
+        for key, value in envelope.items():
+            yield f'{self._dumps(key)}: {self._dumps(value)}, '
+        yield '"results": ['
+        for i, result in enumerate(results):
+            yield (', ' if i else '') + self._dumps(result)
+        yield f'], "count": {results.count}, "additionalInfo": {self._dumps(results.get_extra())}}}'
 
 
 Serializer.register('json', JSONSerializer)
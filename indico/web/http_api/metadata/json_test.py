@@ -0,0 +1,23 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2025 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import json
+
+import pytest
+
+from indico.web.http_api.metadata.json import JSONSerializer
+from indico.web.http_api.responses import StreamedResults
+
+
+@pytest.mark.parametrize('pretty', (False, True))
+@pytest.mark.parametrize('results', ([], [{'id': 1}, {'id': 2, 'url': 'https://example.com/'}]))
+def test_json_stream(pretty, results):
+    serializer = JSONSerializer({}, pretty=pretty)
+    envelope = {'_type': 'HTTPAPIResult', 'ts': 123, 'url': 'https://example.com/export/categ/0.json'}
+    streamed = StreamedResults(iter(results), lambda: {'foo': 'bar'})
+    data = json.loads(''.join(serializer.stream(envelope, streamed)))
+    assert data == {**envelope, 'results': results, 'count': len(results), 'additionalInfo': {'foo': 'bar'}}
@@ -17,3 +17,9 @@ class JSONPSerializer(JSONSerializer):
         func = self._query_params.get('jsonp', 'read')
         res = super()._execute(results)
         return f'// fetched from Indico\n{func}({res});'
+
+    def stream(self, envelope, results):
+        func = self._query_params.get('jsonp', 'read')
+        yield f'// fetched from Indico\n{func}('
+        yield from super().stream(envelope, results)
+        yield ');'
@@ -8,6 +8,7 @@
 class Serializer:
     schemaless = True
     encapsulate = True
+    streamable = False
 
     registry = {}
 
@@ -49,6 +50,20 @@ class Serializer:
         self._data = self._execute(obj, *args, **kwargs)
         return self._data
 
+    def stream(self, envelope, results):
+        """Serialize results incrementally.
+
+        Only serializers which have `streamable` set support this.
+
+        :param envelope: The encapsulating data of the results, without
+                         the ``results``, ``count`` and ``additionalInfo``
+                         entries which are only known once all results
+                         have been generated.
+        :param results: A :class:`.StreamedResults` object
+        :return: An iterable yielding chunks of the serialized data
+        """
+        raise NotImplementedError
+
 
 from indico.web.http_api.metadata.json import JSONSerializer  # noqa: F401,E402
 from indico.web.http_api.metadata.xml import XMLSerializer  # noqa: F401,E402
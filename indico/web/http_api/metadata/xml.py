@@ -7,6 +7,7 @@
 
 import re
 from datetime import datetime
+from io import BytesIO
 
 import dateutil.parser
 from lxml import etree
@@ -26,6 +27,7 @@ class XMLSerializer(Serializer):
     """Receive a fossil (or a collection of them) and converts them to XML."""
 
     _mime = 'text/xml'
+    streamable = True
 
     def __init__(self, query_params, pretty=False, **kwargs):
         self._typeMap = kwargs.pop('typeMap', {})
@@ -104,5 +106,28 @@ class XMLSerializer(Serializer):
         return etree.tostring(result, pretty_print=self.pretty,
                               xml_declaration=xml_declaration, encoding='utf-8')
 
+    def stream(self, envelope, results):
+        buf = BytesIO()
+
+        def _flush():
+            data = buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            return data
+
+        with etree.xmlfile(buf, encoding='utf-8', buffered=False) as xf:
+            xf.write_declaration()
+            envelope_elem = self._xmlForFossil(envelope)
+            with xf.element(envelope_elem.tag, envelope_elem.attrib):
+                for elem in envelope_elem:
+                    xf.write(elem, pretty_print=self.pretty)
+                with xf.element('results'):
+                    for result in results:
+                        xf.write(self._xmlForFossil(result), pretty_print=self.pretty)
+                        yield _flush()
+                for elem in self._xmlForFossil({'count': results.count, 'additionalInfo': results.get_extra()}):
+                    xf.write(elem, pretty_print=self.pretty)
+        yield _flush()
+
 
 Serializer.register('xml', XMLSerializer)
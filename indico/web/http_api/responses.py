@@ -42,6 +42,33 @@ class HTTPAPIResult:
         return len(self.results)
 
 
+class StreamedResults:
+    """Results which are generated while they are being serialized.
+
+    Hooks may return this instead of a list of results when streaming
+    was requested, so the response can be sent to the client without
+    keeping all results in memory.
+
+    :param results: An iterable containing the results
+    :param extra_func: A callable returning the additional info of the
+                       result.  It is called after all results have
+                       been generated.
+    """
+
+    def __init__(self, results, extra_func=None):
+        self._results = results
+        self._extra_func = extra_func
+        self.count = 0
+
+    def __iter__(self):
+        for result in self._results:
+            self.count += 1
+            yield result
+
+    def get_extra(self):
+        return (self._extra_func() if self._extra_func else None) or {}
+
+
 class HTTPAPIResultSchema(mm.Schema):
     count = fields.Integer()
     extra = fields.Raw(data_key='additionalInfo')